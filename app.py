@@ -1,11 +1,17 @@
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
+from fastapi.responses import (HTMLResponse, FileResponse, RedirectResponse, JSONResponse, PlainTextResponse,
+                               StreamingResponse)
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from urllib.parse import urlparse
-from crawler_excel import crawl_pages
+from urllib.parse import urlencode, urlparse
+from crawler_excel import crawl_pages, resume_crawl
+from crawl_state import state_path
 from shop_scraper import scrape_shop
-import tempfile, logging, os, zipfile
+from jobs import JOBS, JobQueueFull, DONE, FAILED
+from zip_stream import compress_type_for, stream_zip
+import metrics
+from concurrent.futures import ThreadPoolExecutor
+import asyncio, functools, json, tempfile, logging, os, shutil, threading, zipfile
 
 logging.basicConfig(level=logging.INFO)
 
@@ -13,6 +19,17 @@ app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# Job crawls checkpoint here so they can be resumed by job id after a restart;
+# a checkpoint is deleted when its job expires (jobs.JobManager.prune)
+CRAWL_STATE_DIR = os.path.abspath(os.environ.get(
+    "SCRAPER_STATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawl_state")))
+
+# POST /crawl and /scrape_shop produce their ZIP on this pool (separate from the job
+# workers); while every slot is taken, further requests get a 503
+STREAM_WORKERS = int(os.environ.get("SCRAPER_STREAM_WORKERS", "2"))
+STREAM_POOL = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix="zip-stream")
+_stream_slots = threading.BoundedSemaphore(STREAM_WORKERS)
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -22,6 +39,137 @@ def index(request: Request):
 def shop_page(request: Request):
     return templates.TemplateResponse("shop.html", {"request": request})
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus scrape target (see metrics.py for the instruments)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# ----------------------------- VALIDATION -----------------------------
+
+CRAWL_TYPES = ("html", "url_info", "performance", "images")
+PAGE_SCOPES = ("both", "landing", "blog")
+
+def url_error(url, field):
+    """Why `url` can't be fetched (None if it can); checked before a response starts."""
+    if not url or not url.strip():
+        return f"{field} is required"
+    parsed = urlparse(url.strip())
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return f"{field} must be an http(s) URL with a host: {url}"
+    return None
+
+def crawl_form_error(start_url, max_pages, page_scope, crawl_type):
+    if max_pages < 1:
+        return "max_pages must be at least 1"
+    if page_scope not in PAGE_SCOPES:
+        return f"unknown page_scope: {page_scope}"
+    if crawl_type not in CRAWL_TYPES:
+        return f"unknown crawl_type: {crawl_type}"
+    return url_error(start_url, "start_url")
+
+def shop_form_error(shop_url, product_urls):
+    errors = [url_error(shop_url, "shop_url")]
+    errors += [url_error(u.strip(), "product URL") for u in product_urls.splitlines() if u.strip()]
+    return next((e for e in errors if e), None)
+
+# ----------------------------- RUNNERS -----------------------------
+
+def zip_crawl_output(tmpdir):
+    from zipfile import ZipFile
+    zip_path = os.path.join(tmpdir, "site_excels.zip")
+    with ZipFile(zip_path, "w") as z:
+        for root, _, files in os.walk(tmpdir):
+            for fn in files:
+                if fn.endswith(".xlsx") or fn == "crawl_report.json":
+                    fp = os.path.join(root, fn)
+                    arc = os.path.relpath(fp, start=tmpdir)
+                    z.write(fp, arcname=arc, compress_type=compress_type_for(arc))
+    return zip_path
+
+def stream_zip_response(run, filename, prefix):
+    """
+    Run run(workdir, on_artifact, progress) on STREAM_POOL and stream every file it reports
+    into a ZIP response as soon as it is written; each file is deleted once it is in the
+    archive, the work dir at the end. The response starts right away; if the run fails,
+    the ZIP ends with an ERROR.txt. progress raises once the client has gone away, which
+    stops the run at its next report. 503 while STREAM_WORKERS runs are in progress.
+    """
+    if not _stream_slots.acquire(blocking=False):
+        return PlainTextResponse("Too many downloads in progress. Try again later, or start a job (POST /jobs).",
+                                 status_code=503, headers={"Retry-After": "60"})
+    workdir = tempfile.mkdtemp(prefix=prefix)
+
+    def producer(zs):
+        def on_artifact(path):
+            zs.add_file(path, arcname=os.path.relpath(path, start=workdir))
+            os.remove(path)
+        try:
+            run(workdir, on_artifact, zs.check)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            _stream_slots.release()
+
+    return StreamingResponse(stream_zip(producer, executor=STREAM_POOL), media_type="application/zip",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+def run_crawl(tmpdir, start_url, max_pages, keyword, language, page_scope,
+              crawl_type, save_individual, progress=None, crawl_id=None, on_artifact=None):
+    crawl_pages(
+        [start_url],
+        out_dir=tmpdir,
+        max_pages=max_pages,
+        keyword_filter=keyword,
+        language_filter=language,
+        crawl_types=[crawl_type],
+        page_scope=page_scope,
+        zip_results=False,
+        save_individual=save_individual,
+        progress=progress,
+        on_artifact=on_artifact,
+        state_dir=CRAWL_STATE_DIR if crawl_id else None,
+        crawl_id=crawl_id,
+    )
+
+def run_crawl_to_zip(tmpdir, start_url, max_pages, keyword, language, page_scope,
+                     crawl_type, save_individual, progress=None, crawl_id=None):
+    run_crawl(tmpdir, start_url, max_pages, keyword, language, page_scope,
+              crawl_type, save_individual, progress=progress, crawl_id=crawl_id)
+    return zip_crawl_output(tmpdir)
+
+def run_shop(tmpdir, shop_url, include_excel, include_images, product_urls, progress=None, on_artifact=None):
+    # if both unchecked, default to both
+    if not include_excel and not include_images:
+        include_excel = True
+        include_images = True
+
+    # Manual product URLs from textarea
+    manual_urls = [u.strip() for u in product_urls.splitlines() if u.strip()]
+
+    return scrape_shop(
+        shop_url,
+        out_dir=tmpdir,
+        max_pages=10,
+        include_excel=include_excel,
+        include_images=include_images,
+        manual_product_urls=manual_urls or None,
+        progress=progress,
+        on_artifact=on_artifact,
+    )
+
+def run_shop_to_zip(tmpdir, shop_url, include_excel, include_images, product_urls, progress=None):
+    # Excel and images go straight into one archive (images/ folder, no nested zip)
+    final_zip = os.path.join(tmpdir, "shop_data.zip")
+    with zipfile.ZipFile(final_zip, "w") as z:
+        def on_artifact(path):
+            arc = os.path.relpath(path, start=tmpdir)
+            z.write(path, arcname=arc, compress_type=compress_type_for(arc))
+            os.remove(path)
+        run_shop(tmpdir, shop_url, include_excel, include_images, product_urls,
+                 progress=progress, on_artifact=on_artifact)
+    return final_zip
+
+# ----------------------------- BLOCKING ROUTES -----------------------------
+
 @app.post("/crawl")
 def crawl(
     start_url: str = Form(...),
@@ -32,36 +180,16 @@ def crawl(
     crawl_type: str = Form(["html"]),
     save_individual: bool = Form(False),
 ):
-    try:
-        logging.info(f"[crawl] start={start_url} keyword={keyword} lang={language} types={crawl_type}")
-        tmpdir = tempfile.mkdtemp(prefix="site_scraper_")
-
-        crawl_pages(
-            [start_url],
-            out_dir=tmpdir,
-            max_pages=max_pages,
-            keyword_filter=keyword,
-            language_filter=language,
-            crawl_types=[crawl_type],
-            page_scope=page_scope,
-            zip_results=False,
-            save_individual=save_individual,
-        )
-
-        from zipfile import ZipFile
-        zip_path = os.path.join(tmpdir, "site_excels.zip")
-        with ZipFile(zip_path, "w") as z:
-            for root, _, files in os.walk(tmpdir):
-                for fn in files:
-                    if fn.endswith(".xlsx"):
-                        fp = os.path.join(root, fn)
-                        z.write(fp, arcname=os.path.relpath(fp, start=tmpdir))
-
-        return FileResponse(zip_path, media_type="application/zip", filename="site_excels.zip")
-
-    except Exception as e:
-        logging.exception("[crawl] failed")
-        return RedirectResponse(url=f"/?error={str(e)}", status_code=303)
+    # once the ZIP starts streaming, errors can only end up in its ERROR.txt
+    error = crawl_form_error(start_url, max_pages, page_scope, crawl_type)
+    if error:
+        return RedirectResponse(url=f"/?{urlencode({'error': error})}", status_code=303)
+    logging.info(f"[crawl] start={start_url} keyword={keyword} lang={language} types={crawl_type}")
+
+    def run(tmpdir, on_artifact, progress):
+        run_crawl(tmpdir, start_url.strip(), max_pages, keyword, language, page_scope,
+                  crawl_type, save_individual, progress=progress, on_artifact=on_artifact)
+    return stream_zip_response(run, "site_excels.zip", prefix="site_scraper_")
 
 @app.post("/scrape_shop")
 def scrape_shop_route(
@@ -70,38 +198,130 @@ def scrape_shop_route(
     include_images: bool = Form(False),
     product_urls: str = Form(""),   # NEW
 ):
-    # if both unchecked, default to both
-    if not include_excel and not include_images:
-        include_excel = True
-        include_images = True
+    error = shop_form_error(shop_url, product_urls)
+    if error:
+        return RedirectResponse(url=f"/shop?{urlencode({'error': error})}", status_code=303)
+
+    def run(tmpdir, on_artifact, progress):
+        run_shop(tmpdir, shop_url.strip(), include_excel, include_images, product_urls,
+                 progress=progress, on_artifact=on_artifact)
+    return stream_zip_response(run, "shop_data.zip", prefix="shop_scraper_")
+
+# ----------------------------- JOB API -----------------------------
+
+@app.post("/jobs")
+def create_job(
+    kind: str = Form("crawl"),
+    # crawl fields
+    start_url: str = Form(""),
+    max_pages: int = Form(200),
+    keyword: str = Form(""),
+    language: str = Form("default"),
+    page_scope: str = Form("both"),
+    crawl_type: str = Form("html"),
+    save_individual: bool = Form(False),
+    # shop fields
+    shop_url: str = Form(""),
+    include_excel: bool = Form(False),
+    include_images: bool = Form(False),
+    product_urls: str = Form(""),
+):
+    if kind == "crawl":
+        error = crawl_form_error(start_url, max_pages, page_scope, crawl_type)
+        if error:
+            return JSONResponse({"error": error}, status_code=400)
+        logging.info(f"[jobs] crawl start={start_url} keyword={keyword} lang={language} types={crawl_type}")
+
+        def fn(job):
+            return run_crawl_to_zip(job.workdir, start_url, max_pages, keyword, language,
+                                    page_scope, crawl_type, save_individual,
+                                    progress=job.report, crawl_id=job.id)
+        counter_key, total_key = "pages_crawled", "max_pages"
+        state_file = functools.partial(state_path, CRAWL_STATE_DIR)  # by the new job id
+    elif kind == "shop":
+        error = shop_form_error(shop_url, product_urls)
+        if error:
+            return JSONResponse({"error": error}, status_code=400)
+
+        def fn(job):
+            return run_shop_to_zip(job.workdir, shop_url, include_excel, include_images,
+                                   product_urls, progress=job.report)
+        counter_key, total_key = "products_scraped", "products_total"
+        state_file = None
+    else:
+        return JSONResponse({"error": f"unknown job kind: {kind}"}, status_code=400)
 
+    return _submit_job(kind, fn, counter_key, total_key, state_file=state_file)
+
+def _submit_job(kind, fn, counter_key, total_key=None, state_file=None):
     try:
-        tmpdir = tempfile.mkdtemp(prefix="shop_scraper_")
-
-        # Manual product URLs from textarea
-        manual_urls = [u.strip() for u in product_urls.splitlines() if u.strip()]
-
-        excel_path, images_zip = scrape_shop(
-            shop_url,
-            out_dir=tmpdir,
-            max_pages=10,
-            include_excel=include_excel,
-            include_images=include_images,
-            manual_product_urls=manual_urls or None,
-        )
-
-        if not excel_path and not images_zip:
-            raise ValueError("No products scraped from this shop URL.")
-
-        final_zip = os.path.join(tmpdir, "shop_data.zip")
-        with zipfile.ZipFile(final_zip, "w") as z:
-            if excel_path:
-                z.write(excel_path, arcname=os.path.basename(excel_path))
-            if images_zip:
-                z.write(images_zip, arcname=os.path.basename(images_zip))
-
-        return FileResponse(final_zip, media_type="application/zip", filename="shop_data.zip")
-
-    except Exception as e:
-        logging.exception("[scrape_shop] failed")
-        return RedirectResponse(url=f"/shop?error={e}", status_code=303)
\ No newline at end of file
+        job = JOBS.submit(kind, fn, counter_key=counter_key, total_key=total_key, state_file=state_file)
+    except JobQueueFull as e:
+        return JSONResponse({"error": f"Too many queued jobs ({e}). Try again later."}, status_code=429)
+    return JSONResponse({"id": job.id,
+                         "status_url": f"/jobs/{job.id}",
+                         "events_url": f"/jobs/{job.id}/events",
+                         "result_url": f"/jobs/{job.id}/result"}, status_code=202)
+
+@app.post("/jobs/{job_id}/resume")
+def resume_job(job_id: str):
+    """Start a new job that continues an interrupted crawl job from its saved state."""
+    job = JOBS.get(job_id)
+    if job and job.status in ("queued", "running"):
+        return JSONResponse({"error": f"job is {job.status}"}, status_code=409)
+    if not os.path.exists(state_path(CRAWL_STATE_DIR, job_id)):
+        return JSONResponse({"error": "no saved crawl state for this id"}, status_code=404)
+
+    def fn(new_job):
+        resume_crawl(job_id, CRAWL_STATE_DIR, out_dir=new_job.workdir, progress=new_job.report)
+        return zip_crawl_output(new_job.workdir)
+    return _submit_job("crawl", fn, "pages_crawled", "max_pages",
+                       state_file=state_path(CRAWL_STATE_DIR, job_id))
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if not job:
+        return JSONResponse({"error": "unknown job"}, status_code=404)
+    return JSONResponse(job.snapshot())
+
+# Coalescing: at most one event per interval carrying the latest snapshot, however
+# many pages were reported in between; a comment line keeps idle proxies open.
+EVENT_INTERVAL_S = 1.0
+EVENT_KEEPALIVE_S = 15.0
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events: a `progress` event whenever the job changed, `end` once it finished."""
+    job = JOBS.get(job_id)
+    if not job:
+        return JSONResponse({"error": "unknown job"}, status_code=404)
+
+    async def events():
+        sent, idle = -1, 0.0
+        while not await request.is_disconnected():
+            snap = job.snapshot()
+            if snap["version"] != sent:
+                sent, idle = snap["version"], 0.0
+                finished = snap["status"] in (DONE, FAILED)
+                yield f"event: {'end' if finished else 'progress'}\ndata: {json.dumps(snap)}\n\n"
+                if finished:
+                    return
+            elif idle >= EVENT_KEEPALIVE_S:
+                idle = 0.0
+                yield ": keepalive\n\n"
+            await asyncio.sleep(EVENT_INTERVAL_S)
+            idle += EVENT_INTERVAL_S
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = JOBS.get(job_id)
+    if not job:
+        return JSONResponse({"error": "unknown job"}, status_code=404)
+    if not (job.result_path and os.path.exists(job.result_path)):
+        return JSONResponse({"error": f"job is {job.status}", "detail": job.error}, status_code=409)
+    return FileResponse(job.result_path, media_type="application/zip",
+                        filename=os.path.basename(job.result_path))
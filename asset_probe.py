@@ -0,0 +1,128 @@
+# asset_probe.py
+"""
+Crawl-scoped cache of image/asset probes.
+
+scrape_performance and scrape_image_analysis only need the status, redirect
+flag and size of each asset. Logos, icons and theme files repeat on every page,
+so ProbeCache probes each absolute URL once per crawl (LRU-bounded), shares one
+pooled session between worker threads, and deduplicates concurrent requests for
+the same URL: a second caller simply waits on the first caller's future.
+
+Servers that reject HEAD (405/501) are retried with a one-byte ranged GET, which
+returns the full size in Content-Range without downloading the body.
+"""
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from profiling import stage
+from transport import http_adapter
+
+_HEAD_REJECTED = (405, 501)
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+\d+-\d+/(\d+)")
+
+
+def _parse_size(resp, ranged: bool = False):
+    """Full size of the asset in bytes, or None if the server did not say."""
+    if ranged and resp.status_code == 206:
+        m = _CONTENT_RANGE_RE.match(resp.headers.get("Content-Range", ""))
+        return int(m.group(1)) if m else None
+    try:
+        return int(resp.headers.get("Content-Length", 0))
+    except ValueError:
+        return None
+
+
+class ProbeCache:
+    """
+    probe(url) -> {"status", "ok", "redirected", "size", "content_type", "error"}
+
+    `error` is set (and the other fields empty) when the request itself failed.
+    `size` is None when the server sent an unparsable length.
+    on_result(url, result), if given, is called from the probe thread after each
+    network probe (crawl_pages uses it to archive probes, see response_archive.py).
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_workers: int = 8, timeout: int = 10,
+                 headers: dict | None = None, on_result=None):
+        self.max_entries = max(1, max_entries)
+        self.timeout = timeout
+        self.on_result = on_result
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = http_adapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+        self._entries = OrderedDict()  # url -> Future[result]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def submit(self, url: str):
+        """Future for the probe of `url`, reusing a cached or in-flight one."""
+        with self._lock:
+            fut = self._entries.get(url)
+            if fut is not None:
+                self._entries.move_to_end(url)
+                self.hits += 1
+                return fut
+            self.misses += 1
+            fut = self._pool.submit(self._probe, url)
+            self._entries[url] = fut
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return fut
+
+    def probe(self, url: str) -> dict:
+        return self.submit(url).result()
+
+    def probe_many(self, urls) -> list[dict]:
+        """Probe concurrently; results come back in input order."""
+        with stage("probes"):
+            return [f.result() for f in [self.submit(u) for u in urls]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cached": len(self._entries)}
+
+    def _probe(self, url: str) -> dict:
+        result = self._request(url)
+        if self.on_result:
+            self.on_result(url, result)
+        return result
+
+    def _request(self, url: str) -> dict:
+        try:
+            r = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            ranged = False
+            if r.status_code in _HEAD_REJECTED:
+                r = self.session.get(url, headers={"Range": "bytes=0-0"}, allow_redirects=True,
+                                     timeout=self.timeout, stream=True)
+                r.close()
+                ranged = True
+        except requests.RequestException as e:
+            return {"status": None, "ok": False, "redirected": False, "size": 0,
+                    "content_type": "", "error": str(e)}
+        return {
+            "status": r.status_code,
+            "ok": r.ok,
+            "redirected": len(r.history) > 0,
+            "size": _parse_size(r, ranged),
+            "content_type": r.headers.get("Content-Type", ""),
+            "error": None,
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
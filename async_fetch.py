@@ -0,0 +1,179 @@
+# async_fetch.py
+"""
+asyncio fetch backend for crawler_excel.
+
+One event loop (on a background thread) drives a pooled httpx.AsyncClient, so
+hundreds of requests can be in flight across many hosts without a thread per
+request. Responses are converted to requests.Response objects carrying the same
+``_redirect_chain`` / ``_redirected`` attributes as ``crawler_excel.fetch``, so
+the scrapers work unchanged on either backend.
+
+Requires:
+  pip install httpx
+  pip install h2        (only for http2=True)
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import crawler_excel as ce
+from metrics import FETCH_ERRORS, FETCH_RETRIES, FETCH_SECONDS, HTTP_RESPONSES
+
+_HTTP_VERSIONS = {"HTTP/1.0": 10, "HTTP/1.1": 11, "HTTP/2": 20}
+
+
+def _import_httpx():
+    try:
+        import httpx
+    except ImportError as exc:
+        raise RuntimeError(
+            "httpx is required for the async fetch backend. "
+            "Install with 'pip install httpx' (and 'pip install h2' for HTTP/2)."
+        ) from exc
+    return httpx
+
+
+def _to_requests_response(r, elapsed: float, chain: list) -> requests.Response:
+    """Wrap an httpx.Response in a requests.Response so the scrapers can consume it."""
+    resp = requests.Response()
+    resp.status_code = r.status_code
+    resp.reason = r.reason_phrase
+    resp.url = str(r.url)
+    resp.headers = CaseInsensitiveDict(r.headers.items())
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    resp._content = r.content
+    resp.elapsed = timedelta(seconds=elapsed)
+    # scrape_url_info reads resp.raw.version the way urllib3 reports it (11, 20, ...)
+    resp.raw = SimpleNamespace(version=_HTTP_VERSIONS.get(r.http_version, ""))
+    resp._redirect_chain = chain
+    resp._redirected = bool(chain)
+    return resp
+
+
+async def fetch_async(client, url: str, timeout: int = 15, max_hops: int = 10, max_retries: int = 4,
+                      rate_limit_rpm: int = 12, referer: str | None = None,
+                      extra_headers: dict | None = None) -> requests.Response:
+    """Async twin of crawler_excel.fetch: manual redirects, 429/503 backoff, per-host pacing."""
+    cur = url
+    hops = 0
+    tries = 0
+    chain = []  # collect (status, from, to)
+
+    while True:
+        bucket = ce._host_bucket(cur)
+        wait = bucket.reserve(rate_limit_rpm)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        headers = {"Referer": referer} if referer else {}
+        if extra_headers and hops == 0:
+            headers.update(extra_headers)
+
+        started = time.monotonic()
+        try:
+            r = await client.get(cur, headers=headers, timeout=timeout, follow_redirects=False)
+        except Exception:
+            FETCH_ERRORS.inc(backend="async")
+            bucket.record_error()
+            raise
+        elapsed = time.monotonic() - started
+        FETCH_SECONDS.observe(elapsed, backend="async")
+        HTTP_RESPONSES.inc(code=r.status_code)
+        bucket.record(r.status_code, elapsed, r.headers.get("Retry-After", ""))
+
+        if 300 <= r.status_code < 400 and hops < max_hops:
+            loc = r.headers.get("Location")
+            if not loc:
+                return _to_requests_response(r, elapsed, chain)
+            nxt = urljoin(cur, loc)
+            chain.append((r.status_code, cur, nxt))
+            referer = cur
+            cur = nxt
+            hops += 1
+            continue
+
+        if r.status_code in (429, 503):
+            tries += 1
+            if not bucket.adaptive:  # the adaptive bucket already holds the next request back
+                await asyncio.sleep(ce._retry_wait(r.headers.get("Retry-After", ""), tries))
+            if tries < max_retries:
+                FETCH_RETRIES.inc(code=r.status_code)
+                continue
+
+        return _to_requests_response(r, elapsed, chain)
+
+
+async def fetch_page_async(client, url: str, referer: str | None = None,
+                           rate_limit_rpm: int = 12, headers: dict | None = None,
+                           canon_host: str | None = None) -> requests.Response:
+    """Async twin of crawler_excel._fetch_page (pinned-host 404 retry + raise_for_status)."""
+    resp = await fetch_async(client, url, rate_limit_rpm=rate_limit_rpm, referer=referer, extra_headers=headers)
+    if resp.status_code == 404 and ce._base_host(urlparse(resp.url).netloc) != ce._base_host(urlparse(url).netloc):
+        resp = await fetch_async(client, ce._pin_host(resp.url, canon_host), rate_limit_rpm=rate_limit_rpm,
+                                 referer=referer, extra_headers=headers)
+    resp.raise_for_status()
+    return resp
+
+
+class AsyncFetcher:
+    """
+    Runs fetch_page_async on a private event loop and hands back
+    concurrent.futures.Future objects, so synchronous code (crawl_pages) can
+    keep a window of in-flight requests without owning a thread per request.
+    """
+
+    def __init__(self, max_in_flight: int = 100, http2: bool = False, timeout: int = 15):
+        httpx = _import_httpx()
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logging.warning("h2 is not installed; async backend falls back to HTTP/1.1.")
+                http2 = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-fetch", daemon=True)
+        self._thread.start()
+
+        async def make_client():
+            limits = httpx.Limits(max_connections=max_in_flight,
+                                  max_keepalive_connections=max_in_flight,
+                                  keepalive_expiry=30.0)
+            return httpx.AsyncClient(headers=ce.HEADERS, http2=http2, limits=limits, timeout=timeout)
+
+        self._client = self.run(make_client()).result()
+        self._sem = asyncio.Semaphore(max_in_flight)
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _guarded(self, url, referer, rate_limit_rpm, headers, canon_host):
+        async with self._sem:
+            logging.info(f"Scraping {url}")
+            return await fetch_page_async(self._client, url, referer=referer, rate_limit_rpm=rate_limit_rpm,
+                                          headers=headers, canon_host=canon_host)
+
+    def submit(self, url: str, referer: str | None = None, rate_limit_rpm: int = 12,
+               headers: dict | None = None, canon_host: str | None = None):
+        """Schedule a page fetch; the returned Future resolves to a requests.Response."""
+        return self.run(self._guarded(url, referer, rate_limit_rpm, headers, canon_host))
+
+    def close(self):
+        try:
+            self.run(self._client.aclose()).result(timeout=10)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,86 @@
+# background_writer.py
+"""
+File writes moved off the crawl loop.
+
+crawl_pages hands each page's individual workbook to a BackgroundWriter
+instead of building and saving it inline: submit() queues the write and
+returns at once, worker threads run it. The queue is bounded, so when writers
+fall behind, submit() blocks (backpressure) instead of piling page data up in
+memory; the time spent blocked is reported.
+
+Results come back to the submitting thread: completed() returns the paths
+written since the last call (for on_artifact, which is not thread-safe), and
+failed writes are logged and collected in `failures` rather than lost on a
+worker thread.
+"""
+import logging
+import threading
+import time
+from queue import Empty, Queue
+
+MAX_FAILURES_KEPT = 100
+
+
+class BackgroundWriter:
+    def __init__(self, workers: int = 1, max_pending: int = 8, name: str = "writer"):
+        self._queue = Queue(maxsize=max(1, max_pending))
+        self._done = Queue()  # (label, path, error)
+        self._closed = False
+        self.written = 0
+        self.failed = 0
+        self.failures = []  # first MAX_FAILURES_KEPT {"page", "error"}
+        self.blocked_s = 0.0
+        self._threads = [threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, label: str, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs), which returns the written path; blocks while the queue is full."""
+        if self._closed:
+            raise RuntimeError("BackgroundWriter is closed")
+        started = time.perf_counter()
+        self._queue.put((label, fn, args, kwargs))
+        self.blocked_s += time.perf_counter() - started
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            label, fn, args, kwargs = item
+            try:
+                self._done.put((label, fn(*args, **kwargs), None))
+            except Exception as e:
+                logging.error(f"Failed to write Excel for {label}: {e}")
+                self._done.put((label, None, e))
+
+    def completed(self) -> list[str]:
+        """Paths written since the last call; failures are counted and kept in `failures`."""
+        paths = []
+        while True:
+            try:
+                label, path, error = self._done.get_nowait()
+            except Empty:
+                return paths
+            if error is not None:
+                self.failed += 1
+                if len(self.failures) < MAX_FAILURES_KEPT:
+                    self.failures.append({"page": label, "error": f"{type(error).__name__}: {error}"})
+            elif path:
+                self.written += 1
+                paths.append(path)
+
+    def close(self) -> list[str]:
+        """Finish every queued write, stop the workers and return the paths not yet collected."""
+        if not self._closed:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(None)
+            for t in self._threads:
+                t.join()
+        return self.completed()
+
+    def stats(self) -> dict:
+        return {"written": self.written, "failed": self.failed, "blocked_s": round(self.blocked_s, 3),
+                "failures": self.failures}
@@ -0,0 +1,92 @@
+# benchmarks/bench_frontier.py
+"""
+Memory/speed of frontier.Frontier against the str sets + dict + deque that
+crawl_pages used before.
+
+Simulates a faceted shop: N distinct discovered URLs (each with a referer),
+half of them crawled, then N membership checks (half hits, half misses).
+Memory is measured with tracemalloc, so it includes the URL strings each
+structure keeps alive.
+
+  python benchmarks/bench_frontier.py                 # 1M URLs
+  python benchmarks/bench_frontier.py -n 200000 --json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frontier import Frontier  # noqa: E402
+
+
+def faceted_url(i: int) -> str:
+    return (f"https://shop.example.com/c/category-{i % 500}/"
+            f"?color={i % 17}&size={i % 11}&sort=price&page={i // 93_500}&v={i}")
+
+
+def run_sets(n: int):
+    seen, queued, referers, queue = set(), set(), {}, deque()
+    for i in range(n):
+        url = faceted_url(i)
+        queued.add(url)
+        referers[url] = faceted_url(i // 2) if i else None
+        queue.append(url)
+    for _ in range(n // 2):
+        seen.add(queue.popleft())
+    t = time.perf_counter()
+    hits = sum(1 for i in range(n // 2, n + n // 2) if faceted_url(i) in queued)
+    lookup_s = time.perf_counter() - t
+    return (seen, queued, referers, queue), hits, lookup_s
+
+
+def run_frontier(n: int):
+    frontier = Frontier(expected=n)
+    for i in range(n):
+        frontier.add(faceted_url(i), faceted_url(i // 2) if i else None)
+    for _ in range(n // 2):
+        frontier.mark_seen(frontier.pop())
+    t = time.perf_counter()
+    hits = sum(1 for i in range(n // 2, n + n // 2) if faceted_url(i) in frontier)
+    lookup_s = time.perf_counter() - t
+    return frontier, hits, lookup_s
+
+
+def measure(name, fn, *args):
+    gc.collect()
+    tracemalloc.start()
+    t = time.perf_counter()
+    keep, hits, lookup_s = fn(*args)
+    elapsed = time.perf_counter() - t
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return {"name": name, "retained_mb": round(current / 2**20, 1), "peak_mb": round(peak / 2**20, 1),
+            "build_s": round(elapsed - lookup_s, 2), "lookup_s": round(lookup_s, 2), "hits": hits}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=1_000_000, help="distinct URLs (default 1M)")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    results = [measure("sets+dict+deque", run_sets, args.n),
+               measure("Frontier", run_frontier, args.n)]
+
+    if args.json:
+        print(json.dumps({"urls": args.n, "results": results}, indent=2))
+        return
+    print(f"{args.n:,} URLs")
+    print(f"{'structure':<18}{'retained MB':>12}{'peak MB':>10}{'build s':>9}{'lookup s':>10}")
+    for r in results:
+        print(f"{r['name']:<18}{r['retained_mb']:>12}{r['peak_mb']:>10}{r['build_s']:>9}{r['lookup_s']:>10}")
+
+
+if __name__ == "__main__":
+    main()
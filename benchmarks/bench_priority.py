@@ -0,0 +1,141 @@
+# benchmarks/bench_priority.py
+"""
+Relevant pages found per 100 fetches: FIFO frontier against the priority
+frontier (crawl_priority.LinkScorer), on a synthetic site crawled offline.
+
+The site has a shop (categories, faceted listings, products) and a blog whose
+posts cover a handful of topics; posts on the target topic usually, but not
+always, carry the keyword in their title (anchor text) and slug, and link to
+related posts. Its sitemap lists the shop first, then the posts with <lastmod>.
+Seeding and dequeue filtering follow crawl_pages:
+
+  keyword   keyword_filter="coffee"             relevant = posts about coffee
+  blog      page_scope="blog"                   relevant = blog posts (non-blog pages
+                                                are skipped without a fetch)
+  fresh     prioritize=True, no keyword/scope   relevant = modified in the last 30 days
+
+  python benchmarks/bench_priority.py
+  python benchmarks/bench_priority.py --budget 100 300 --json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawl_priority import SEED_FACTOR, SITEMAP_DEPTH, LinkScorer  # noqa: E402
+from crawler_excel import is_blog_path  # noqa: E402
+from frontier import Frontier  # noqa: E402
+
+ROOT = "https://shop.example.com/"
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+TOPICS = ["coffee", "tea", "recipes", "travel", "gear", "news"]
+
+
+def build_site(seed: int = 7, categories: int = 40, products: int = 30, posts: int = 600):
+    """url -> [(link, anchor)], the topic of every blog post, and the sitemap [(url, lastmod)]."""
+    rnd = random.Random(seed)
+    site, topic_of, sitemap = {}, {}, []
+    nav = [(ROOT, "Home"), (ROOT + "shop/", "Shop"), (ROOT + "blog/", "Blog")]
+
+    cats = [f"{ROOT}shop/c-{c}/" for c in range(categories)]
+    site[ROOT] = nav + [(ROOT + "about/", "About"), (ROOT + "contact/", "Contact")]
+    site[ROOT + "about/"] = site[ROOT + "contact/"] = list(nav)
+    site[ROOT + "shop/"] = nav + [(c, f"Category {i}") for i, c in enumerate(cats)]
+    for c, cat in enumerate(cats):
+        items = [f"{cat}p-{p}/" for p in range(products)]
+        facets = [f"{cat}?color={k}&sort=price" for k in range(8)]
+        site[cat] = nav + [(u, "Product") for u in items] + [(f, "Filter") for f in facets]
+        for f in facets:
+            site[f] = nav + [(u, "Product") for u in rnd.sample(items, 10)] + [(g, "Filter") for g in facets]
+        for u in items:
+            site[u] = nav + [(v, "Related product") for v in rnd.sample(items, 5)]
+            sitemap.append((u, f"2024-{rnd.randint(1, 12):02d}-01"))
+
+    slugs = []
+    for n in range(posts):
+        topic = rnd.choice(TOPICS)
+        named = rnd.random() < 0.7  # the rest only mention the topic in the body
+        title = f"{topic.title()} guide {n}" if named else f"Weekend notes {n}"
+        slug = f"{ROOT}blog/{'-'.join(title.lower().split())}/"
+        topic_of[slug] = topic
+        slugs.append((slug, title))
+        sitemap.append((slug, (NOW - timedelta(days=rnd.randint(0, 365))).date().isoformat()))
+    pages = [slugs[i:i + 10] for i in range(0, len(slugs), 10)]
+    site[ROOT + "blog/"] = nav + pages[0] + [(f"{ROOT}blog/page/2/", "Older posts")]
+    for i, chunk in enumerate(pages[1:], start=2):
+        older = [(f"{ROOT}blog/page/{i + 1}/", "Older posts")] if i < len(pages) else []
+        site[f"{ROOT}blog/page/{i}/"] = nav + chunk + older
+    by_topic = {}
+    for slug, title in slugs:
+        by_topic.setdefault(topic_of[slug], []).append((slug, title))
+    for slug, _ in slugs:
+        # "related posts": mostly the same topic
+        site[slug] = nav + rnd.sample(by_topic[topic_of[slug]], 2) + rnd.sample(slugs, 1)
+    return site, topic_of, sitemap
+
+
+def crawl(site, sitemap, relevant, budget, keywords=(), blog_scope=False, prioritize=False):
+    """Relevant pages among the first `budget` fetches."""
+    scorer = None
+    if prioritize:
+        scorer = LinkScorer(keywords, is_blog=is_blog_path if blog_scope else None, now=NOW.timestamp())
+    frontier = Frontier(priority=prioritize)
+    frontier.add(ROOT, score=float("inf"))
+    seed_limit = budget * SEED_FACTOR if scorer else budget
+    for u, lastmod in sitemap:
+        if frontier.known >= seed_limit:
+            break
+        frontier.add(u, score=scorer.score(u, depth=SITEMAP_DEPTH, lastmod=lastmod) if scorer else 0.0)
+    fetches = found = 0
+    while frontier.pending and fetches < budget:
+        url = frontier.pop()
+        if blog_scope and url != ROOT and not is_blog_path(url[len(ROOT) - 1:].lower()):
+            continue  # skipped at dequeue, never fetched
+        fetches += 1
+        found += url in relevant
+        frontier.mark_seen(url)
+        depth = frontier.depth(url) + 1
+        for link, anchor in site.get(url, []):
+            if link not in frontier:
+                frontier.add(link, url, score=scorer.score(link, anchor, depth=depth) if scorer else 0.0)
+    return found
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--budget", type=int, nargs="+", default=[100, 300, 1000], help="max_pages values")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    site, topic_of, sitemap = build_site()
+    recent = (NOW - timedelta(days=30)).date().isoformat()
+    runs = {
+        "keyword": dict(relevant={u for u, t in topic_of.items() if t == "coffee"}, keywords=["coffee"]),
+        "blog": dict(relevant=set(topic_of), blog_scope=True),
+        "fresh": dict(relevant={u for u, lastmod in sitemap if lastmod >= recent}),
+    }
+    results = []
+    for name, kw in runs.items():
+        for budget in args.budget:
+            fifo = crawl(site, sitemap, budget=budget, **kw)
+            prio = crawl(site, sitemap, budget=budget, prioritize=True, **kw)
+            results.append({"run": name, "budget": budget, "relevant_total": len(kw["relevant"]),
+                            "fifo_per_100": round(100 * fifo / budget, 1),
+                            "priority_per_100": round(100 * prio / budget, 1)})
+
+    if args.json:
+        print(json.dumps({"pages": len(site), "results": results}, indent=2))
+        return
+    print(f"{len(site):,} pages on the synthetic site")
+    print(f"{'run':<9}{'budget':>7}{'relevant':>10}{'FIFO /100':>11}{'priority /100':>15}")
+    for r in results:
+        print(f"{r['run']:<9}{r['budget']:>7}{r['relevant_total']:>10}"
+              f"{r['fifo_per_100']:>11}{r['priority_per_100']:>15}")
+
+
+if __name__ == "__main__":
+    main()
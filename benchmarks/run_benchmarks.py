@@ -0,0 +1,299 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline performance suite: crawls of a local synthetic site (synthetic_site.py)
+plus micro-benchmarks of the extractors and writers on a fixture page.
+
+Crawl runs (each in a fresh child process, so peak RSS belongs to that crawl):
+
+  html        crawl_types=["html"]
+  full        html + url_info + performance + images (asset probes included)
+  throttled   html + url_info on a site with redirects and 429 injection
+
+each reported as pages/sec, peak RSS and p50/p95/p99 per stage (the crawl runs
+with profile=True; see profiling.py). Crawls use adaptive_rate with a very
+high rate ceiling, so pacing only kicks in when the site pushes back.
+
+Micro-benchmarks (debug_shopee_page.html as the fixture): HTML parse,
+scrape_html_content, scrape_url_info, write_excel, write_master_excel
+(`--master-pages` rows) and shop_scraper's JSON-LD/meta extractors (the
+fixture has no Product JSON-LD, so one is appended for extract_from_jsonld).
+
+Results go to a JSON file; --compare prints the change against an earlier one.
+
+  python benchmarks/run_benchmarks.py
+  python benchmarks/run_benchmarks.py --pages 1000 --concurrency 1 8 --backend requests async
+  python benchmarks/run_benchmarks.py --micro-only --out after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from synthetic_site import SyntheticSite  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FIXTURE = os.path.join(ROOT, "debug_shopee_page.html")
+FIXTURE_URL = "https://shopee.ph/"
+
+SCENARIOS = {
+    "html": dict(site={}, crawl=dict(crawl_types=["html"])),
+    "full": dict(site={}, crawl=dict(crawl_types=["html", "url_info", "performance", "images"])),
+    "throttled": dict(site=dict(redirect_every=10, throttle_every=25),
+                      crawl=dict(crawl_types=["html", "url_info"])),
+}
+
+PRODUCT_JSONLD = {
+    "@context": "https://schema.org", "@type": "Product", "name": "Pour-over Coffee Kettle 1.2L",
+    "description": "Gooseneck kettle with thermometer.", "sku": "KT-1200", "brand": {"@type": "Brand", "name": "Brew"},
+    "image": [f"https://cf.example.com/img/{i}.jpg" for i in range(8)], "color": "black", "size": "1.2L",
+    "keywords": ["coffee", "kettle", "pour over"], "category": "Kitchen",
+    "offers": {"@type": "Offer", "price": "1299.00", "priceCurrency": "PHP", "availability": "https://schema.org/InStock"},
+}
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB elsewhere
+
+
+# ----------------------------- CRAWL -----------------------------
+
+def crawl_child(spec: dict) -> dict:
+    """Runs inside the child process: one crawl_pages call against spec["url"]."""
+    import logging
+    logging.disable(logging.INFO)
+    from crawler_excel import crawl_pages
+
+    with tempfile.TemporaryDirectory(prefix="bench_crawl_") as out_dir:
+        started = time.perf_counter()
+        crawl_pages([spec["url"]], out_dir=out_dir, max_pages=spec["max_pages"],
+                    rate_limit_rpm=600_000, max_rate_rpm=600_000, adaptive_rate=True,
+                    concurrency=spec["concurrency"], fetch_backend=spec["backend"],
+                    profile=True, **spec["crawl"])
+        elapsed = time.perf_counter() - started
+        with open(os.path.join(out_dir, "crawl_report.json"), encoding="utf-8") as f:
+            report = json.load(f)
+        with open(os.path.join(out_dir, "timings.json"), encoding="utf-8") as f:
+            timings = json.load(f)
+    pages = report["pages_crawled"]
+    return {
+        "pages": pages,
+        "failed": report.get("failed", 0),
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {name: {q: s["wall"][q] for q in ("p50", "p95", "p99")}
+                   for name, s in timings["stages"].items()},
+    }
+
+
+def run_crawl(name: str, backend: str, concurrency: int, args) -> dict:
+    scenario = SCENARIOS[name]
+    site_kwargs = dict(pages=args.pages, fanout=args.fanout, images=args.images, **scenario["site"])
+    with SyntheticSite(**site_kwargs) as site:
+        spec = {"url": site.url, "max_pages": args.pages, "backend": backend,
+                "concurrency": concurrency, "crawl": scenario["crawl"]}
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", json.dumps(spec)],
+                              capture_output=True, text=True, cwd=ROOT)
+        served = dict(site.requests)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name}/{backend}/c{concurrency} crawl failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {"scenario": name, "backend": backend, "concurrency": concurrency,
+            "site": site_kwargs, **result, "served": served}
+
+
+# ----------------------------- MICRO -----------------------------
+
+def timeit(fn, repeat: int, min_time: float = 0.2) -> dict:
+    """Median/best seconds per call over `repeat` rounds, each long enough to time reliably."""
+    fn()  # warm up (imports, caches)
+    number, elapsed = 1, 0.0
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1 << 16:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - started) / number)
+    return {"median_ms": round(statistics.median(rounds) * 1000, 4),
+            "best_ms": round(min(rounds) * 1000, 4), "calls": number * repeat}
+
+
+def run_micro(args) -> dict:
+    import logging
+    logging.disable(logging.INFO)
+    from bs4 import BeautifulSoup
+
+    import crawler_excel as ce
+    import shop_scraper
+    from page_analyzer import PageAnalysis, make_soup
+    from page_store import PageSpill
+
+    with open(FIXTURE, "rb") as f:
+        content = f.read()
+    resp = ce._response_from_payload({
+        "url": FIXTURE_URL, "status_code": 200, "reason": "OK",
+        "headers": [("Content-Type", "text/html; charset=utf-8"), ("Content-Length", str(len(content)))],
+        "content": content, "encoding": "utf-8", "elapsed": 0.25, "http_version": 11, "redirect_chain": [],
+    })
+    html = resp.text
+    soup = make_soup(html)
+    shop_soup = BeautifulSoup(html, "html.parser")
+    product_html = html.replace("</head>", '<script type="application/ld+json">'
+                                + json.dumps(PRODUCT_JSONLD) + "</script></head>", 1)
+    product_soup = BeautifulSoup(product_html, "html.parser")
+    product = shop_scraper._find_jsonld_product(product_soup)
+
+    page_data = ce.scrape_response(resp, crawl_types=["html", "url_info"])
+
+    def spill_of(n):
+        spill = PageSpill()
+        for i in range(n):
+            spill.append(f"page_{i}", page_data)
+        return spill
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_micro_") as tmp:
+        master_spill = spill_of(args.master_pages)
+        benches = {
+            "parse_soup": lambda: PageAnalysis(make_soup(html)),
+            "scrape_html_content": lambda: ce.scrape_html_content(soup, FIXTURE_URL, page=PageAnalysis(soup)),
+            "scrape_url_info": lambda: ce.scrape_url_info(resp, soup, page=PageAnalysis(soup)),
+            "write_excel": lambda: ce.write_excel("fixture", page_data, tmp),
+            f"write_master_excel_{args.master_pages}": lambda: ce.write_master_excel(master_spill, tmp),
+            "shop_find_jsonld_product": lambda: shop_scraper._find_jsonld_product(product_soup),
+            "shop_extract_from_jsonld": lambda: shop_scraper.extract_from_jsonld(product, FIXTURE_URL),
+            "shop_extract_from_meta": lambda: shop_scraper.extract_from_meta(shop_soup, FIXTURE_URL),
+        }
+        try:
+            for name, fn in benches.items():
+                if args.micro_filter and not any(f in name for f in args.micro_filter):
+                    continue
+                results[name] = timeit(fn, args.repeat)
+        finally:
+            master_spill.close()
+    return results
+
+
+# ----------------------------- REPORT -----------------------------
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=ROOT).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "git_commit": commit}
+
+
+def _crawl_key(r) -> str:
+    return f"{r['scenario']}/{r['backend']}/c{r['concurrency']}"
+
+
+def _change(new, old) -> str:
+    if not old or new is None:
+        return ""
+    return f"{100.0 * (new - old) / old:+.1f}%"
+
+
+def print_results(results: dict, baseline: dict | None):
+    old_crawl = {_crawl_key(r): r for r in (baseline or {}).get("crawl", [])}
+    old_micro = (baseline or {}).get("micro", {})
+    if results["crawl"]:
+        print(f"{'crawl':<28}{'pages':>7}{'pages/s':>10}{'Δ':>9}{'peak RSS MB':>13}{'Δ':>9}"
+              f"{'fetch p95 ms':>14}{'parse p95 ms':>14}")
+        for r in results["crawl"]:
+            old = old_crawl.get(_crawl_key(r), {})
+            stages = r["stages"]
+            parse = sum(stages.get(s, {}).get("p95", 0.0) for s in ("soup", "html", "url_info", "performance", "images"))
+            print(f"{_crawl_key(r):<28}{r['pages']:>7}{r['pages_per_s']:>10}"
+                  f"{_change(r['pages_per_s'], old.get('pages_per_s')):>9}"
+                  f"{r['peak_rss_mb'] if r['peak_rss_mb'] is not None else '-':>13}"
+                  f"{_change(r['peak_rss_mb'], old.get('peak_rss_mb')):>9}"
+                  f"{1000 * stages.get('fetch', {}).get('p95', 0.0):>14.2f}{1000 * parse:>14.2f}")
+    if results["micro"]:
+        print(f"\n{'micro-benchmark':<34}{'median ms':>12}{'best ms':>12}{'Δ median':>10}")
+        for name, r in results["micro"].items():
+            old = old_micro.get(name, {})
+            print(f"{name:<34}{r['median_ms']:>12.3f}{r['best_ms']:>12.3f}"
+                  f"{_change(r['median_ms'], old.get('median_ms')):>10}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    ap.add_argument("--pages", type=int, default=300, help="pages on the synthetic site (= max_pages)")
+    ap.add_argument("--fanout", type=int, default=8, help="links per page")
+    ap.add_argument("--images", type=int, default=4, help="<img> tags per page")
+    ap.add_argument("--scenario", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    ap.add_argument("--backend", nargs="+", default=["requests"], choices=["requests", "async"])
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    ap.add_argument("--repeat", type=int, default=5, help="timing rounds per micro-benchmark")
+    ap.add_argument("--master-pages", type=int, default=200, help="rows in the write_master_excel benchmark")
+    ap.add_argument("--micro-filter", nargs="+", help="only micro-benchmarks whose name contains one of these")
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument("--crawl-only", action="store_true")
+    group.add_argument("--micro-only", action="store_true")
+    ap.add_argument("--out", default="benchmark_results.json", help="where to write the results JSON")
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(crawl_child(json.loads(args.child))))
+        return
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("child", "out", "compare")},
+        "crawl": [],
+        "micro": {},
+    }
+    if not args.micro_only:
+        for name in args.scenario:
+            for backend in args.backend:
+                for concurrency in args.concurrency:
+                    print(f"crawl {name}/{backend}/c{concurrency} ...", file=sys.stderr)
+                    results["crawl"].append(run_crawl(name, backend, concurrency, args))
+    if not args.crawl_only:
+        print("micro-benchmarks ...", file=sys.stderr)
+        results["micro"] = run_micro(args)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f"\nResults saved → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# benchmarks/synthetic_site.py
+"""
+A generated website served from localhost, for crawling without touching real sites.
+
+Pages are /p/<n>/ (the home page is n = 0) with a title, meta description,
+canonical and og: tags, headings, a few paragraphs of filler text, `images`
+<img> tags drawn from a shared pool (so asset probe caching behaves as on a
+real theme) and `fanout` links to other pages. Everything is derived from the
+seed, so the same settings always give the same site.
+
+  redirect_every   every Nth link goes through /r/<n>/ (301 → /p/<n>/)
+  throttle_every   every Nth HTML request is answered 429 with Retry-After
+  sitemap          robots.txt points at a sitemap index with <lastmod>s
+
+  python benchmarks/synthetic_site.py --port 8765 --pages 2000 --throttle-every 50
+"""
+import argparse
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("coffee tea travel guide review price shop blog news brew roast bean cup kettle grinder "
+         "morning recipe weekend city hotel flight budget tips best cheap quality fresh order").split()
+SITEMAP_CHUNK = 1000
+
+
+class SyntheticSite:
+    def __init__(self, pages: int = 500, fanout: int = 8, images: int = 4, image_pool: int = 50,
+                 words: int = 300, redirect_every: int = 0, throttle_every: int = 0, retry_after: int = 0,
+                 sitemap: bool = True, seed: int = 7, host: str = "127.0.0.1", port: int = 0):
+        self.pages = max(1, pages)
+        self.fanout = fanout
+        self.images = images
+        self.image_pool = max(1, image_pool)
+        self.words = words
+        self.redirect_every = redirect_every
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.sitemap = sitemap
+        self.seed = seed
+        self.requests = Counter()  # page, image, redirect, throttled, sitemap, robots, not_found
+        self._html_count = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _handler_for(self))
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="synthetic-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- content ----------
+
+    def page_path(self, n: int) -> str:
+        return "/" if n == 0 else f"/p/{n}/"
+
+    def lastmod(self, n: int) -> str:
+        return (date(2025, 1, 1) - timedelta(days=random.Random(self.seed * 7919 + n).randrange(365))).isoformat()
+
+    def page_html(self, n: int) -> bytes:
+        rnd = random.Random(self.seed * 1_000_003 + n)
+        title = " ".join(rnd.choice(WORDS) for _ in range(5)).title()
+        links = []
+        for k in range(self.fanout):
+            target = rnd.randrange(self.pages)
+            if self.redirect_every and (n * self.fanout + k) % self.redirect_every == 0:
+                links.append(f'<a href="/r/{target}/">{rnd.choice(WORDS)} (moved)</a>')
+            else:
+                links.append(f'<a href="{self.page_path(target)}">{" ".join(rnd.sample(WORDS, 3))}</a>')
+        imgs = "".join(f'<img src="/img/{rnd.randrange(self.image_pool)}.png" alt="{rnd.choice(WORDS)}" '
+                       f'width="300" height="200" loading="lazy">' for _ in range(self.images))
+        paragraphs = []
+        left = self.words
+        while left > 0:
+            count = min(left, rnd.randint(40, 90))
+            words = [rnd.choice(WORDS) for _ in range(count)]
+            paragraphs.append("<p>" + ". ".join(" ".join(words[i:i + 12]).capitalize()
+                                                for i in range(0, count, 12)) + ".</p>")
+            left -= count
+        path = self.page_path(n)
+        return (
+            "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+            f"<title>{title}</title><meta name=\"description\" content=\"{title} - page {n}\">"
+            f"<link rel=\"canonical\" href=\"{path}\"><meta property=\"og:title\" content=\"{title}\">"
+            "<link rel=\"stylesheet\" href=\"/static/site.css\"><script src=\"/static/site.js\" defer></script>"
+            f"</head><body><header><nav><a href=\"/\">Home</a></nav></header><main><h1>{title}</h1>"
+            f"<h2>{rnd.choice(WORDS).title()}</h2>{''.join(paragraphs[:1])}{imgs}"
+            f"<h2>{rnd.choice(WORDS).title()}</h2>{''.join(paragraphs[1:])}"
+            f"<ul>{''.join(f'<li>{a}</li>' for a in links)}</ul></main>"
+            "<footer>&copy; 2025 Synthetic</footer></body></html>"
+        ).encode("utf-8")
+
+    def image_bytes(self, n: int) -> bytes:
+        return b"\x89PNG\r\n\x1a\n" + bytes(2_000 + (n * 997) % 60_000)
+
+    def robots_txt(self) -> bytes:
+        lines = ["User-agent: *", "Disallow: /private/"]
+        if self.sitemap:
+            lines.append(f"Sitemap: {self.url}sitemap.xml")
+        return ("\n".join(lines) + "\n").encode()
+
+    def sitemap_xml(self, chunk: int | None) -> bytes:
+        ns = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+        if chunk is None:
+            parts = [f"<sitemap><loc>{self.url}sitemap-{c}.xml</loc></sitemap>"
+                     for c in range((self.pages + SITEMAP_CHUNK - 1) // SITEMAP_CHUNK)]
+            return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {ns}>{"".join(parts)}</sitemapindex>'.encode()
+        first = chunk * SITEMAP_CHUNK
+        parts = [f"<url><loc>{self.url.rstrip('/')}{self.page_path(n)}</loc><lastmod>{self.lastmod(n)}</lastmod></url>"
+                 for n in range(first, min(self.pages, first + SITEMAP_CHUNK))]
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset {ns}>{"".join(parts)}</urlset>'.encode()
+
+    def _throttle(self) -> bool:
+        if not self.throttle_every:
+            return False
+        with self._lock:
+            self._html_count += 1
+            return self._html_count % self.throttle_every == 0
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # clients closing keep-alive sockets
+            super().handle_error(request, client_address)
+
+
+def _page_number(path: str, prefix: str) -> int | None:
+    rest = path[len(prefix):].strip("/")
+    return int(rest) if rest.isdigit() else None
+
+
+def _handler_for(site: SyntheticSite):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like real servers
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(head=True)
+
+        def do_GET(self, head=False):
+            path = self.path.split("?", 1)[0]
+            if path == "/robots.txt":
+                return self._send("robots", 200, site.robots_txt(), "text/plain", head)
+            if site.sitemap and path == "/sitemap.xml":
+                return self._send("sitemap", 200, site.sitemap_xml(None), "application/xml", head)
+            if site.sitemap and path.startswith("/sitemap-") and path.endswith(".xml"):
+                chunk = path[len("/sitemap-"):-len(".xml")]
+                if chunk.isdigit():
+                    return self._send("sitemap", 200, site.sitemap_xml(int(chunk)), "application/xml", head)
+            if path.startswith("/img/"):
+                n = _page_number(path.removesuffix(".png"), "/img/")
+                if n is not None:
+                    return self._send("image", 200, site.image_bytes(n), "image/png", head)
+            if path.startswith("/static/"):
+                return self._send("asset", 200, b"/* synthetic */\n" * 64, "text/css", head)
+            if path.startswith("/r/"):
+                n = _page_number(path, "/r/")
+                if n is not None and n < site.pages:
+                    return self._send("redirect", 301, b"", "text/html", head,
+                                      {"Location": site.page_path(n)})
+            n = 0 if path == "/" else _page_number(path, "/p/") if path.startswith("/p/") else None
+            if n is not None and n < site.pages:
+                if site._throttle():
+                    return self._send("throttled", 429, b"Too Many Requests", "text/plain", head,
+                                      {"Retry-After": str(site.retry_after)})
+                return self._send("page", 200, site.page_html(n), "text/html; charset=utf-8", head)
+            return self._send("not_found", 404, b"Not Found", "text/plain", head)
+
+        def _send(self, kind, status, body, content_type, head, headers=None):
+            with site._lock:
+                site.requests[kind] += 1
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--pages", type=int, default=500)
+    ap.add_argument("--fanout", type=int, default=8)
+    ap.add_argument("--images", type=int, default=4)
+    ap.add_argument("--words", type=int, default=300)
+    ap.add_argument("--redirect-every", type=int, default=0)
+    ap.add_argument("--throttle-every", type=int, default=0)
+    ap.add_argument("--retry-after", type=int, default=0)
+    ap.add_argument("--no-sitemap", action="store_true")
+    args = ap.parse_args()
+    site = SyntheticSite(pages=args.pages, fanout=args.fanout, images=args.images, words=args.words,
+                         redirect_every=args.redirect_every, throttle_every=args.throttle_every,
+                         retry_after=args.retry_after, sitemap=not args.no_sitemap, port=args.port)
+    print(f"Serving {args.pages} pages at {site.url} (Ctrl+C to stop)")
+    try:
+        site._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
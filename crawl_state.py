@@ -0,0 +1,221 @@
+# crawl_state.py
+"""
+SQLite-backed crawl state so an interrupted crawl_pages run can be resumed.
+
+The frontier (every URL ever queued, its referer and whether it has been
+handled), the crawled pages (extraction results, discovered links, redirect
+info) and the crawl parameters live in one SQLite file per crawl id. Writes
+are buffered in memory and flushed in a single transaction every
+`checkpoint_every` pages or `checkpoint_interval` seconds, whichever first.
+
+RecrawlCache is the cross-run counterpart used for incremental re-crawls.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    url     TEXT NOT NULL UNIQUE,
+    referer TEXT,
+    done    INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS pages (
+    seq            INTEGER PRIMARY KEY AUTOINCREMENT,
+    url            TEXT NOT NULL UNIQUE,
+    page_name      TEXT,
+    out_dir        TEXT,
+    final_url      TEXT,
+    redirect_chain TEXT,
+    data           TEXT,
+    links          TEXT
+);
+"""
+
+
+def state_path(state_dir: str, crawl_id: str) -> str:
+    return os.path.join(state_dir, f"{crawl_id}.sqlite")
+
+
+class CrawlState:
+    def __init__(self, path: str, checkpoint_every: int = 50, checkpoint_interval: float = 10.0):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.checkpoint_interval = checkpoint_interval
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._new_frontier = []   # (url, referer)
+        self._done = []           # (url,)
+        self._pages = []          # page rows
+        self._last_flush = time.monotonic()
+
+    # ---------- meta ----------
+
+    def save_meta(self, **values):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v)) for k, v in values.items()],
+            )
+
+    def load_meta(self) -> dict:
+        return {k: json.loads(v) for k, v in self._db.execute("SELECT key, value FROM meta")}
+
+    def has_frontier(self) -> bool:
+        return self._db.execute("SELECT 1 FROM frontier LIMIT 1").fetchone() is not None
+
+    # ---------- buffered writes ----------
+
+    def enqueue(self, url: str, referer: str | None):
+        self._new_frontier.append((url, referer))
+
+    def mark_done(self, url: str):
+        self._done.append((url,))
+
+    def add_page(self, url: str, page_name: str, out_dir: str, page_data: dict,
+                 final_url: str = "", redirect_chain=None):
+        data = {k: v for k, v in page_data.items() if k != "links"}
+        self._pages.append((
+            url, page_name, out_dir, final_url,
+            json.dumps(redirect_chain or []),
+            json.dumps(data, ensure_ascii=False, default=str),
+            json.dumps(page_data.get("links", []), ensure_ascii=False),
+        ))
+        self._done.append((url,))
+
+    def maybe_checkpoint(self):
+        due = (len(self._pages) >= self.checkpoint_every
+               or time.monotonic() - self._last_flush >= self.checkpoint_interval)
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self):
+        if self._new_frontier or self._done or self._pages:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO frontier (url, referer) VALUES (?, ?)", self._new_frontier)
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO pages (url, page_name, out_dir, final_url, redirect_chain, data, links) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", self._pages)
+                self._db.executemany("UPDATE frontier SET done = 1 WHERE url = ?", self._done)
+            self._new_frontier, self._done, self._pages = [], [], []
+        self._last_flush = time.monotonic()
+
+    # ---------- restore ----------
+
+    def iter_frontier(self):
+        """Yield (url, referer, done) in enqueue order."""
+        yield from self._db.execute("SELECT url, referer, done FROM frontier ORDER BY seq")
+
+    def iter_pages(self):
+        """Yield (url, page_name, out_dir, page_data) in crawl order, links included."""
+        for url, page_name, out_dir, data, links in self._db.execute(
+                "SELECT url, page_name, out_dir, data, links FROM pages ORDER BY seq"):
+            page_data = json.loads(data)
+            page_data["links"] = json.loads(links)
+            yield url, page_name, out_dir, page_data
+
+    def redirects(self):
+        """Yield (url, final_url, redirect_chain) for pages that were redirected."""
+        for url, final_url, chain in self._db.execute(
+                "SELECT url, final_url, redirect_chain FROM pages WHERE redirect_chain != '[]' ORDER BY seq"):
+            yield url, final_url, json.loads(chain)
+
+    def close(self):
+        self.checkpoint()
+        self._db.close()
+
+
+_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS validators (
+    url           TEXT PRIMARY KEY,
+    signature     TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    content_hash  TEXT,
+    size          INTEGER,
+    data          TEXT,
+    links         TEXT,
+    fetched_at    REAL
+);
+"""
+
+
+class RecrawlCache:
+    """
+    Per-URL validators (ETag / Last-Modified), content hash and the last extraction,
+    kept across runs so an incremental crawl can send conditional GETs and reuse the
+    previous results on a 304 (or on an identical body).
+
+    `signature` identifies the extraction settings (crawl types + keywords); cached
+    results are only reused by a crawl with the same signature. Lookups may come from
+    fetch worker threads; writes are buffered and flushed every `flush_every` records.
+    """
+
+    def __init__(self, path: str, flush_every: int = 50):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_CACHE_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def lookup(self, url: str, signature: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, content_hash, size FROM validators WHERE url = ? AND signature = ?",
+                (url, signature)).fetchone()
+        if not row:
+            return None
+        etag, last_modified, content_hash, size = row
+        return {"etag": etag, "last_modified": last_modified, "content_hash": content_hash, "size": size}
+
+    def load_page(self, url: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT data, links FROM validators WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        page_data = json.loads(row[0])
+        page_data["links"] = json.loads(row[1])
+        return page_data
+
+    def record(self, url: str, signature: str, info: dict, page_data: dict):
+        data = {k: v for k, v in page_data.items() if k != "links"}
+        with self._lock:
+            self._pending.append((
+                url, signature, info.get("etag", ""), info.get("last_modified", ""),
+                info.get("content_hash", ""), info.get("size", 0),
+                json.dumps(data, ensure_ascii=False, default=str),
+                json.dumps(page_data.get("links", []), ensure_ascii=False),
+                time.time(),
+            ))
+            due = len(self._pending) >= self.flush_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO validators "
+                    "(url, signature, etag, last_modified, content_hash, size, data, links, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        self._db.close()
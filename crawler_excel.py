@@ -1,16 +1,38 @@
 # crawler_excel.py
-import os, re, time, random, logging, hashlib, zipfile, pathlib
+import os, re, io, gzip, json, time, random, logging, hashlib, zipfile, pathlib, threading, uuid
 from email.utils import parsedate_to_datetime
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+from contextlib import nullcontext
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse, urlunparse
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
-from collections import deque, defaultdict
+from collections import deque, defaultdict, Counter
+from queue import Queue, Full
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
 import textstat
 import xml.etree.ElementTree as ET
 
+from page_analyzer import PageAnalysis, make_soup, HTML_PARSER
+from page_store import URL_INFO_COLUMNS, PageSpill, SectionHeaders, _tuples_to_dicts
+from crawl_state import CrawlState, RecrawlCache, state_path
+from asset_probe import ProbeCache
+from near_dup import NearDupIndex, SIGNATURE_KEY, simhash
+from link_graph import LinkGraph
+from robots_policy import RobotsPolicy
+from frontier import Frontier
+from crawl_priority import ANCHORS_KEY, SEED_FACTOR, SITEMAP_DEPTH, LinkScorer
+from rate_control import AdaptiveRate, HostUnavailable
+from zip_stream import compress_type_for
+from export_sinks import ExportSink, check_formats, open_sinks, register_sink
+from background_writer import BackgroundWriter
+from response_archive import ArchiveReader, ArchiveWriter, ArchivedProbes, read_payload
+from metrics import (ACTIVE_CRAWLS, BYTES_DOWNLOADED, EXCEL_WRITE_SECONDS, FETCH_ERRORS, FETCH_RETRIES,
+                     FETCH_SECONDS, FRONTIER_PENDING, HTTP_RESPONSES, PAGES, PARSE_SECONDS)
+from profiling import CrawlProfiler, record, stage
+from transport import RECORD, REPLAY, Cassette, active as active_cassette, http_adapter, replaying
+
 logging.basicConfig(level=logging.INFO)
 
 # ----------------------------- HTTP SESSION -----------------------------
@@ -29,20 +51,104 @@ HEADERS = {
 SESSION = requests.Session()
 SESSION.headers.update(HEADERS)
 SESSION.max_redirects = 5  # defensive
+# Shared by every crawl in the process, so its pool is sized once for the highest
+# concurrency crawl_pages allows instead of being remounted under running crawls
+MAX_CONCURRENCY = int(os.environ.get("SCRAPER_MAX_CONCURRENCY", "32"))
+_SESSION_ADAPTER = http_adapter(pool_connections=MAX_CONCURRENCY, pool_maxsize=MAX_CONCURRENCY)
+SESSION.mount("http://", _SESSION_ADAPTER)
+SESSION.mount("https://", _SESSION_ADAPTER)
+
+# requests/min used while replaying a cassette (transport.py): effectively unpaced
+REPLAY_RPM = 1_000_000
+# open-circuit pauses (HostUnavailable) a crawl waits out in a row before it stops
+MAX_HOST_PAUSES = 3
+
+class HostTokenBucket:
+    """Thread-safe single-token bucket that paces requests to one host.
+
+    The refill interval is 60/rpm seconds, never faster than ``floor_interval``
+    (robots.txt Crawl-delay). Callers reserve the next free slot under the lock
+    and sleep outside it, so concurrent workers queue up instead of bursting.
+    With an ``adaptive`` AdaptiveRate attached, its rpm replaces the caller's and
+    its pauses (Retry-After, open circuit) hold the next slot back.
+
+    Buckets are shared by every crawl of the host in this process; each crawl
+    join()s for as long as it runs. The floor is the largest Crawl-delay among
+    the running crawls, and the first controller attached stays until the last
+    of them leave()s, so a second crawl shares the pacing instead of resetting it.
+    """
 
-# Per-host last-request timestamps for polite pacing
-_LAST_REQ_TS = defaultdict(lambda: 0.0)
+    def __init__(self):
+        self.floor_interval = 0.0
+        self.adaptive: AdaptiveRate | None = None
+        self._lock = threading.Lock()
+        self._last = 0.0
+        self._floors = []  # Crawl-delay floor of each running crawl (0.0: none)
+
+    def interval(self, rpm: int) -> float:
+        return max(60.0 / max(1, rpm), self.floor_interval)
+
+    def reserve(self, rpm: int, jitter_ratio: float = 0.25) -> float:
+        """Claim the next token and return how many seconds to wait for it."""
+        adaptive = self.adaptive
+        min_interval = self.interval(adaptive.rpm if adaptive else rpm)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._last + min_interval)
+            if adaptive:
+                if adaptive.unavailable_for(now) > 0:
+                    raise HostUnavailable(f"{adaptive.host} is paused after repeated failures")
+                slot = max(slot, adaptive.paused_until)
+            if slot > now:
+                slot += random.uniform(0, min_interval * jitter_ratio)
+            self._last = slot
+        return slot - now
+
+    def take(self, rpm: int, jitter_ratio: float = 0.25):
+        wait = self.reserve(rpm, jitter_ratio)
+        if wait > 0:
+            time.sleep(wait)
 
-def _sleep_for_rate_limit(url: str, rpm: int, jitter_ratio: float = 0.25):
-    """Simple per-host pacing: ensures ~rpm requests per minute per host, with jitter."""
+    def join(self, adaptive: AdaptiveRate | None = None, floor_interval: float = 0.0) -> AdaptiveRate | None:
+        """Register a running crawl; returns the controller in effect (maybe another crawl's)."""
+        with self._lock:
+            self._floors.append(floor_interval)
+            self.floor_interval = max(self._floors)
+            if self.adaptive is None:
+                self.adaptive = adaptive
+            return self.adaptive
+
+    def leave(self, floor_interval: float = 0.0):
+        with self._lock:
+            self._floors.remove(floor_interval)
+            self.floor_interval = max(self._floors, default=0.0)
+            if not self._floors:
+                self.adaptive = None
+
+    def record(self, status: int, latency: float, retry_after_header: str = ""):
+        """Feed a response back to the adaptive controller (no-op without one, or on
+        cassette replay, where recorded 429s and latencies must not slow the run down)."""
+        if self.adaptive and not replaying():
+            self.adaptive.on_response(status, latency, _parse_retry_after(retry_after_header))
+
+    def record_error(self):
+        if self.adaptive and not replaying():
+            self.adaptive.on_error()
+
+_HOST_BUCKETS: dict[str, HostTokenBucket] = {}
+_HOST_BUCKETS_LOCK = threading.Lock()
+
+def _host_bucket(url: str) -> HostTokenBucket:
     host = urlparse(url).netloc
-    min_interval = 60.0 / max(1, rpm)
-    now = time.monotonic()
-    elapsed = now - _LAST_REQ_TS[host]
-    if elapsed < min_interval:
-        jitter = random.uniform(0, min_interval * jitter_ratio)
-        time.sleep((min_interval - elapsed) + jitter)
-    _LAST_REQ_TS[host] = time.monotonic()
+    with _HOST_BUCKETS_LOCK:
+        bucket = _HOST_BUCKETS.get(host)
+        if bucket is None:
+            bucket = _HOST_BUCKETS[host] = HostTokenBucket()
+        return bucket
+
+def _sleep_for_rate_limit(url: str, rpm: int, jitter_ratio: float = 0.25):
+    """Per-host pacing: ensures ~rpm requests per minute per host, with jitter."""
+    _host_bucket(url).take(rpm, jitter_ratio)
 
 def _parse_retry_after(header_val: str) -> float | None:
     """Return seconds to wait from Retry-After header (either seconds or HTTP-date)."""
@@ -59,24 +165,28 @@ def _parse_retry_after(header_val: str) -> float | None:
     except Exception:
         return None
 
+def _retry_wait(retry_after_header: str, tries: int) -> float:
+    """Seconds to back off after the Nth 429/503: Retry-After if given, else exponential."""
+    retry_after = _parse_retry_after(retry_after_header)
+    base = max(0.5, retry_after) if retry_after is not None else min(8.0, (2 ** (tries - 1)))
+    return base + random.uniform(0.2, 0.8)
+
 def _base_host(h: str) -> str:
     h = (h or "").lower()
     return h[4:] if h.startswith("www.") else h
 
-CANON_HOST = None  # pinned canonical host set in crawl_pages()
-
 def same_domain(url, root):
     u = _base_host(urlparse(url).hostname or "")
     r = _base_host(urlparse(root).hostname or "")
     return u == r or u.endswith("." + r)
 
-def _pin_host(u: str) -> str:
-    """Force links to use the original start_url host (prevents www <-> apex flip 404)."""
-    if not CANON_HOST:
+def _pin_host(u: str, canon_host: str | None) -> str:
+    """Force links to use the crawl's start_url host (prevents www <-> apex flip 404)."""
+    if not canon_host:
         return u
     p = urlparse(u)
-    if _base_host(p.netloc) == _base_host(CANON_HOST) and p.netloc != CANON_HOST:
-        p = p._replace(netloc=CANON_HOST)
+    if _base_host(p.netloc) == _base_host(canon_host) and p.netloc != canon_host:
+        p = p._replace(netloc=canon_host)
     return urlunparse(p)
 
 # Skip assets / utility URLs so we don't waste requests
@@ -96,7 +206,7 @@ def _is_crawlable_http_url(u: str) -> bool:
         return False
     return True
 
-def _normalize(u: str) -> str:
+def _normalize(u: str, canon_host: str | None = None) -> str:
     p = urlparse(u)
     path = re.sub(r"/{2,}", "/", p.path or "/")
     # Only add trailing slash if path looks like a directory (no file extension)
@@ -104,50 +214,106 @@ def _normalize(u: str) -> str:
         if not re.search(r"/[^/]+\.[A-Za-z0-9]{1,8}$", path):
             path += "/"
     p = p._replace(path=path)
-    return _pin_host(urlunparse(p))
+    return _pin_host(urlunparse(p), canon_host)
+
+_ROBOTS = {}  # robots.txt URL -> (fetched_at, text, RobotsPolicy)
+_ROBOTS_TTL = 3600
+_ROBOTS_RETRY = 60  # seconds before an unreachable robots.txt is tried again
+_ROBOTS_UNREACHABLE = {}  # robots.txt URL -> time of the failed fetch
+_ROBOTS_LOCK = threading.Lock()
+
+def _robots(url: str):
+    """
+    (robots.txt text, compiled RobotsPolicy) for the URL's host, cached for an hour.
+
+    As RFC 9309 says, a 4xx means there are no rules (allow all), while a 5xx or a
+    network error means the host is unreachable and nothing may be crawled. That
+    answer is not cached: the last good copy is used if there is one, else
+    disallow-all, and the fetch is retried after _ROBOTS_RETRY seconds.
+    HostUnavailable (the host's circuit is open) is raised to the caller.
+    """
+    robots_url = urljoin(url, "/robots.txt")
+    with _ROBOTS_LOCK:
+        hit = _ROBOTS.get(robots_url)
+        failed_at = _ROBOTS_UNREACHABLE.get(robots_url)
+    if hit and time.time() - hit[0] < _ROBOTS_TTL:
+        return hit[1], hit[2]
+    if failed_at is None or time.time() - failed_at >= _ROBOTS_RETRY:
+        try:
+            _sleep_for_rate_limit(robots_url, rpm=30)
+            r = SESSION.get(robots_url, timeout=10)
+        except HostUnavailable:
+            raise
+        except requests.RequestException as e:
+            logging.warning(f"robots.txt unreachable at {robots_url} ({e})")
+            r = None
+        if r is not None and r.status_code < 500:
+            text = (r.text or "") if r.ok else ""  # 4xx: no rules
+            policy = RobotsPolicy.parse(text)
+            with _ROBOTS_LOCK:
+                _ROBOTS[robots_url] = (time.time(), text, policy)
+                _ROBOTS_UNREACHABLE.pop(robots_url, None)
+            return text, policy
+        if r is not None:
+            logging.warning(f"robots.txt at {robots_url} answered HTTP {r.status_code}")
+        with _ROBOTS_LOCK:
+            _ROBOTS_UNREACHABLE[robots_url] = time.time()
+    if hit:
+        return hit[1], hit[2]
+    return "", RobotsPolicy.disallow_all()
+
+def _robots_txt(start_url: str) -> str:
+    return _robots(start_url)[0]
+
+def robots_policy(url: str) -> RobotsPolicy:
+    """Allow/Disallow rules that apply to `url`'s host."""
+    return _robots(url)[1]
+
+def _robots_sitemaps(start_url: str) -> list[str]:
+    """Sitemap: URLs declared in robots.txt (any user-agent group)."""
+    out = []
+    for raw in _robots_txt(start_url).splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if line.lower().startswith("sitemap:"):
+            loc = line.split(":", 1)[1].strip()
+            if loc:
+                out.append(urljoin(start_url, loc))
+    return out
 
 def _get_robots_crawl_delay(start_url: str) -> float | None:
-    """Very small robots.txt parser to honor Crawl-delay if present."""
+    """Crawl-delay for the "*" group, if robots.txt sets one."""
     try:
-        robots_url = urljoin(start_url, "/robots.txt")
-        _sleep_for_rate_limit(robots_url, rpm=30)
-        r = SESSION.get(robots_url, timeout=10)
-        if not r.ok or not r.text:
-            return None
-        ua = None
-        delay_for_star = None
-        for raw in r.text.splitlines():
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            if line.lower().startswith("user-agent:"):
-                ua = line.split(":", 1)[1].strip().lower()
-                continue
-            if line.lower().startswith("crawl-delay:"):
-                try:
-                    val = float(line.split(":", 1)[1].strip())
-                except Exception:
-                    continue
-                if ua in (None, "", "*"):
-                    delay_for_star = val
-        return delay_for_star
-    except Exception:
-        return None
+        return robots_policy(start_url).crawl_delay
+    except HostUnavailable:
+        return None  # the crawl waits the pause out before its first request
 
 def fetch(url: str, timeout: int = 15, max_hops: int = 10, max_retries: int = 4,
-          rate_limit_rpm: int = 12, referer: str | None = None):
+          rate_limit_rpm: int = 12, referer: str | None = None, extra_headers: dict | None = None):
+    """extra_headers (e.g. If-None-Match) are sent on the first hop only."""
     cur = url
     hops = 0
     tries = 0
     chain = []  # collect (status, from, to)
 
     while True:
-        _sleep_for_rate_limit(cur, rpm=rate_limit_rpm)
+        bucket = _host_bucket(cur)
+        with stage("rate_wait"):
+            bucket.take(rate_limit_rpm)
         headers = SESSION.headers.copy()
         if referer:
             headers["Referer"] = referer
+        if extra_headers and hops == 0:
+            headers.update(extra_headers)
 
-        r = SESSION.get(cur, timeout=timeout, allow_redirects=False, headers=headers)
+        try:
+            with stage("fetch", FETCH_SECONDS, backend="requests"):
+                r = SESSION.get(cur, timeout=timeout, allow_redirects=False, headers=headers)
+        except requests.RequestException:
+            FETCH_ERRORS.inc(backend="requests")
+            bucket.record_error()
+            raise
+        HTTP_RESPONSES.inc(code=r.status_code)
+        bucket.record(r.status_code, r.elapsed.total_seconds(), r.headers.get("Retry-After", ""))
 
         if 300 <= r.status_code < 400 and hops < max_hops:
             loc = r.headers.get("Location")
@@ -164,10 +330,10 @@ def fetch(url: str, timeout: int = 15, max_hops: int = 10, max_retries: int = 4,
 
         if r.status_code in (429, 503):
             tries += 1
-            retry_after = _parse_retry_after(r.headers.get("Retry-After", ""))
-            wait = (max(0.5, retry_after) if retry_after is not None else min(8.0, (2 ** (tries - 1)))) + random.uniform(0.2, 0.8)
-            time.sleep(wait)
+            if not bucket.adaptive:  # the adaptive bucket already holds the next request back
+                time.sleep(_retry_wait(r.headers.get("Retry-After", ""), tries))
             if tries < max_retries:
+                FETCH_RETRIES.inc(code=r.status_code)
                 continue
 
         r._redirect_chain = chain
@@ -216,61 +382,138 @@ def get_output_directory(url, base_out_dir="output_excels"):
 # ----------------------------- SITEMAP DISCOVERY -----------------------------
 
 SITEMAP_HINTS = ("/sitemap_index.xml", "/sitemap.xml", "/news-sitemap.xml")
+_SITEMAP_BATCH = 200   # URLs handed from a sitemap worker to the consumer at a time
+_SITEMAP_PREFETCH = 8  # batches a worker may parse ahead of the consumer
 
-def _get_text(e, name):
-    t = e.find(name)
-    return (t.text or "").strip() if t is not None else ""
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
 
-def discover_urls_from_sitemaps(root_url: str) -> list[str]:
-    """Fetch sitemap index and child sitemaps, return a list of URLs (best effort)."""
-    found = []
+def _stream_sitemap(sm_url: str, rate_limit_rpm: int = 12, timeout: int = 12):
+    """
+    Yield ("sitemap" | "url", loc, lastmod) from one sitemap while it downloads.
+    Gzip is detected by magic bytes, so .xml.gz files work whatever their headers say.
+    """
+    _sleep_for_rate_limit(sm_url, rpm=rate_limit_rpm)
+    with SESSION.get(sm_url, timeout=timeout, allow_redirects=True, stream=True) as r:
+        if not r.ok:
+            return
+        r.raw.decode_content = True
+        r.raw.auto_close = False  # let io.BufferedReader see EOF instead of a closed file
+        stream = io.BufferedReader(r.raw)
+        if stream.peek(2)[:2] == b"\x1f\x8b":
+            stream = gzip.GzipFile(fileobj=stream)
+        root = None
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if root is None:
+                root = elem
+                continue
+            if event != "end":
+                continue
+            kind = _local_name(elem.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            loc = lastmod = ""
+            for child in elem:
+                name = _local_name(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = (child.text or "").strip()
+            root.clear()  # drop parsed entries so memory stays flat
+            if loc:
+                yield kind, loc, lastmod
+
+def iter_sitemap_entries(root_url: str, rate_limit_rpm: int = 12, max_workers: int = 4):
+    """
+    Yield (url, lastmod) for every crawlable same-site URL in the site's sitemaps,
+    as they are parsed. Sources: robots.txt Sitemap: lines plus SITEMAP_HINTS; child
+    sitemaps of an index are fetched concurrently (pacing still goes through the host
+    bucket). URLs come out in discovery order, normalized and de-duplicated. Closing
+    the generator early stops the workers.
+    """
     base = urlparse(root_url)
     base_root = f"{base.scheme}://{base.netloc}"
-    to_try = [urljoin(base_root, h) for h in SITEMAP_HINTS]
-
-    for sm in list(to_try):
-        try:
-            _sleep_for_rate_limit(sm, rpm=12)
-            r = SESSION.get(sm, timeout=12, allow_redirects=True)
-            if not r.ok or not r.text.lstrip().startswith("<?xml"):
+    roots = _robots_sitemaps(root_url) + [urljoin(base_root, h) for h in SITEMAP_HINTS]
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    scheduled = set()
+    channels = deque()  # one bounded queue per sitemap, consumed in scheduling order
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sitemap")
+
+    def put(channel, item):
+        while not stop.is_set():
+            try:
+                channel.put(item, timeout=0.5)
+                return True
+            except Full:
                 continue
-            root = ET.fromstring(r.text)
-            tag = root.tag.lower()
-            ns = ""
-            if tag.startswith("{"):
-                ns = tag.split("}", 1)[0] + "}"
-            # sitemap index
-            if root.tag.endswith("sitemapindex"):
-                for s in root.findall(f".//{ns}sitemap"):
-                    loc = _get_text(s, f"{ns}loc")
-                    if loc:
-                        to_try.append(loc)
-            # urlset
-            elif root.tag.endswith("urlset"):
-                for u in root.findall(f".//{ns}url"):
-                    loc = _get_text(u, f"{ns}loc")
-                    if loc and _is_crawlable_http_url(loc):
-                        found.append(loc)
-        except Exception:
-            continue
+        return False
 
-    # de-dupe and pin host
+    def work(sm, channel):
+        batch = []
+        try:
+            for kind, loc, lastmod in _stream_sitemap(sm, rate_limit_rpm=rate_limit_rpm):
+                if stop.is_set():
+                    return
+                if kind == "sitemap":
+                    schedule(urljoin(sm, loc))
+                    continue
+                batch.append((loc, lastmod))
+                if len(batch) >= _SITEMAP_BATCH:
+                    if not put(channel, batch):
+                        return
+                    batch = []
+        except Exception as e:
+            logging.debug(f"Sitemap {sm} skipped: {e}")
+        finally:
+            if batch:
+                put(channel, batch)
+            put(channel, None)
+
+    def schedule(sm):
+        with lock:
+            if sm in scheduled:
+                return
+            scheduled.add(sm)
+            channel = Queue(maxsize=_SITEMAP_PREFETCH)
+            channels.append(channel)
+        pool.submit(work, sm, channel)
+
+    for sm in roots:
+        schedule(sm)
+
+    # A worker schedules its children before it closes its own channel, so once every
+    # known channel is drained there is nothing left to come.
     seen = set()
-    out = []
-    for u in found:
-        nu = _normalize(u)
-        if nu not in seen and same_domain(nu, root_url):
-            out.append(nu); seen.add(nu)
-    return out
+    try:
+        while channels:
+            channel = channels.popleft()
+            while (batch := channel.get()) is not None:
+                for loc, lastmod in batch:
+                    if not _is_crawlable_http_url(loc):
+                        continue
+                    nu = _normalize(loc, base.netloc)
+                    if nu not in seen and same_domain(nu, root_url):
+                        seen.add(nu)
+                        yield nu, lastmod
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def discover_urls_from_sitemaps(root_url: str) -> list[str]:
+    """Fetch sitemap index and child sitemaps, return a list of URLs (best effort)."""
+    return [u for u, _ in iter_sitemap_entries(root_url)]
 
 # ----------------------------- SCRAPERS -----------------------------
 
-def scrape_html_content(soup, base_url, pattern=None):
+def scrape_html_content(soup, base_url, pattern=None, page=None):
+    page = page or PageAnalysis(soup)
     def match(text): return not pattern or (text and pattern.search(text.lower()))
     def match_alt(alt): return not pattern or (alt and pattern.search(alt.lower()))
 
     images = []
-    for i in soup.find_all("img"):
+    for i in page.tags("img"):
         src = i.get("src")
         if not src:
             continue
@@ -278,51 +521,67 @@ def scrape_html_content(soup, base_url, pattern=None):
     if pattern:
         images = [d for d in images if match_alt(d["alt"])]
 
+    def texts(name):
+        out = []
+        for t in page.tags(name):
+            text = t.get_text()
+            if match(text):
+                out.append(clean(text))
+        return out
+
     return {
-        "h1": [clean(t.get_text()) for t in soup.find_all("h1") if match(t.get_text())],
-        "h2": [clean(t.get_text()) for t in soup.find_all("h2") if match(t.get_text())],
-        "h3": [clean(t.get_text()) for t in soup.find_all("h3") if match(t.get_text())],
-        "h4": [clean(t.get_text()) for t in soup.find_all("h4") if match(t.get_text())],
-        "h5": [clean(t.get_text()) for t in soup.find_all("h5") if match(t.get_text())],
-        "h6": [clean(t.get_text()) for t in soup.find_all("h6") if match(t.get_text())],
-        "p":  [clean(p.get_text()) for p in soup.find_all("p")  if match(p.get_text())],
+        "h1": texts("h1"),
+        "h2": texts("h2"),
+        "h3": texts("h3"),
+        "h4": texts("h4"),
+        "h5": texts("h5"),
+        "h6": texts("h6"),
+        "p":  texts("p"),
         "images": images,
     }
 
-def scrape_url_info(resp, soup):
-    title = soup.title.get_text(strip=True) if soup.title else ""
-    metas = {m.get("name", "").lower(): m.get("content", "") for m in soup.find_all("meta") if m.get("name")}
-    canonical = [l.get("href") for l in soup.find_all("link", rel="canonical")]
+_REFRESH_RE = re.compile("refresh", re.I)
+_MOBILE_RE = re.compile("mobile", re.I)
+
+def scrape_url_info(resp, soup, page=None):
+    page = page or PageAnalysis(soup)
+    title_tag = page.first("title")
+    title = title_tag.get_text(strip=True) if title_tag else ""
+    metas = {m.get("name", "").lower(): m.get("content", "") for m in page.tags("meta") if m.get("name")}
+    canonical = [l.get("href") for l in page.tags("link", rel="canonical")]
     robots = metas.get("robots", "")
     desc = metas.get("description", "")
-    words = len(soup.get_text().split())
-    sentences = max(soup.get_text().count(".") or 1, 1)
+    page_text = page.text
+    words = len(page_text.split())
+    sentences = max(page_text.count(".") or 1, 1)
 
-    h2_tags = [h2.get_text(strip=True) for h2 in soup.find_all("h2")]
+    h2_tags = [h2.get_text(strip=True) for h2 in page.tags("h2")]
     h2_1 = h2_tags[0] if len(h2_tags) > 0 else ""
     h2_2 = h2_tags[1] if len(h2_tags) > 1 else ""
 
     meta_refresh = ""
-    meta_refresh_tag = soup.find("meta", attrs={"http-equiv": re.compile("refresh", re.I)})
+    meta_refresh_tag = page.first("meta", **{"http-equiv": _REFRESH_RE})
     if meta_refresh_tag:
         meta_refresh = meta_refresh_tag.get("content", "")
 
-    rel_next = soup.find("link", rel="next")
-    rel_prev = soup.find("link", rel="prev")
-    amp_link = soup.find("link", rel="amphtml")
+    rel_next = page.first("link", rel="next")
+    rel_prev = page.first("link", rel="prev")
+    amp_link = page.first("link", rel="amphtml")
+    h1_tag = page.first("h1")
 
-    all_links = [a.get("href") for a in soup.find_all("a", href=True)]
+    all_links = [a.get("href") for a in page.tags("a", href=True)]
     base = urlparse(resp.url).netloc
     absolute_links = [urljoin(resp.url, a) for a in all_links]
     internal_links = [u for u in absolute_links if urlparse(u).netloc == base]
     external_links = [u for u in absolute_links if urlparse(u).netloc != base]
 
     html_length = len(resp.text)
-    visible_text = len(soup.get_text())
+    visible_text = len(page_text)
     text_ratio = round((visible_text / html_length) * 100, 2) if html_length else 0
 
     try:
-        flesch = round(textstat.flesch_reading_ease(soup.get_text()), 2)
+        with stage("textstat"):
+            flesch = round(textstat.flesch_reading_ease(page_text), 2)
         readability_label = (
             "Very Easy" if flesch > 90 else
             "Easy" if flesch > 80 else
@@ -339,7 +598,7 @@ def scrape_url_info(resp, soup):
     carbon_rating = ("A" if co2_mg < 100 else "B" if co2_mg < 200 else
                      "C" if co2_mg < 300 else "D" if co2_mg < 400 else "E")
 
-    mobile_alt = soup.find("link", rel="alternate", media=re.compile("mobile", re.I))
+    mobile_alt = page.first("link", rel="alternate", media=_MOBILE_RE)
     semantic_similarity = len(set([w.lower() for w in title.split()]) & set([w.lower() for w in desc.split()]))
 
     status_map = {200: "OK", 301: "Moved Permanently", 302: "Moved Temporarily",
@@ -382,8 +641,8 @@ def scrape_url_info(resp, soup):
         "Meta Description 2 Pixel Width": len(metas.get("og:description", "")) * 8,
         "Meta Keywords 1": metas.get("keywords", ""),
         "Meta Keywords 1 Length": len(metas.get("keywords", "")),
-        "H1-1": (soup.h1.get_text(strip=True) if soup.h1 else ""),
-        "H1-1 Length": (len(soup.h1.get_text()) if soup.h1 else 0),
+        "H1-1": (h1_tag.get_text(strip=True) if h1_tag else ""),
+        "H1-1 Length": (len(h1_tag.get_text()) if h1_tag else 0),
         "H2-1": h2_1,
         "H2-1 Length": len(h2_1),
         "H2-2": h2_2,
@@ -414,7 +673,7 @@ def scrape_url_info(resp, soup):
         "Link Score": len(all_links),
         "Inlinks Unique": len(internal_links),
         "Inlinks Unique JS": 0,
-        "Inlinks % of Total": round((len(internal_links) / len(all_links)) * 100, 2) if all_links else 0,
+        "Inlinks % of Total": "",  # filled from the link graph when the crawl ends
         "Outlinks": len(all_links),
         "Unique Outlinks": len(set(all_links)),
         "Unique JS Outlinks": 0,
@@ -444,11 +703,18 @@ def scrape_url_info(resp, soup):
         "Redirect Chain": " -> ".join([f"{status}:{src} => {dst}" for status, src, dst in redirect_chain]),
     }
 
-def scrape_performance(resp, soup):
+def _probe_scope(probes, timeout=10):
+    """(cache, owned): the crawl's ProbeCache, or a throwaway one for a one-off call."""
+    if probes is not None:
+        return probes, False
+    return ProbeCache(timeout=timeout, headers=HEADERS), True
+
+def scrape_performance(resp, soup, page=None, probes=None):
+    page = page or PageAnalysis(soup)
     html_size = len(resp.text)
-    img_tags = soup.find_all("img")
-    js_tags = soup.find_all("script", src=True)
-    css_tags = soup.find_all("link", rel="stylesheet")
+    img_tags = page.tags("img")
+    js_tags = page.tags("script", src=True)
+    css_tags = page.tags("link", rel="stylesheet")
     img_count = len(img_tags)
 
     def parse_width(val):
@@ -462,37 +728,29 @@ def scrape_performance(resp, soup):
 
     large_imgs = [i for i in img_tags if parse_width(i.get("width")) > 2000]
 
-    session = requests.Session()
-    session.headers.update(HEADERS)
-
-    # Check for uncompressed images (sample first 5)
-    uncompressed_images = 0
-    for img in img_tags[:5]:
-        src = urljoin(resp.url, img.get("src", ""))
-        try:
-            r = session.head(src, timeout=10, allow_redirects=True)
-            size = int(r.headers.get("Content-Length", 0))
-            if size >= 500_000:
+    probes, owned = _probe_scope(probes)
+    try:
+        # Check for uncompressed images (sample first 5)
+        uncompressed_images = 0
+        img_srcs = [urljoin(resp.url, img.get("src", "")) for img in img_tags[:5]]
+        for r in probes.probe_many(img_srcs):
+            if r["error"] is None and (r["size"] or 0) >= 500_000:
                 uncompressed_images += 1
-        except Exception:
-            continue
 
-    # Approximate JS/CSS combined asset size (sample first 5)
-    total_asset_size = 0
-    checked = 0
-    for tag in js_tags + css_tags:
-        if checked >= 5:
-            break
-        src = urljoin(resp.url, tag.get("src") or tag.get("href"))
-        try:
-            r = session.head(src, timeout=10, allow_redirects=True)
-            size = int(r.headers.get("Content-Length", 0))
-            total_asset_size += size
-            checked += 1
-        except Exception:
-            continue
-
-    session.close()
+        # Approximate JS/CSS combined asset size (first 5 assets that answer);
+        # probed a batch at a time so failures are topped up from the next assets
+        total_asset_size = 0
+        checked = 0
+        asset_srcs = [urljoin(resp.url, tag.get("src") or tag.get("href")) for tag in js_tags + css_tags]
+        while checked < 5 and asset_srcs:
+            batch, asset_srcs = asset_srcs[:5 - checked], asset_srcs[5 - checked:]
+            for r in probes.probe_many(batch):
+                if r["error"] is None and r["size"] is not None:
+                    total_asset_size += r["size"]
+                    checked += 1
+    finally:
+        if owned:
+            probes.close()
 
     return {
         "Slow Page": html_size > 2_000_000,
@@ -501,34 +759,38 @@ def scrape_performance(resp, soup):
         "Uncompressed Page": not resp.headers.get("Content-Encoding"),
         "Uncompressed Images": uncompressed_images > 0,
         "Too Many Resources": img_count > 100,
-        "Too Many DOM Elements": len(soup.find_all()) > 1500,
+        "Too Many DOM Elements": page.dom_count > 1500,
         "Excessive HTML Size": html_size > 2_000_000,
         "Excessive JS/CSS Size": total_asset_size > 2_000_000,
     }
 
-def scrape_image_analysis(soup, url, timeout=10):
+def scrape_image_analysis(soup, url, timeout=10, page=None, probes=None):
+    page = page or PageAnalysis(soup)
     data = []
-    session = requests.Session()
-    session.headers.update(HEADERS)
+    host = urlparse(url).netloc
+    imgs = [(img, urljoin(url, img.get("src", ""))) for img in page.tags("img")]
+    imgs = [(img, src) for img, src in imgs if urlparse(src).netloc == host]
 
-    for img in soup.find_all("img"):
-        src = urljoin(url, img.get("src", ""))
-        alt = clean(img.get("alt", ""))
-        if urlparse(src).netloc != urlparse(url).netloc:
-            continue
+    probes, owned = _probe_scope(probes, timeout)
+    try:
+        results = probes.probe_many([src for _, src in imgs])
+    finally:
+        if owned:
+            probes.close()
 
+    for (img, src), r in zip(imgs, results):
+        alt = clean(img.get("alt", ""))
         broken, redirected, large_file = False, False, False
         img_size_str = "0 KB"
-        try:
-            r = session.head(src, allow_redirects=True, timeout=timeout)
-            broken = not r.ok
-            redirected = len(r.history) > 0
-            size = int(r.headers.get("Content-Length", 0))
+        if r["error"] is not None:
+            broken = True
+        else:
+            broken = not r["ok"]
+            redirected = r["redirected"]
+            size = r["size"] or 0
             if size > 0:
                 img_size_str = f"{size / 1_000_000:.2f} MB" if size >= 1_000_000 else f"{size / 1024:.0f} KB"
             large_file = size >= 200_000
-        except requests.RequestException:
-            broken = True
 
         entry = {
             "url": src,
@@ -543,25 +805,206 @@ def scrape_image_analysis(soup, url, timeout=10):
         }
         data.append(entry)
 
-    session.close()
     return data
 
 # ----------------------------- MASTER SCRAPER -----------------------------
 
-def scrape_page(url, referer=None, keywords=None, crawl_types=None, rate_limit_rpm=12):
+_PAGINATION_RE = re.compile(r"/page/\d+/?$")
+
+def _fetch_page(url, referer=None, rate_limit_rpm=12, headers=None, canon_host=None):
+    resp = fetch(url, rate_limit_rpm=rate_limit_rpm, referer=referer, extra_headers=headers)
+    # If a host flip produced 404, retry once pinned
+    if resp.status_code == 404 and _base_host(urlparse(resp.url).netloc) != _base_host(urlparse(url).netloc):
+        retry = _pin_host(resp.url, canon_host)
+        resp = fetch(retry, rate_limit_rpm=rate_limit_rpm, referer=referer, extra_headers=headers)
+    resp.raise_for_status()
+    return resp
+
+def _response_info(resp, keep_response=False):
+    """
+    Fetch details the crawler records alongside a page's extraction.
+    keep_response: also carry the response itself, for crawl_pages(archive=...);
+        it is dropped when the page is committed.
+    """
+    info = {
+        "final_url": resp.url,
+        "redirect_chain": [list(hop) for hop in getattr(resp, "_redirect_chain", [])],
+        "status": resp.status_code,
+        "etag": resp.headers.get("ETag", ""),
+        "last_modified": resp.headers.get("Last-Modified", ""),
+        "content_hash": hashlib.md5(resp.content).hexdigest() if resp.status_code != 304 else "",
+        "size": len(resp.content),
+        "reused": "",
+        "bytes_saved": 0,
+    }
+    if keep_response:
+        info["response"] = resp
+    return info
+
+def _validator_headers(entry):
+    """Conditional-GET headers for a RecrawlCache entry (None when there is nothing to send)."""
+    if not entry:
+        return None
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers or None
+
+def _reuse_cached(url, resp, info, cache=None, entry=None):
+    """
+    On a 304, or a body identical to last run's, return the previous extraction from
+    the RecrawlCache (and mark `info` accordingly). Otherwise None.
+    """
+    if entry and (resp.status_code == 304 or info["content_hash"] == entry["content_hash"]):
+        cached = cache.load_page(url)
+        if cached is not None:
+            if resp.status_code == 304:
+                info.update(reused="not_modified", bytes_saved=entry["size"] or 0)
+            else:
+                info["reused"] = "unchanged"
+            return cached
+    return None
+
+def _extract_or_reuse(url, resp, keywords=None, crawl_types=None, cache=None, entry=None,
+                      parser=HTML_PARSER, probes=None, keep_response=False):
+    info = _response_info(resp, keep_response)
+    cached = _reuse_cached(url, resp, info, cache=cache, entry=entry)
+    if cached is not None:
+        return cached, info
+    return scrape_response(resp, keywords=keywords, crawl_types=crawl_types, parser=parser,
+                           probes=probes), info
+
+# ----------------------------- PARSE WORKERS -----------------------------
+# With crawl_pages(parse_workers=N), fetch workers only download; the raw response is
+# shipped to a process pool where parsing, textstat and extraction run outside the GIL.
+
+def _response_payload(resp) -> dict:
+    """Picklable snapshot of a response: what the extractors read, nothing more."""
+    return {
+        "url": resp.url,
+        "status_code": resp.status_code,
+        "reason": resp.reason,
+        "headers": list(resp.headers.items()),
+        "content": resp.content,
+        "encoding": resp.encoding,
+        "elapsed": resp.elapsed.total_seconds(),
+        "http_version": getattr(resp.raw, "version", ""),
+        "redirect_chain": [list(hop) for hop in getattr(resp, "_redirect_chain", [])],
+    }
+
+def _response_from_payload(payload: dict) -> requests.Response:
+    resp = requests.Response()
+    resp.url = payload["url"]
+    resp.status_code = payload["status_code"]
+    resp.reason = payload["reason"]
+    resp.headers = requests.structures.CaseInsensitiveDict(payload["headers"])
+    resp._content = payload["content"]
+    resp.encoding = payload["encoding"]
+    resp.elapsed = timedelta(seconds=payload["elapsed"])
+    resp.raw = SimpleNamespace(version=payload["http_version"])
+    resp._redirect_chain = [tuple(hop) for hop in payload["redirect_chain"]]
+    resp._redirected = bool(resp._redirect_chain)
+    return resp
+
+_WORKER_PROBES = None  # per-process ProbeCache in parse workers
+
+def _init_parse_worker(probe_cache_size=10_000, cassette_path=None):
+    global _WORKER_PROBES
+    _WORKER_PROBES = ProbeCache(max_entries=probe_cache_size, headers=HEADERS)
+    if cassette_path:  # replay: each worker loads its own copy of the cassette
+        Cassette(cassette_path, REPLAY).mount(_WORKER_PROBES.session)
+
+def _extract_payload(payload, keywords=None, crawl_types=None, parser=HTML_PARSER):
+    """Process-pool entry point: rebuild the response and run the extractors."""
+    return scrape_response(_response_from_payload(payload), keywords=keywords,
+                           crawl_types=crawl_types, parser=parser, probes=_WORKER_PROBES)
+
+def _extract_in_pool(parse_pool, url, resp_future, keywords=None, crawl_types=None,
+                     cache=None, entry=None, parser=HTML_PARSER, keep_response=False) -> Future:
+    """
+    Chain a Future[response] into the parse pool. The returned Future resolves to
+    (page_data, info), or (None, None) if the fetch failed.
+    """
+    out = Future()
+
+    def on_parsed(parse_future, info):
+        try:
+            out.set_result((parse_future.result(), info))
+        except Exception as e:
+            out.set_exception(e)
+
+    def on_fetched(f):
+        # the crawl cancels outstanding futures when it stops early; once running,
+        # `out` can no longer be cancelled, so on_parsed may always set it
+        if not out.set_running_or_notify_cancel():
+            return
+        try:
+            resp = f.result()
+        except HostUnavailable as e:
+            out.set_exception(e)
+            return
+        except Exception as e:
+            logging.warning(f"Failed to load {url}: {e}")
+            out.set_result((None, None))
+            return
+        try:
+            info = _response_info(resp, keep_response)
+            cached = _reuse_cached(url, resp, info, cache=cache, entry=entry)
+            if cached is not None:
+                out.set_result((cached, info))
+                return
+            pf = parse_pool.submit(_extract_payload, _response_payload(resp),
+                                   keywords=keywords, crawl_types=crawl_types, parser=parser)
+        except Exception as e:
+            out.set_exception(e)
+            return
+        pf.add_done_callback(lambda p: on_parsed(p, info))
+
+    resp_future.add_done_callback(on_fetched)
+    return out
+
+def _internal_links(page_data, root):
+    """A page's same-site links, normalized (and pinned to root's host) the way the frontier stores URLs."""
+    canon_host = urlparse(root).netloc
+    return [l for l in (_normalize(u, canon_host) for u in page_data.get("links", [])) if same_domain(l, root)]
+
+def _fetch_page_logged(url, referer=None, rate_limit_rpm=12, headers=None, canon_host=None):
     logging.info(f"Scraping {url}")
+    return _fetch_page(url, referer=referer, rate_limit_rpm=rate_limit_rpm, headers=headers,
+                       canon_host=canon_host)
+
+def _scrape_page_with_info(url, referer=None, keywords=None, crawl_types=None, rate_limit_rpm=12,
+                           cache=None, signature=None, parser=HTML_PARSER, probes=None, keep_response=False,
+                           canon_host=None):
+    logging.info(f"Scraping {url}")
+    entry = cache.lookup(url, signature) if cache else None
     try:
-        resp = fetch(url, rate_limit_rpm=rate_limit_rpm, referer=referer)
-        # If a host flip produced 404, retry once pinned
-        if resp.status_code == 404 and _base_host(urlparse(resp.url).netloc) != _base_host(urlparse(url).netloc):
-            retry = _pin_host(resp.url)
-            resp = fetch(retry, rate_limit_rpm=rate_limit_rpm, referer=referer)
-        resp.raise_for_status()
+        resp = _fetch_page(url, referer=referer, rate_limit_rpm=rate_limit_rpm,
+                           headers=_validator_headers(entry), canon_host=canon_host)
+    except HostUnavailable:
+        raise  # not the page's fault: crawl_pages queues it again
     except Exception as e:
         logging.warning(f"Failed to load {url}: {e}")
-        return None
-
-    soup = BeautifulSoup(resp.text, "html.parser")
+        return None, None
+    return _extract_or_reuse(url, resp, keywords=keywords, crawl_types=crawl_types, cache=cache, entry=entry,
+                             parser=parser, probes=probes, keep_response=keep_response)
+
+def scrape_page(url, referer=None, keywords=None, crawl_types=None, rate_limit_rpm=12, probes=None,
+                profiler=None):
+    """profiler: optional profiling.CrawlProfiler to time this page's stages into."""
+    with profiler.page(url) if profiler else nullcontext():
+        page_data, _ = _scrape_page_with_info(url, referer=referer, keywords=keywords,
+                                              crawl_types=crawl_types, rate_limit_rpm=rate_limit_rpm,
+                                              probes=probes)
+    return page_data
+
+def scrape_response(resp, keywords=None, crawl_types=None, parser=HTML_PARSER, probes=None):
+    """Run the selected extractors over an already-fetched response, off one PageAnalysis pass."""
+    with stage("soup", PARSE_SECONDS, crawl_type="soup"):
+        soup = make_soup(resp.text, parser)
+        page = PageAnalysis(soup)
     base = resp.url
 
     pattern = None
@@ -570,35 +1013,56 @@ def scrape_page(url, referer=None, keywords=None, crawl_types=None, rate_limit_r
 
     results = {}
     if "html" in (crawl_types or []):
-        results["html"] = scrape_html_content(soup, base, pattern)
+        with stage("html", PARSE_SECONDS, crawl_type="html"):
+            results["html"] = scrape_html_content(soup, base, pattern, page=page)
     if "url_info" in (crawl_types or []):
-        results["url_info"] = scrape_url_info(resp, soup)
-    if "performance" in (crawl_types or []):
-        results["performance"] = scrape_performance(resp, soup)
-    if "images" in (crawl_types or []):
-        results["images"] = scrape_image_analysis(soup, base)
-
-    # Extract crawlable links (normalized, absolute, same scheme)
-    links = []
-    for a in soup.find_all("a", href=True):
-        h = urljoin(base, a["href"]).split("#", 1)[0]
+        with stage("url_info", PARSE_SECONDS, crawl_type="url_info"):
+            results["url_info"] = scrape_url_info(resp, soup, page=page)
+    if {"performance", "images"} & set(crawl_types or []):
+        # performance and images share one probe cache (the crawl's, when given)
+        probes, owned = _probe_scope(probes)
+        try:
+            if "performance" in crawl_types:
+                with stage("performance", PARSE_SECONDS, crawl_type="performance"):
+                    results["performance"] = scrape_performance(resp, soup, page=page, probes=probes)
+            if "images" in crawl_types:
+                with stage("images", PARSE_SECONDS, crawl_type="images"):
+                    results["images"] = scrape_image_analysis(soup, base, page=page, probes=probes)
+        finally:
+            if owned:
+                probes.close()
+    if "url_info" in (crawl_types or []):
+        # filled into "Closest Near Duplicate Match" / "No. Near Duplicates" at the end of a crawl
+        results[SIGNATURE_KEY] = simhash(page.text)
+
+    # Extract crawlable links (normalized, absolute, same scheme), their first
+    # anchor text (frontier priority) and pagination links (WP archives) in one walk over <a href>
+    links, page_links, anchors = [], [], {}
+    for a in page.tags("a", href=True):
+        href = a["href"]
+        h = urljoin(base, href).split("#", 1)[0]
         if _is_crawlable_http_url(h):
             links.append(h)
-
-    # Pagination discovery (WP archives)
-    next_link = soup.find("link", rel="next")
+            if h not in anchors:
+                text = a.get_text(" ", strip=True)
+                if text:
+                    anchors[h] = text[:120]
+        if _PAGINATION_RE.search(href):
+            page_links.append(urljoin(base, href))
+
+    next_link = page.first("link", rel="next")
     if next_link and next_link.get("href"):
         links.append(urljoin(base, next_link["href"]))
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        if re.search(r"/page/\d+/?$", href):
-            links.append(urljoin(base, href))
+    links.extend(page_links)
 
     results["links"] = links
+    results[ANCHORS_KEY] = anchors
     return results
 
 # ----------------------------- WRITERS -----------------------------
 
+EXCEL_MAX_ROWS = 1_048_576  # rows per worksheet, header included
+
 def _apply_header_style(ws):
     from openpyxl.styles import PatternFill, Font
     header_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
@@ -613,6 +1077,8 @@ def write_excel(page_name, data, out_dir):
     wb = Workbook()
 
     for sheet_name, sheet_data in data.items():
+        if sheet_name in (SIGNATURE_KEY, ANCHORS_KEY):
+            continue
         ws = wb.create_sheet(title=sheet_name[:31])
 
         # Backward-compat: if images are tuples, convert to dicts
@@ -654,8 +1120,44 @@ def write_excel(page_name, data, out_dir):
     path = os.path.join(out_dir, f"{page_name}.xlsx")
     wb.save(path)
     logging.info(f"Saved {path}")
+    return path
 
-def write_master_excel(all_data, out_dir):
+class _SheetRollover:
+    """
+    One section's rows in a write-only workbook. A sheet holds EXCEL_MAX_ROWS rows
+    including its header; past that, rows go on in "<section> (2)", "(3)", ...
+    """
+
+    def __init__(self, section, headers, new_sheet):
+        self.section = section
+        self.headers = headers
+        self._new_sheet = new_sheet
+        self._parts = 1
+        self._ws = new_sheet(section[:31], headers)
+        self._rows = 1
+
+    def append(self, row):
+        if self._rows >= EXCEL_MAX_ROWS:
+            self._parts += 1
+            suffix = f" ({self._parts})"
+            self._ws = self._new_sheet(self.section[:31 - len(suffix)] + suffix, self.headers)
+            self._rows = 1
+            if self._parts == 2:
+                logging.warning(f"Sheet {self.section!r} passed Excel's {EXCEL_MAX_ROWS:,}-row limit; "
+                                f"continuing on further sheets (csv or parquet export has no limit).")
+        self._ws.append(row)
+        self._rows += 1
+
+def write_master_excel(all_data, out_dir, url_info_overrides=None, file_name=None):
+    """
+    all_data: a PageSpill, or any list of (page_name, page_data) pairs.
+    url_info_overrides: optional list aligned with all_data of {column: value} dicts
+        merged into each page's url_info row (crawl-level columns such as near duplicates).
+    file_name: defaults to all_<lang>_<type>.xlsx.
+    Rows are streamed into a write-only workbook in a single pass. A section with more
+    rows than an Excel sheet holds continues on "<section> (2)", ...; for crawls that
+    large, export_formats csv or parquet are easier to work with.
+    """
     if not all_data:
         logging.info(f"Skipping master workbook for {out_dir} (no pages).")
         return
@@ -663,65 +1165,46 @@ def write_master_excel(all_data, out_dir):
     os.makedirs(out_dir, exist_ok=True)
 
     from openpyxl.styles import PatternFill, Font
-    wb = Workbook()
+    from openpyxl.cell import WriteOnlyCell
+    wb = Workbook(write_only=True)
     header_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
     header_font = Font(bold=True)
 
-    sample_page = all_data[0][1] if all_data else {}
-    available_sections = [k for k in sample_page.keys() if k not in ["links"]]
-
-    fixed_url_headers = [
-        "URL","Content Type","Status Code","Status","Indexability","Indexability Status",
-        "Title 1","Title 1 Length","Title 1 Pixel Width",
-        "Meta Description 1","Meta Description 1 Length","Meta Description 1 Pixel Width",
-        "Meta Description 2","Meta Description 2 Length","Meta Description 2 Pixel Width",
-        "Meta Keywords 1","Meta Keywords 1 Length",
-        "H1-1","H1-1 Length","H2-1","H2-1 Length","H2-2","H2-2 Length",
-        "Meta Robots 1","X-Robots-Tag 1","Meta Refresh 1",
-        "Canonical Link Element 1","Canonical Link Element 2",
-        'rel="next" 1','rel="prev" 1','HTTP rel="next" 1','HTTP rel="prev" 1',
-        "amphtml Link Element","Size (bytes)","Transferred (bytes)","Total Transferred (bytes)",
-        "CO2 (mg)","Carbon Rating","Word Count","Sentence Count","Average Words Per Sentence",
-        "Flesch Reading Ease Score","Readability","Text Ratio","Crawl Depth","Folder Depth",
-        "Link Score","Inlinks Unique","Inlinks Unique JS","Inlinks % of Total","Outlinks",
-        "Unique Outlinks","Unique JS Outlinks","External Outlinks","Unique External Outlinks",
-        "Unique External JS Outlinks","Closest Near Duplicate Match","No. Near Duplicates",
-        "Spelling Errors","Grammar Errors","Hash","Response Time","Last Modified",
-        "Redirect URL","Redirect Type","Cookies Language","HTTP Version","Mobile Alternate Link",
-        "Closest Semantically Similar Address","Semantic Similarity Score","No. Semantically Similar",
-        "Semantic Relevance Score","URL Encoded Address","Crawl Timestamp","Final URL","Redirected?","Redirect Chain"
-    ]
-
-    for section in available_sections:
-        ws = wb.create_sheet(title=section[:31])
+    if isinstance(all_data, PageSpill):
+        columns = all_data.columns
+    else:
+        columns = SectionHeaders()
+        for _, page_data in all_data:
+            columns.add(page_data)
 
-        if section == "url_info":
-            headers = ["Page"] + fixed_url_headers
-        else:
-            headers = ["Page"]
-            for _, page_data in all_data:
-                section_data = page_data.get(section)
-                if section == "images" and isinstance(section_data, list) and section_data and isinstance(section_data[0], tuple):
-                    section_data = [{"src": t[0], "alt": t[1]} for t in section_data]
-                if isinstance(section_data, dict):
-                    headers.extend(h for h in section_data.keys() if h not in headers)
-                elif isinstance(section_data, list) and section_data:
-                    if isinstance(section_data[0], dict):
-                        headers.extend(h for h in section_data[0].keys() if h not in headers)
-                    else:
-                        if "Value" not in headers:
-                            headers.append("Value")
+    def new_sheet(title, headers):
+        ws = wb.create_sheet(title=title)
+        for col in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(col)].width = 30
 
-        ws.append(headers)
-        for col, _ in enumerate(headers, 1):
-            c = ws.cell(row=1, column=col)
+        header_row = []
+        for h in headers:
+            c = WriteOnlyCell(ws, value=h)
             c.fill = header_fill
             c.font = header_font
+            header_row.append(c)
+        ws.append(header_row)
+        return ws
+
+    sheets = {}
+    for section in columns.sections:
+        if section == "url_info":
+            headers = ["Page"] + URL_INFO_COLUMNS
+        else:
+            headers = ["Page"] + columns.headers[section]
+        sheets[section] = _SheetRollover(section, headers, new_sheet)
 
-        for page_name, page_data in all_data:
-            section_data = page_data.get(section)
-            if section == "images" and isinstance(section_data, list) and section_data and isinstance(section_data[0], tuple):
-                section_data = [{"src": t[0], "alt": t[1]} for t in section_data]
+    for i, (page_name, page_data) in enumerate(all_data):
+        for section, ws in sheets.items():
+            headers = ws.headers
+            section_data = _tuples_to_dicts(section, page_data.get(section))
+            if section == "url_info" and url_info_overrides and isinstance(section_data, dict):
+                section_data = {**section_data, **url_info_overrides[i]}
 
             if isinstance(section_data, dict):
                 ws.append([page_name] + [str(section_data.get(h, "")) for h in headers[1:]])
@@ -734,31 +1217,48 @@ def write_master_excel(all_data, out_dir):
                         row = [page_name] + [""] * (len(headers) - 2) + [str(val)]
                         ws.append(row)
 
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 30
-
-    if "Sheet" in wb.sheetnames:
-        wb.remove(wb["Sheet"])
-
-    lang_name = os.path.basename(os.path.dirname(out_dir))
-    type_name = os.path.basename(out_dir)
-    path = os.path.join(out_dir, f"all_{lang_name}_{type_name}.xlsx")
+    if file_name is None:
+        lang_name = os.path.basename(os.path.dirname(out_dir))
+        type_name = os.path.basename(out_dir)
+        file_name = f"all_{lang_name}_{type_name}.xlsx"
+    path = os.path.join(out_dir, file_name)
 
     wb.save(path)
     logging.info(f"✅ Combined workbook saved → {path}")
+    return path
+
+@register_sink("excel")
+class ExcelSink(ExportSink):
+    """
+    The combined workbook as an export format: written in one pass at close (see
+    write_master_excel), rolling a section over to a new sheet at EXCEL_MAX_ROWS.
+    """
+
+    def close(self, pages, url_info_overrides=None):
+        path = write_master_excel(pages, self.out_dir, url_info_overrides=url_info_overrides)
+        return [path] if path else []
 
 # ----------------------------- PACKAGING -----------------------------
 
+def write_crawl_report(out_dir, report):
+    """Write run-level counters (failures, incremental savings, ...) next to the workbooks."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "crawl_report.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    logging.info(f"🧾 Crawl report saved → {path}")
+    return path
+
 def zip_output(root_dir, zip_path=None):
     root_dir = os.path.abspath(root_dir)
     if zip_path is None:
         zip_path = root_dir + ".zip"
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
+    with zipfile.ZipFile(zip_path, "w") as z:
         for path, _, files in os.walk(root_dir):
             for f in files:
                 full = os.path.join(path, f)
                 arc = os.path.relpath(full, start=root_dir)
-                z.write(full, arcname=arc)
+                z.write(full, arcname=arc, compress_type=compress_type_for(arc))
     logging.info(f"📦 Zipped → {zip_path}")
     return zip_path
 
@@ -787,6 +1287,166 @@ def is_allowed_language(url, root_url, language_filter):
 
 # ----------------------------- MAIN CRAWLER -----------------------------
 
+def _page_name(url):
+    page_name = urlparse(url).path.strip("/") or "index"
+    return page_name.replace("/", "_")[:80]
+
+class _CrawlOutputs:
+    """
+    Where committed pages go, for crawl_pages and reextract alike. commit() queues a
+    page's individual workbook on a BackgroundWriter, appends it to its folder's
+    PageSpill and export sinks and indexes it for near duplicates and the link graph;
+    close() fills the crawl-level url_info columns and closes every sink.
+
+    Lifecycle: commit()/restore() per page, flush() once the last page is in, abort()
+    if the run fails, close_writer() in either case, then close() on success.
+    """
+
+    def __init__(self, out_dir, root, start_urls, export_formats, type_label, save_individual=False,
+                 individual_writers=1, individual_batch=1, on_artifact=None, profiler=None):
+        self.out_dir = out_dir
+        self.root = root
+        self.start_urls = start_urls
+        self.export_formats = export_formats
+        self.type_label = type_label
+        self.save_individual = save_individual
+        self.individual_writers = individual_writers
+        self.individual_batch = individual_batch
+        self.on_artifact = on_artifact
+        self.profiler = profiler
+        self.spills = {}  # structured_out_dir -> PageSpill, filled as pages are committed
+        self.spill_urls = {}  # structured_out_dir -> crawled URL of each spilled row
+        self.sinks = {}  # structured_out_dir -> [ExportSink], fed as pages are committed
+        self.near_dups = NearDupIndex()
+        self.graph = LinkGraph()
+        self.batches = defaultdict(list)  # individual_dir -> [(page_name, page_data)] not yet written
+        self._writer = None  # started on the first individual workbook
+        self._late_written = []
+
+    # ---------- individual workbooks (off the crawl loop) ----------
+
+    @property
+    def writer(self) -> BackgroundWriter:
+        if self._writer is None:
+            self._writer = BackgroundWriter(workers=self.individual_writers,
+                                            max_pending=4 * max(1, self.individual_writers),
+                                            name="xlsx-writer")
+        return self._writer
+
+    @property
+    def write_failed(self) -> int:
+        return self._writer.failed if self._writer else 0
+
+    def writer_stats(self) -> dict:
+        if self._writer is None:
+            return {"written": 0, "failed": 0, "blocked_s": 0.0, "failures": []}
+        return self._writer.stats()
+
+    def _write_individual(self, url, page_name, page_data, folder):
+        with self.profiler.timed(url, "write_excel") if self.profiler else nullcontext(), \
+                EXCEL_WRITE_SECONDS.time(workbook="page", crawl_type=self.type_label):
+            return write_excel(page_name, page_data, folder)
+
+    def _write_batch(self, pages, folder):
+        with EXCEL_WRITE_SECONDS.time(workbook="batch", crawl_type=self.type_label):
+            return write_master_excel(pages, folder, file_name=f"batch_{pages[0][0]}_{len(pages)}.xlsx")
+
+    def collect_written(self, paths=None):
+        if paths is None:
+            paths = self._writer.completed() if self._writer else []
+        if self.on_artifact:
+            for path in paths:
+                self.on_artifact(path)
+
+    # ---------- pages ----------
+
+    def restore(self, url, page_name, page_data):
+        """Add a page committed earlier (a resumed crawl), without writing its workbook again."""
+        structured_out_dir, _ = get_output_directory(url, self.out_dir)
+        self._spill(structured_out_dir, url, page_name, page_data)
+        return structured_out_dir, self._index(url, page_data)
+
+    def commit(self, url, page_data):
+        """Route a new page to every output; returns (page_name, structured_out_dir, internal links)."""
+        page_name = _page_name(url)
+        structured_out_dir, individual_dir = get_output_directory(url, self.out_dir)
+
+        logging.info("=" * 60)
+        logging.info(f"📂 [LANG+TYPE] → {individual_dir}")
+        logging.info(f"🌐 Crawling URL: {url}")
+        logging.info("=" * 60)
+
+        if self.save_individual:
+            if self.individual_batch > 1:
+                batch = self.batches[individual_dir]
+                batch.append((page_name, page_data))
+                if len(batch) >= self.individual_batch:
+                    self.writer.submit(batch[0][0], self._write_batch, batch[:], individual_dir)
+                    batch.clear()
+            else:
+                self.writer.submit(page_name, self._write_individual, url, page_name, page_data,
+                                   individual_dir)
+        self.collect_written()
+
+        self._spill(structured_out_dir, url, page_name, page_data)
+        return page_name, structured_out_dir, self._index(url, page_data)
+
+    def _spill(self, folder, url, page_name, page_data):
+        if folder not in self.spills:
+            self.spills[folder] = PageSpill()
+            self.spill_urls[folder] = []
+            self.sinks[folder] = open_sinks(self.export_formats, folder)
+        self.spills[folder].append(page_name, page_data)
+        self.spill_urls[folder].append(url)
+        for sink in self.sinks[folder]:
+            sink.add_page(page_name, page_data)
+
+    def _index(self, url, page_data):
+        self.near_dups.add(url, page_data.get(SIGNATURE_KEY), page_data.get("url_info", {}).get("URL", url))
+        internal = _internal_links(page_data, self.root)
+        self.graph.add_links(url, internal)
+        return internal
+
+    # ---------- end of the run ----------
+
+    def flush(self):
+        """Queue the partial batches left once the last page is committed."""
+        for folder, batch in self.batches.items():
+            if batch:
+                self.writer.submit(batch[0][0], self._write_batch, batch[:], folder)
+                batch.clear()
+
+    def abort(self):
+        for folder, pages in self.spills.items():
+            pages.close()
+            for sink in self.sinks[folder]:
+                sink.abort()
+
+    def close_writer(self):
+        """Finish queued workbooks (also when the run failed)."""
+        if self._writer:
+            self._late_written = self._writer.close()
+
+    def close(self):
+        """Fill the crawl-level url_info columns and close every folder's export sinks."""
+        self.collect_written(self._late_written)
+        try:
+            dup_columns = self.near_dups.results()
+            self.graph.compute([_normalize(u, urlparse(self.root).netloc) for u in self.start_urls])
+            for folder, pages in self.spills.items():
+                overrides = [{**dup_columns.get(u, {}), **self.graph.columns(u)} for u in self.spill_urls[folder]]
+                while self.sinks[folder]:
+                    sink = self.sinks[folder].pop(0)
+                    timer = (EXCEL_WRITE_SECONDS.time(workbook="combined", crawl_type=self.type_label)
+                             if isinstance(sink, ExcelSink) else nullcontext())
+                    with timer:
+                        paths = sink.close(pages, url_info_overrides=overrides)
+                    if self.on_artifact:
+                        for path in paths:
+                            self.on_artifact(path)
+        finally:
+            self.abort()
+
 def crawl_pages(start_urls,
                 out_dir="output_excels",
                 max_pages=50,
@@ -797,126 +1457,783 @@ def crawl_pages(start_urls,
                 zip_results=False,
                 save_individual=True,
                 rate_limit_rpm=12,
-                obey_robots_delay=True):
+                adaptive_rate=True,
+                max_rate_rpm=120,
+                obey_robots_delay=True,
+                obey_robots=True,
+                concurrency=1,
+                fetch_backend="requests",
+                http2=False,
+                progress=None,
+                on_artifact=None,
+                state_dir=None,
+                crawl_id=None,
+                checkpoint_every=50,
+                incremental_cache=None,
+                parser=HTML_PARSER,
+                parse_workers=0,
+                probe_cache_size=10_000,
+                export_link_graph=False,
+                prioritize=None,
+                profile=False,
+                profile_sample=0.0,
+                export_formats=("excel",),
+                individual_writers=1,
+                individual_batch=1,
+                archive=None,
+                archive_probes=True):
     """
     rate_limit_rpm: approx requests per minute per host (polite pacing).
-    obey_robots_delay: if robots.txt has Crawl-delay, use the slower of that and rate_limit_rpm.
+    adaptive_rate: treat rate_limit_rpm as the starting rate for the start host and adjust
+        it (AIMD): up while latency stays flat, down on 429/503, timeouts or slow responses,
+        honouring Retry-After and pausing the host after repeated failures. Replaces the
+        fixed sleeps between pages. Final per-host rates land in crawl_report.json.
+        Pages held back by a long pause are queued again and the crawl waits; after
+        MAX_HOST_PAUSES such waits in a row it stops, leaving them queued (resumable).
+        Crawls of the same host running at once share the first one's controller.
+    max_rate_rpm: ceiling for the adaptive rate.
+    obey_robots_delay: if robots.txt has Crawl-delay, never request the host faster than that.
+    obey_robots: drop links and sitemap URLs disallowed by robots.txt before they are
+        queued; skips are counted per host and rule in crawl_report.json. While a host's
+        robots.txt is unreachable (or its circuit is open) its links are held back, not
+        dropped, and checked again after _ROBOTS_RETRY seconds (robots_held and
+        robots_unreachable in progress and the report). If only held links are left, the
+        crawl waits for them, up to MAX_HOST_PAUSES times.
+    concurrency: number of pages fetched/scraped in parallel. Results are committed in
+        dispatch order, so the output matches a sequential (concurrency=1) run. The requests
+        backend caps it at MAX_CONCURRENCY (SCRAPER_MAX_CONCURRENCY), the shared session's pool size.
+    fetch_backend: "requests" (worker threads) or "async" (one asyncio loop over a pooled
+        httpx client; concurrency is then the number of in-flight requests).
+    http2: negotiate HTTP/2 on the async backend when h2 is installed.
+        Inside transport.use_cassette(...) the requests backend records every exchange to,
+        or replays it from, a cassette file; replay turns request pacing off.
+    progress: optional callable receiving a stats dict (pages_crawled, queue_depth,
+        in_flight, max_pages, rate_rpm {host: current requests/min} and the run counters:
+        failed, not_modified, unchanged, bytes_downloaded, bytes_saved, write_failed,
+        robots_held, robots_unreachable [hosts]) after every committed page.
+    on_artifact: optional callable receiving the path of each output file (individual and
+        combined workbooks, crawl_report.json, link_graph.csv) as soon as it is complete,
+        e.g. to stream it into a ZIP response. It may delete the file.
+    state_dir / crawl_id: persist the frontier, visited pages and results to
+        <state_dir>/<crawl_id>.sqlite. If that file already holds a crawl, it is resumed
+        without refetching finished pages (see resume_crawl). State is checkpointed every
+        `checkpoint_every` pages.
+    incremental_cache: path of a RecrawlCache SQLite file shared between runs. Pages are
+        requested with If-None-Match / If-Modified-Since, and a 304 (or an identical body)
+        reuses the previous run's extraction. Counts land in crawl_report.json.
+    parser: BeautifulSoup backend for extraction: "html.parser", "lxml" or "auto".
+    parse_workers: if > 0, fetch workers only download and parsing/extraction runs in a
+        pool of this many processes, so CPU-bound extraction is not serialised by the GIL.
+    probe_cache_size: how many image/asset probe results (HEAD status and size) are kept
+        for reuse across pages; repeated logos, icons and theme files are probed once.
+    export_link_graph: also write every internal link (Source, Target) to link_graph.csv.
+        The graph itself is always built; it fills "Inlinks Unique", "Inlinks % of Total",
+        "Crawl Depth" (clicks from the start URL) and "Link Score" (PageRank, 0-100) in url_info.
+    prioritize: fetch the most relevant queued URL first instead of FIFO, scoring links by
+        keyword_filter terms in their anchor text and URL, blog paths (page_scope="blog"),
+        sitemap <lastmod> (only without keyword or blog scope) and depth (see
+        crawl_priority.py). None turns it on when keyword_filter is set or page_scope is
+        "blog". Sitemap seeding then reads up to SEED_FACTOR x max_pages URLs so there is
+        something to choose from.
+    profile: time every page's stages (rate-limit wait, fetch, HTML parse, each extractor,
+        textstat, asset probes, workbook write), wall and CPU, and write timings.json with
+        p50/p95/p99 per stage and the slowest pages (see profiling.py). With parse_workers,
+        extraction runs in other processes and is not timed.
+    profile_sample: fraction of pages (0-1) to also run under cProfile; the slowest of
+        them are saved to profiles/ as .prof files with a text summary. Implies profile.
+    export_formats: formats of the combined results in each output folder, any of "excel"
+        (the all_*.xlsx workbook), "csv" (one file per section), "jsonl" (gzip JSON lines)
+        and "parquet" (needs pyarrow). Rows are appended as pages are committed, except
+        url_info, written at the end (see export_sinks.py). Individual per-page workbooks
+        stay controlled by save_individual. An Excel sheet holds 1,048,576 rows; larger
+        sections continue on extra sheets, so for big crawls prefer csv or parquet.
+    individual_writers: threads building and saving the individual workbooks in the
+        background. The crawl loop only hands page data over; it waits only when
+        4x this many workbooks are already queued. Failed writes are counted in
+        write_failed and listed in crawl_report.json.
+    individual_batch: pages per individual workbook. Above 1, consecutive pages of a
+        folder share one batch_<first page>_<n>.xlsx (one sheet per section with a Page
+        column, like the combined workbook). This means far fewer files on sites with
+        many small pages.
+    archive: path of a .warc.gz to save every committed page's response (and the asset
+        probe results) to, with an .idx.jsonl index next to it; reextract() then runs any
+        crawl types over it without the network (see response_archive.py). A resumed
+        crawl appends to the same archive.
+    archive_probes: when archiving, also probe the assets that the performance and
+        images extractors check, even if they are not in crawl_types, so a later
+        reextract can run them. Needs parse_workers=0 when any probe is archived.
+        archive cannot be combined with incremental_cache: a 304 or reused page has no
+        fresh body to archive, so reextract would miss it.
     """
     if crawl_types is None:
         crawl_types = ["html"]
-
-    # Pin canonical host for redirect stability
-    global CANON_HOST
-    CANON_HOST = urlparse(start_urls[0]).netloc
-
-    # Robots crawl-delay → convert to rpm (slower wins)
+    export_formats = check_formats(export_formats)
+    concurrency = max(1, int(concurrency or 1))
+
+    state = None
+    if state_dir:
+        crawl_id = crawl_id or uuid.uuid4().hex
+        state = CrawlState(state_path(state_dir, crawl_id), checkpoint_every=checkpoint_every)
+        logging.info(f"Crawl state → {state.path} (crawl id {crawl_id})")
+
+    # Pin canonical host for redirect stability (per crawl: other crawls may run at once)
+    canon_host = urlparse(start_urls[0]).netloc
+
+    if fetch_backend not in ("requests", "async"):
+        raise ValueError(f"Unknown fetch_backend: {fetch_backend}")
+    cassette = active_cassette()
+    if cassette:
+        if fetch_backend != "requests":
+            raise ValueError("A cassette (transport.use_cassette) only covers fetch_backend='requests'")
+        if parse_workers and cassette.mode == RECORD:
+            raise ValueError("Recording a cassette needs parse_workers=0: "
+                             "asset probes in worker processes would not be recorded")
+    if archive and incremental_cache:
+        raise ValueError("archive cannot be combined with incremental_cache: "
+                         "pages reused from the cache have no body to archive")
+    if archive and parse_workers and (archive_probes or {"performance", "images"} & set(crawl_types)):
+        raise ValueError("Archiving asset probes needs parse_workers=0: probes in worker processes "
+                         "would not be archived (archive_probes=False archives responses only)")
+    if fetch_backend == "requests" and concurrency > MAX_CONCURRENCY:
+        logging.warning(f"concurrency={concurrency} exceeds the shared connection pool; "
+                        f"using {MAX_CONCURRENCY} (SCRAPER_MAX_CONCURRENCY).")
+        concurrency = MAX_CONCURRENCY
+    if replaying():
+        # answered from a cassette: there is no server to be polite to
+        logging.info(f"📼 Replaying {cassette.path}: request pacing is off.")
+        rate_limit_rpm = max_rate_rpm = REPLAY_RPM
+        adaptive_rate, obey_robots_delay = True, False
+
+    # Robots crawl-delay → floor of the host's token bucket (slower wins) while
+    # this crawl runs; until then (sitemap seeding) it caps rate_limit_rpm
+    crawl_delay = 0.0
     if obey_robots_delay:
         cd = _get_robots_crawl_delay(start_urls[0])
         if cd and cd > 0:
-            robots_rpm = max(1, int(60.0 / cd))
-            if robots_rpm < rate_limit_rpm:
-                logging.info(f"robots.txt crawl-delay detected ({cd}s). Using ~{robots_rpm} rpm.")
-                rate_limit_rpm = robots_rpm
+            if cd > 60.0 / max(1, rate_limit_rpm):
+                logging.info(f"robots.txt crawl-delay detected ({cd}s). Using ~{60.0 / cd:.1f} rpm.")
+            crawl_delay = cd
+    seed_rpm = min(rate_limit_rpm, 60.0 / crawl_delay) if crawl_delay else rate_limit_rpm
 
     keywords = [k.strip() for k in keyword_filter.split(",") if k.strip()]
-    seen, queue = set(), deque(_normalize(u) for u in start_urls)
-    referers = {_normalize(start_urls[0]): None}  # track referer per URL we enqueue
-    queued = set(queue)
-    root = _normalize(start_urls[0])
-    all_data = []
 
-    # ---------- Seed with sitemap URLs ----------
-    try:
-        sitemap_urls = discover_urls_from_sitemaps(start_urls[0])
-        for u in sitemap_urls:
-            if len(queued) >= max_pages:
-                break
-            if is_allowed_language(u, start_urls[0], language_filter) and u not in queued:
-                queue.append(u)
-                queued.add(u)
-                referers[u] = None
-        logging.info(f"Sitemap seeding: queued {len(sitemap_urls)} URLs (pre-filter).")
-    except Exception as e:
-        logging.warning(f"Sitemap seeding failed: {e}")
+    cache, signature = None, None
+    if incremental_cache:
+        cache = RecrawlCache(incremental_cache)
+        signature = json.dumps({"crawl_types": sorted(crawl_types), "keywords": keywords})
+    if prioritize is None:
+        prioritize = bool(keywords) or page_scope == "blog"
+    scorer = None
+    if prioritize:
+        scorer = LinkScorer(keywords, is_blog=is_blog_path if page_scope == "blog" else None)
+    # every discovered URL (queued or skipped), the fetch queue, crawled flags and referers
+    frontier = Frontier(priority=prioritize)
+    for u in start_urls:
+        frontier.add(_normalize(u, canon_host), score=float("inf"))  # start pages first
+    inflight = set()
+    root = _normalize(start_urls[0], canon_host)
+    robots_skipped = defaultdict(Counter)  # host -> {rule: URLs skipped}
+    stats = {"failed": 0, "not_modified": 0, "unchanged": 0,
+             "bytes_downloaded": 0, "bytes_saved": 0, "write_failed": 0,
+             "robots_held": 0, "robots_unreachable": []}
+    profiler = CrawlProfiler(sample_rate=profile_sample) if profile or profile_sample else None
+    type_label = "+".join(sorted(crawl_types))
+    outputs = _CrawlOutputs(out_dir, root, start_urls, export_formats, type_label,
+                            save_individual=save_individual, individual_writers=individual_writers,
+                            individual_batch=individual_batch, on_artifact=on_artifact, profiler=profiler)
+
+    # URL -> (referer, score, recheck at): links whose robots.txt can't be read right now
+    # (unreachable, or the host's circuit is open). They are not marked seen, so they are
+    # checked again and queued once robots.txt answers, instead of being lost.
+    robots_held = {}
+    robots_due = float("inf")  # earliest recheck among robots_held
+    held_hosts = Counter()  # host -> links in robots_held
+
+    def robots_check(url):
+        """None if allowed, the blocking rule, or the seconds to hold the URL back for."""
+        if not obey_robots:
+            return None
+        try:
+            policy = robots_policy(url)
+        except HostUnavailable:
+            bucket = _host_bucket(url)
+            return max(1.0, bucket.adaptive.unavailable_for() if bucket.adaptive else _ROBOTS_RETRY)
+        if policy.unreachable:
+            return float(_ROBOTS_RETRY)
+        rule = policy.blocking_rule(url)
+        if rule:
+            robots_skipped[urlparse(url).netloc][rule] += 1
+            logging.info(f"Skipping {url} (robots.txt {rule})")
+        return rule
+
+    def robots_hold(url, referer, score, wait):
+        nonlocal robots_due
+        if url in robots_held:
+            return
+        logging.info(f"Holding {url} back for {wait:.0f}s: robots.txt unreachable")
+        robots_held[url] = (referer, score, time.monotonic() + wait)
+        held_hosts[urlparse(url).netloc] += 1
+        robots_due = min(robots_due, robots_held[url][2])
+        held_stats()
+
+    def robots_release():
+        """Check held links whose wait is over again; returns how many were queued."""
+        nonlocal robots_due
+        now, queued = time.monotonic(), 0
+        if robots_due > now:
+            return 0
+        for u, (ref, score, at) in list(robots_held.items()):
+            if at > now:
+                continue
+            del robots_held[u]
+            verdict = robots_check(u)
+            if isinstance(verdict, float):
+                robots_held[u] = (ref, score, now + verdict)
+                continue
+            held_hosts[urlparse(u).netloc] -= 1
+            if verdict:
+                frontier.add(u, queue=False)  # count each URL once
+            elif u not in frontier:
+                frontier.add(u, ref, score=score)
+                if state:
+                    state.enqueue(u, ref)
+                queued += 1
+        robots_due = min((at for _, _, at in robots_held.values()), default=float("inf"))
+        held_stats()
+        return queued
+
+    def held_stats():
+        stats["robots_held"] = len(robots_held)
+        stats["robots_unreachable"] = sorted(h for h, n in held_hosts.items() if n)
+
+    resuming = state is not None and state.has_frontier()
+    if resuming:
+        # ---------- Restore frontier + finished pages ----------
+        frontier = Frontier(priority=prioritize)
+        for u, ref, done in state.iter_frontier():
+            # anchors and lastmods are not persisted: restored URLs are rescored on URL and depth
+            score = scorer.score(u, depth=frontier.depth(ref) + 1 if ref else SITEMAP_DEPTH) if scorer else 0.0
+            frontier.add(u, ref, queue=not done, score=score)
+        for u, page_name, _, page_data in state.iter_pages():
+            frontier.mark_seen(u)
+            outputs.restore(u, page_name, page_data)
+        logging.info(f"Resuming crawl {crawl_id}: {frontier.seen_count} pages done, "
+                     f"{frontier.pending} queued.")
+    else:
+        # ---------- Seed with sitemap URLs ----------
+        # Streamed: stops downloading/parsing as soon as the frontier is full
+        entries = iter_sitemap_entries(start_urls[0], rate_limit_rpm=seed_rpm)
+        seed_limit = max_pages * SEED_FACTOR if scorer else max_pages
+        read = 0
+        try:
+            for u, lastmod in entries:
+                if frontier.known >= seed_limit:
+                    break
+                read += 1
+                if u in frontier:
+                    continue
+                verdict = robots_check(u)
+                if verdict and not isinstance(verdict, float):
+                    continue
+                if is_allowed_language(u, start_urls[0], language_filter):
+                    score = scorer.score(u, depth=SITEMAP_DEPTH, lastmod=lastmod) if scorer else 0.0
+                    if isinstance(verdict, float):
+                        robots_hold(u, None, score, verdict)
+                    else:
+                        frontier.add(u, score=score)
+            logging.info(f"Sitemap seeding: queued {read} URLs (pre-filter).")
+        except Exception as e:
+            logging.warning(f"Sitemap seeding failed: {e}")
+        finally:
+            entries.close()
+
+        if state:
+            state.save_meta(start_urls=list(start_urls), out_dir=out_dir, max_pages=max_pages,
+                            keyword_filter=keyword_filter, language_filter=language_filter,
+                            crawl_types=crawl_types, page_scope=page_scope, zip_results=zip_results,
+                            save_individual=save_individual, rate_limit_rpm=rate_limit_rpm,
+                            adaptive_rate=adaptive_rate, max_rate_rpm=max_rate_rpm,
+                            obey_robots_delay=obey_robots_delay, obey_robots=obey_robots,
+                            concurrency=concurrency,
+                            fetch_backend=fetch_backend, http2=http2,
+                            incremental_cache=incremental_cache, parser=parser,
+                            parse_workers=parse_workers, probe_cache_size=probe_cache_size,
+                            export_link_graph=export_link_graph,
+                            prioritize=prioritize, profile=profile, profile_sample=profile_sample,
+                            export_formats=export_formats, individual_writers=individual_writers,
+                            individual_batch=individual_batch, archive=archive,
+                            archive_probes=archive_probes)
+            for u, ref in frontier.iter_pending():
+                state.enqueue(u, ref)
+            state.checkpoint()
+
+    def next_url():
+        """Pop the next queued URL that passes the filters, or None."""
+        raw = frontier.pop()
+        url = _normalize(raw, canon_host)
+        if url in inflight:
+            return None
+        if state and url != raw:
+            state.mark_done(raw)
+        if frontier.is_seen(url) or not same_domain(url, root):
+            if state:
+                state.mark_done(url)
+            return None
+        if not passes_filters(url):
+            if state:
+                state.mark_done(url)
+            return None
+        return url
 
-    while queue and len(seen) < max_pages:
-        raw = queue.popleft()
-        url = _normalize(raw)
-        if url in seen or not same_domain(url, root):
-            continue
+    def passes_filters(url):
+        """Language and page-scope filters applied when a URL is dequeued."""
         if not is_allowed_language(url, root, language_filter):
             logging.info(f"Skipping {url} due to language filter ({language_filter})")
-            continue
+            return False
 
         path_lower = urlparse(url).path.lower()
         is_blog = is_blog_path(path_lower)
         if page_scope == "landing" and is_blog:
             logging.info(f"Skipping blog/article page: {url}")
-            continue
+            return False
         if page_scope == "blog" and not is_blog:
             # Always crawl the starting page to discover blog links
             if url != root and not re.search(r"/(eu|sea)(/|$)", urlparse(url).path):
                 logging.info(f"Skipping non-blog page: {url}")
-                continue
-
-        page_data = scrape_page(url,
-                                referer=referers.get(url),
-                                keywords=keywords,
-                                crawl_types=crawl_types,
-                                rate_limit_rpm=rate_limit_rpm)
-        if not page_data:
-            time.sleep(3.0)
-            continue
-
-        seen.add(url)
-
-        page_name = urlparse(url).path.strip("/") or "index"
-        page_name = page_name.replace("/", "_")[:80]
-        structured_out_dir, individual_dir = get_output_directory(url, out_dir)
-
-        logging.info("=" * 60)
-        logging.info(f"📂 [LANG+TYPE] → {individual_dir}")
-        logging.info(f"🌐 Crawling URL: {url}")
-        logging.info("=" * 60)
-
-        try:
-            if save_individual:
-                write_excel(page_name, page_data, individual_dir)
-        except Exception as e:
-            logging.error(f"Failed to write Excel for {page_name}: {e}")
-
-        all_data.append((page_name, page_data, structured_out_dir))
+                return False
+        return True
 
-        # Enqueue children
-        for link in page_data.get("links", []):
-            link = _normalize(link)
-            if link in seen or link in queued:
+    archive_writer, archive_extra = None, []
+    if archive:
+        archive_writer = ArchiveWriter(archive, info={
+            "start_urls": list(start_urls), "crawl_types": crawl_types, "keyword_filter": keyword_filter,
+            "language_filter": language_filter, "page_scope": page_scope}, append=resuming)
+        logging.info(f"🗄️ Archiving responses → {archive}")
+        if archive_probes:
+            archive_extra = [t for t in ("performance", "images") if t not in crawl_types]
+    extract_types = list(crawl_types) + archive_extra  # extras only run for their probes
+    keep_response = archive_writer is not None  # responses are only held until commit to archive them
+
+    # Workers only fetch (and scrape); all frontier state
+    # is owned by this thread and updated in dispatch order.
+    parse_pool, probes = None, None
+    if parse_workers:
+        # each parse worker process keeps its own probe cache
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers, initializer=_init_parse_worker,
+                                         initargs=(probe_cache_size, cassette.path if replaying() else None))
+    else:
+        probes = ProbeCache(max_entries=probe_cache_size, max_workers=max(8, concurrency), headers=HEADERS,
+                            on_result=archive_writer.write_probe if archive_writer else None)
+
+    if fetch_backend == "async":
+        from async_fetch import AsyncFetcher
+        fetcher = AsyncFetcher(max_in_flight=concurrency, http2=http2)
+
+        def submit(url):
+            entry = cache.lookup(url, signature) if cache else None
+            fut = fetcher.submit(url, referer=frontier.referer(url), rate_limit_rpm=rate_limit_rpm,
+                                 headers=_validator_headers(entry), canon_host=canon_host)
+            if parse_pool:
+                return _extract_in_pool(parse_pool, url, fut, keywords=keywords, crawl_types=extract_types,
+                                        cache=cache, entry=entry, parser=parser, keep_response=keep_response)
+            fut.cache_entry = entry
+            return fut
+
+        def finish(url, fut):
+            if parse_pool:
+                return fut.result()
+            try:
+                resp = fut.result()
+            except HostUnavailable:
+                raise
+            except Exception as e:
+                logging.warning(f"Failed to load {url}: {e}")
+                return None, None
+            if not profiler:
+                return _extract_or_reuse(url, resp, keywords=keywords, crawl_types=extract_types,
+                                         cache=cache, entry=fut.cache_entry, parser=parser, probes=probes,
+                                         keep_response=keep_response)
+            with profiler.page(url):
+                record("fetch", resp.elapsed.total_seconds())  # spent on the event loop
+                return _extract_or_reuse(url, resp, keywords=keywords, crawl_types=extract_types,
+                                         cache=cache, entry=fut.cache_entry, parser=parser, probes=probes,
+                                         keep_response=keep_response)
+
+        shutdown = fetcher.close
+    else:
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crawl")
+
+        def submit(url):
+            if parse_pool:
+                entry = cache.lookup(url, signature) if cache else None
+                fetch_args = (_fetch_page_logged, url)
+                if profiler:
+                    fetch_args = (profiler.run, url) + fetch_args
+                fut = pool.submit(*fetch_args, referer=frontier.referer(url), rate_limit_rpm=rate_limit_rpm,
+                                  headers=_validator_headers(entry), canon_host=canon_host)
+                return _extract_in_pool(parse_pool, url, fut, keywords=keywords, crawl_types=extract_types,
+                                        cache=cache, entry=entry, parser=parser, keep_response=keep_response)
+            scrape_args = (_scrape_page_with_info, url)
+            if profiler:
+                scrape_args = (profiler.run, url) + scrape_args
+            return pool.submit(*scrape_args,
+                               referer=frontier.referer(url),
+                               keywords=keywords,
+                               crawl_types=extract_types,
+                               rate_limit_rpm=rate_limit_rpm,
+                               cache=cache,
+                               signature=signature,
+                               parser=parser,
+                               probes=probes,
+                               keep_response=keep_response,
+                               canon_host=canon_host)
+
+        def finish(url, fut):
+            return fut.result()
+
+        def shutdown():
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    pending = deque()  # (url, future) in dispatch order
+    reported_pending = 0  # this crawl's share of the FRONTIER_PENDING gauge
+
+    def report():
+        nonlocal reported_pending
+        FRONTIER_PENDING.inc(frontier.pending - reported_pending)
+        reported_pending = frontier.pending
+        if progress:
+            rpm = adaptive.rpm if adaptive else rate_limit_rpm
+            progress({"pages_crawled": frontier.seen_count, "queue_depth": frontier.pending,
+                      "in_flight": len(pending), "max_pages": max_pages,
+                      "rate_rpm": {urlparse(root).netloc: round(rpm, 1)}, **stats})
+
+    host_pauses = 0  # HostUnavailable waits since the last page that loaded
+    robots_waits = 0  # waits with nothing to do but links held for robots.txt
+
+    # this crawl's pacing of the start host; a crawl of the same host already
+    # running keeps its controller, which this one then shares
+    host_bucket = _host_bucket(root)
+    adaptive = host_bucket.join(
+        AdaptiveRate(start_rpm=rate_limit_rpm, max_rpm=max(max_rate_rpm, rate_limit_rpm),
+                     host=urlparse(root).netloc) if adaptive_rate else None,
+        floor_interval=crawl_delay)
+
+    ACTIVE_CRAWLS.inc()
+    try:
+        while (frontier.pending or pending or robots_held) and frontier.seen_count < max_pages:
+            if robots_held and robots_release():
+                robots_waits = 0
+            if not (frontier.pending or pending):
+                if not robots_held:
+                    break
+                # only held links are left: wait for their robots.txt to be retried
+                robots_waits += 1
+                if robots_waits > MAX_HOST_PAUSES:
+                    logging.warning(f"⛔ robots.txt still unreachable; stopping with {len(robots_held)} "
+                                    f"links held back ({', '.join(stats['robots_unreachable'])}).")
+                    stats["stopped"] = "robots.txt unreachable"
+                    break
+                wait = max(0.0, robots_due - time.monotonic())
+                logging.warning(f"⏸️ robots.txt unreachable; waiting {wait:.0f}s before checking "
+                                f"{len(robots_held)} held links again.")
+                report()
+                time.sleep(wait)
                 continue
-            if not same_domain(link, root):
+            while (frontier.pending and len(pending) < concurrency
+                   and frontier.seen_count + len(pending) < max_pages):
+                url = next_url()
+                if url is None:
+                    continue
+                inflight.add(url)
+                pending.append((url, submit(url)))
+            if not pending:
                 continue
-            if not is_allowed_language(link, root, language_filter):
+
+            url, fut = pending.popleft()
+            try:
+                page_data, info = finish(url, fut)
+            except HostUnavailable as e:
+                # the host's circuit is open: the page was never requested, so it
+                # goes back in the queue instead of being counted as failed
+                inflight.discard(url)
+                frontier.requeue(url)
+                if state:
+                    state.enqueue(url, frontier.referer(url))
+                wait = adaptive.unavailable_for() if adaptive else 0.0
+                if wait > 0:
+                    host_pauses += 1
+                    if host_pauses > MAX_HOST_PAUSES:
+                        logging.warning(f"⛔ {e}; stopping with {frontier.pending} URLs still queued.")
+                        stats["stopped"] = "host unavailable"
+                        break
+                    logging.warning(f"⏸️ {e}; waiting {wait:.0f}s before crawling on.")
+                    time.sleep(wait)
                 continue
-            if not _is_crawlable_http_url(link):
+            inflight.discard(url)
+            for t in archive_extra:
+                if page_data:
+                    page_data.pop(t, None)
+            if not page_data:
+                stats["failed"] += 1
+                PAGES.inc(outcome="failed")
+                if state:
+                    state.mark_done(url)
+                    state.maybe_checkpoint()
+                report()
+                if concurrency == 1 and not adaptive_rate:
+                    time.sleep(3.0)
                 continue
-            queue.append(link)
-            referers[link] = url
-            queued.add(link)
-
-        time.sleep(random.uniform(0.4, 1.0))
 
-    grouped = defaultdict(list)
-    for page_name, page_data, structured_out_dir in all_data:
-        grouped[structured_out_dir].append((page_name, page_data))
-
-    for folder, data_list in grouped.items():
-        write_master_excel(data_list, folder)
+            host_pauses = 0
+            frontier.mark_seen(url)
+            resp = info.pop("response", None)
+            if archive_writer and resp is not None:
+                archive_writer.write_response(url, _response_payload(resp))
+            stats["bytes_downloaded"] += info["size"]
+            BYTES_DOWNLOADED.inc(info["size"])
+            PAGES.inc(outcome=info["reused"] or "fetched")
+            if info["reused"]:
+                stats[info["reused"]] += 1
+                stats["bytes_saved"] += info["bytes_saved"]
+            if cache and info["reused"] != "not_modified":
+                cache.record(url, signature, info, page_data)
+
+            page_name, structured_out_dir, internal = outputs.commit(url, page_data)
+            stats["write_failed"] = outputs.write_failed
+            if state:
+                state.add_page(url, page_name, os.path.relpath(structured_out_dir, out_dir), page_data,
+                               final_url=info["final_url"], redirect_chain=info["redirect_chain"])
+
+            # Enqueue children
+            if scorer:
+                anchors = {_normalize(u, canon_host): t for u, t in page_data.get(ANCHORS_KEY, {}).items()}
+                child_depth = frontier.depth(url) + 1
+            for link in internal:
+                if link in frontier:
+                    continue
+                if not is_allowed_language(link, root, language_filter):
+                    continue
+                if not _is_crawlable_http_url(link):
+                    continue
+                score = scorer.score(link, anchors.get(link, ""), depth=child_depth) if scorer else 0.0
+                verdict = robots_check(link)
+                if isinstance(verdict, float):
+                    robots_hold(link, url, score, verdict)
+                    continue
+                if verdict:
+                    frontier.add(link, queue=False)  # count each URL once
+                    continue
+                frontier.add(link, url, score=score)
+                if state:
+                    state.enqueue(link, url)
+
+            if state:
+                state.maybe_checkpoint()
+            report()
+
+            if concurrency == 1 and not adaptive_rate:
+                time.sleep(random.uniform(0.4, 1.0))
+
+        outputs.flush()
+    except BaseException:
+        outputs.abort()
+        raise
+    finally:
+        ACTIVE_CRAWLS.dec()
+        host_bucket.leave(crawl_delay)
+        FRONTIER_PENDING.dec(reported_pending)
+        for _, fut in pending:
+            fut.cancel()
+        shutdown()
+        if parse_pool:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+        if probes:
+            probes.close()
+        if state:
+            state.close()
+        if cache:
+            cache.close()
+        if archive_writer:
+            archive_writer.close()
+        outputs.close_writer()
+
+    outputs.close()
+    stats["write_failed"] = outputs.write_failed
 
     logging.info("📂 Verifying generated folder structure...")
     for p in pathlib.Path(out_dir).rglob("*"):
         if p.is_dir():
             logging.info(f"📁 Folder created → {p}")
 
-    logging.info(f"✅ Done: Crawled {len(seen)} pages using modes {crawl_types}")
+    logging.info(f"✅ Done: Crawled {frontier.seen_count} pages using modes {crawl_types}")
+    if cache:
+        logging.info(f"♻️ Incremental: {stats['not_modified']} pages not modified (304), "
+                     f"{stats['unchanged']} unchanged, {stats['bytes_saved']} bytes saved.")
+    if export_link_graph:
+        path = outputs.graph.export_csv(os.path.join(out_dir, "link_graph.csv"))
+        logging.info(f"🕸️ Link graph ({outputs.graph.edge_count} links) saved → {path}")
+        if on_artifact:
+            on_artifact(path)
+
+    crawl_report = {"pages_crawled": frontier.seen_count, "crawl_types": crawl_types, **stats}
+    if adaptive:
+        crawl_report["rate"] = {adaptive.host: adaptive.snapshot()}
+    if obey_robots:
+        crawl_report["robots_skipped"] = {host: dict(rules) for host, rules in robots_skipped.items()}
+    if probes:
+        crawl_report["asset_probes"] = probes.stats()
+    if save_individual:
+        crawl_report["individual_workbooks"] = outputs.writer_stats()
+    if archive_writer:
+        crawl_report["archive"] = archive_writer.stats()
+        logging.info(f"🗄️ Archive ({archive_writer.counts['response']} responses, "
+                     f"{archive_writer.counts['metadata']} asset probes) saved → {archive}")
+    path = write_crawl_report(out_dir, crawl_report)
+    if on_artifact:
+        on_artifact(path)
+        if archive_writer:
+            on_artifact(archive_writer.path)
+            on_artifact(archive_writer.index_path)
+
+    if profiler:
+        paths = profiler.write(out_dir)
+        totals = ", ".join(f"{name} {s['wall']['total']:.1f}s"
+                           for name, s in profiler.summary()["stages"].items() if name != "total")
+        logging.info(f"⏱️ Stage timings ({totals}) saved → {paths[0]}")
+        if on_artifact:
+            for path in paths:
+                on_artifact(path)
+
+    if zip_results:
+        return zip_output(out_dir)
+    return out_dir
+
+def resume_crawl(crawl_id, state_dir, out_dir=None, progress=None, on_artifact=None):
+    """Continue a crawl started with crawl_pages(state_dir=..., crawl_id=...)."""
+    path = state_path(state_dir, crawl_id)
+    if not os.path.exists(path):
+        raise ValueError(f"No saved crawl state for id {crawl_id}")
+    state = CrawlState(path)
+    try:
+        params = state.load_meta()
+    finally:
+        state.close()
+    params.pop("frontier_bloom", None)  # saved by crawls from before the option was removed
+    if out_dir:
+        params["out_dir"] = out_dir
+    return crawl_pages(progress=progress, on_artifact=on_artifact, state_dir=state_dir, crawl_id=crawl_id,
+                       **params)
+
+# ----------------------------- OFFLINE RE-EXTRACT -----------------------------
+# reextract() runs the extractors over a crawl_pages(archive=...) archive: no fetches,
+# no pacing, asset probes answered from the archive (see response_archive.py).
+
+def _init_reextract_worker(probe_results):
+    global _WORKER_PROBES
+    _WORKER_PROBES = ArchivedProbes(probe_results)
+
+def _reextract_payload(payload, keywords=None, crawl_types=None, parser=HTML_PARSER):
+    """Process-pool entry point: (page_data, asset probes missing from the archive)."""
+    missing = _WORKER_PROBES.missing
+    page_data = _extract_payload(payload, keywords=keywords, crawl_types=crawl_types, parser=parser)
+    return page_data, _WORKER_PROBES.missing - missing
+
+def reextract(archive, out_dir="output_excels", crawl_types=None, keyword_filter=None,
+              export_formats=("excel",), save_individual=False, parser=HTML_PARSER, workers=0,
+              zip_results=False, progress=None, on_artifact=None):
+    """
+    Extract again from an archive written by crawl_pages(archive=...), without the network.
+    Pages go through the same output path as crawl_pages (_CrawlOutputs), so the output has
+    the crawl's layout: folders, combined workbook and export_formats files, individual
+    workbooks, near-duplicate and link columns, crawl_report.json.
+    crawl_types, keyword_filter: default to the archived crawl's.
+    workers: parse processes (0: parse in this process); pages keep the crawl's order.
+    performance and images read asset probes from the archive. Assets the crawl did not
+    probe (archived with archive_probes=False) count as failed probes and are reported
+    under asset_probes.missing.
+    progress / on_artifact: as in crawl_pages.
+    """
+    export_formats = check_formats(export_formats)
+    reader = ArchiveReader(archive)
+    info = reader.info()
+    start_urls = info.get("start_urls") or [e["page"] for e in reader.entries if e.get("page")][:1]
+    if not start_urls:
+        reader.close()
+        raise ValueError(f"No archived pages in {archive}")
+    crawl_types = list(crawl_types or info.get("crawl_types") or ["html"])
+    if keyword_filter is None:
+        keyword_filter = info.get("keyword_filter", "")
+    keywords = [k.strip() for k in keyword_filter.split(",") if k.strip()]
+    type_label = "+".join(sorted(crawl_types))
+    logging.info(f"🗄️ Re-extracting {crawl_types} from {archive}")
+
+    root = _normalize(start_urls[0], urlparse(start_urls[0]).netloc)
+    probes = ArchivedProbes(reader.probes() if {"performance", "images"} & set(crawl_types) else {})
+    pool = None
+    if workers:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_reextract_worker,
+                                   initargs=(probes.results,))
+
+    outputs = _CrawlOutputs(out_dir, root, start_urls, export_formats, type_label,
+                            save_individual=save_individual, on_artifact=on_artifact)
+    stats = {"pages_crawled": 0, "probes_missing": 0}
+    pending = deque()  # (url, future) in archive order
+    total_pages = len(reader.page_entries())
+
+    def commit(url, page_data):
+        outputs.commit(url, page_data)
+        stats["pages_crawled"] += 1
+        if progress:
+            progress({"pages_crawled": stats["pages_crawled"], "queue_depth": len(pending),
+                      "max_pages": total_pages})
+
+    def drain(keep):
+        while len(pending) > keep:
+            url, fut = pending.popleft()
+            page_data, missing = fut.result()
+            stats["probes_missing"] += missing
+            commit(url, page_data)
+
+    try:
+        for entry, fields, block in reader.pages():
+            url = fields.get("X-Crawl-URL") or entry.get("page") or entry["url"]
+            payload = read_payload(fields, block)
+            if pool:
+                pending.append((url, pool.submit(_reextract_payload, payload, keywords=keywords,
+                                                 crawl_types=crawl_types, parser=parser)))
+                drain(4 * workers)
+            else:
+                commit(url, scrape_response(_response_from_payload(payload), keywords=keywords,
+                                            crawl_types=crawl_types, parser=parser, probes=probes))
+        drain(0)
+        outputs.flush()
+    except BaseException:
+        outputs.abort()
+        raise
+    finally:
+        for _, fut in pending:
+            fut.cancel()
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+        reader.close()
+        outputs.close_writer()
+
+    outputs.close()
+
+    if not pool:
+        stats["probes_missing"] = probes.missing
+    if stats["probes_missing"]:
+        logging.warning(f"{stats['probes_missing']} asset probes were not in the archive "
+                        f"(crawl with archive_probes=True to archive them); reported as failed.")
+    logging.info(f"✅ Done: Re-extracted {stats['pages_crawled']} pages using modes {crawl_types}")
+    crawl_report = {"pages_crawled": stats["pages_crawled"], "crawl_types": crawl_types,
+                    "reextracted_from": archive,
+                    "asset_probes": {"archived": len(probes.results), "missing": stats["probes_missing"]}}
+    if save_individual:
+        crawl_report["individual_workbooks"] = outputs.writer_stats()
+    path = write_crawl_report(out_dir, crawl_report)
+    if on_artifact:
+        on_artifact(path)
 
     if zip_results:
         return zip_output(out_dir)
@@ -0,0 +1,297 @@
+# export_sinks.py
+"""
+Output formats for a crawl's combined results, one sink per format per output folder.
+
+crawl_pages(export_formats=[...]) opens the sinks of every folder it writes to
+and hands each committed page to add_page(), so streaming formats append rows
+while the crawl runs instead of building everything at the end:
+
+  excel     all_<lang>_<type>.xlsx, written at close (crawler_excel.ExcelSink)
+  csv       all_<lang>_<type>_<section>.csv, one file per section
+  jsonl     all_<lang>_<type>.jsonl.gz, one JSON object per row with its "section"
+  parquet   all_<lang>_<type>_<section>.parquet (needs pyarrow), string columns
+
+url_info is the exception: its crawl-level columns (near duplicates, inlinks,
+crawl depth, link score) are only known once the crawl is over, so every sink
+writes it at close(), from the folder's PageSpill. It is one row per page.
+
+Tabular sinks (csv, parquet) fix a section's columns from its first row; the
+extractors always return the same keys, and anything else is dropped with a
+warning. Unlike Excel, where a section past 1,048,576 rows spills onto extra
+sheets, none of them has a row limit.
+"""
+import abc
+import csv
+import gzip
+import json
+import logging
+import os
+
+from page_store import NON_REPORT_SECTIONS, URL_INFO_COLUMNS, _tuples_to_dicts
+
+SINKS = {}  # format name -> ExportSink subclass
+
+
+def register_sink(name: str):
+    """Class decorator: make an ExportSink subclass available as export format `name`."""
+    def add(cls):
+        SINKS[name] = cls
+        return cls
+    return add
+
+
+def check_formats(formats) -> list[str]:
+    """Validate export format names ("csv" or "csv,jsonl" or a list) before any page is fetched."""
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    formats = list(dict.fromkeys(f.strip().lower() for f in formats if f and f.strip()))
+    for f in formats:
+        if f not in SINKS:
+            raise ValueError(f"Unknown export format: {f} (choose from {', '.join(SINKS)})")
+        SINKS[f].check_available()
+    return formats
+
+
+def open_sinks(formats, out_dir: str) -> list["ExportSink"]:
+    return [SINKS[f](out_dir) for f in formats]
+
+
+def _base_name(out_dir: str) -> str:
+    # same naming as the combined workbook: all_<lang>_<type>
+    return f"all_{os.path.basename(os.path.dirname(out_dir))}_{os.path.basename(out_dir)}"
+
+
+def _dict_rows(section_data):
+    """A section's rows as dicts: one per page for dict sections, one per entry for lists."""
+    if isinstance(section_data, dict):
+        return [section_data]
+    if isinstance(section_data, list) and section_data:
+        if isinstance(section_data[0], dict):
+            return section_data
+        return [{"Value": v} for v in section_data]
+    return []
+
+
+def _streamed_sections(page_data: dict):
+    for section, section_data in page_data.items():
+        if section in NON_REPORT_SECTIONS or section == "url_info":
+            continue
+        yield section, _tuples_to_dicts(section, section_data)
+
+
+def _url_info_rows(pages, url_info_overrides=None):
+    for i, (page_name, page_data) in enumerate(pages):
+        url_info = page_data.get("url_info")
+        if not isinstance(url_info, dict):
+            continue
+        if url_info_overrides:
+            url_info = {**url_info, **url_info_overrides[i]}
+        yield page_name, url_info
+
+
+class ExportSink:
+    """
+    add_page() receives each page of the folder as it is committed; close() gets
+    all of them again (a PageSpill) plus the url_info overrides, finishes the
+    files and returns their paths. abort() releases files when the crawl fails.
+    """
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.base = os.path.join(out_dir, _base_name(out_dir))
+
+    @classmethod
+    def check_available(cls):
+        """Raise RuntimeError if an optional dependency is missing."""
+
+    def add_page(self, page_name: str, page_data: dict):
+        pass
+
+    def close(self, pages, url_info_overrides=None) -> list[str]:
+        return []
+
+    def abort(self):
+        pass
+
+
+class _TabularSink(ExportSink, abc.ABC):
+    """Shared column handling for formats with one fixed-column table per section."""
+
+    def __init__(self, out_dir: str):
+        super().__init__(out_dir)
+        self._columns = {}  # section -> [column, ...] (after "Page")
+        self._dropped = {}  # section -> columns seen after the first row and not written
+
+    def _rows(self, section, page_name, section_data):
+        rows = _dict_rows(section_data)
+        if not rows:
+            return
+        columns = self._columns.get(section)
+        if columns is None:
+            columns = self._columns[section] = list(rows[0].keys())
+            self._open(section, ["Page"] + columns)
+        known = set(columns)
+        for entry in rows:
+            extra = entry.keys() - known
+            if extra and not extra <= self._dropped.setdefault(section, set()):
+                self._dropped[section] |= extra
+                logging.warning(f"{self.base} [{section}]: columns {sorted(extra)} not in the first row, dropped")
+            yield [page_name] + [entry.get(c, "") for c in columns]
+
+    def add_page(self, page_name, page_data):
+        for section, section_data in _streamed_sections(page_data):
+            for row in self._rows(section, page_name, section_data):
+                self._write(section, row)
+
+    def _write_url_info(self, pages, url_info_overrides):
+        opened = False
+        for page_name, url_info in _url_info_rows(pages, url_info_overrides):
+            if not opened:
+                self._open("url_info", ["Page"] + URL_INFO_COLUMNS)
+                opened = True
+            self._write("url_info", [page_name] + [url_info.get(c, "") for c in URL_INFO_COLUMNS])
+
+    @abc.abstractmethod
+    def _open(self, section, header):
+        """Start the table of `section` with its header row."""
+
+    @abc.abstractmethod
+    def _write(self, section, row):
+        """Append one row to the table of `section`."""
+
+
+@register_sink("csv")
+class CsvSink(_TabularSink):
+    def __init__(self, out_dir: str):
+        super().__init__(out_dir)
+        self._files = {}  # section -> (file, csv.writer, path)
+
+    def _open(self, section, header):
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = f"{self.base}_{section}.csv"
+        f = open(path, "w", newline="", encoding="utf-8")
+        writer = csv.writer(f)
+        writer.writerow(header)
+        self._files[section] = (f, writer, path)
+
+    def _write(self, section, row):
+        self._files[section][1].writerow(row)
+
+    def close(self, pages, url_info_overrides=None):
+        self._write_url_info(pages, url_info_overrides)
+        paths = []
+        for f, _, path in self._files.values():
+            f.close()
+            paths.append(path)
+        self._files.clear()
+        for path in paths:
+            logging.info(f"🧾 CSV saved → {path}")
+        return paths
+
+    def abort(self):
+        for f, _, _ in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+@register_sink("jsonl")
+class JsonlSink(ExportSink):
+    """Every row of every section in one gzip JSON-lines file, values as extracted."""
+
+    def __init__(self, out_dir: str):
+        super().__init__(out_dir)
+        self.path = f"{self.base}.jsonl.gz"
+        self._fh = None
+
+    def _line(self, section, page_name, row):
+        if self._fh is None:
+            os.makedirs(self.out_dir, exist_ok=True)
+            self._fh = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6)
+        self._fh.write(json.dumps({"section": section, "Page": page_name, **row},
+                                  ensure_ascii=False, default=str))
+        self._fh.write("\n")
+
+    def add_page(self, page_name, page_data):
+        for section, section_data in _streamed_sections(page_data):
+            for row in _dict_rows(section_data):
+                self._line(section, page_name, row)
+
+    def close(self, pages, url_info_overrides=None):
+        for page_name, url_info in _url_info_rows(pages, url_info_overrides):
+            self._line("url_info", page_name, url_info)
+        if self._fh is None:
+            return []
+        self._fh.close()
+        self._fh = None
+        logging.info(f"🧾 JSONL saved → {self.path}")
+        return [self.path]
+
+    def abort(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise RuntimeError(
+            "pyarrow is required for Parquet export. Install with 'pip install pyarrow'."
+        ) from exc
+    return pyarrow
+
+
+@register_sink("parquet")
+class ParquetSink(_TabularSink):
+    """One Parquet file per section; every column is a string, as in the workbook."""
+
+    row_group_size = 50_000
+
+    def __init__(self, out_dir: str):
+        super().__init__(out_dir)
+        self._pa = _import_pyarrow()
+        self._tables = {}  # section -> [writer, schema, buffered rows, path]
+
+    @classmethod
+    def check_available(cls):
+        _import_pyarrow()
+
+    def _open(self, section, header):
+        pa = self._pa
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = f"{self.base}_{section}.parquet"
+        schema = pa.schema([(name, pa.string()) for name in header])
+        writer = pa.parquet.ParquetWriter(path, schema, compression="snappy")
+        self._tables[section] = [writer, schema, [], path]
+
+    def _write(self, section, row):
+        table = self._tables[section]
+        table[2].append(["" if v is None else str(v) for v in row])
+        if len(table[2]) >= self.row_group_size:
+            self._flush(table)
+
+    def _flush(self, table):
+        writer, schema, rows, _ = table
+        if rows:
+            columns = [self._pa.array(col, type=self._pa.string()) for col in zip(*rows)]
+            writer.write_table(self._pa.Table.from_arrays(columns, schema=schema))
+            rows.clear()
+
+    def close(self, pages, url_info_overrides=None):
+        self._write_url_info(pages, url_info_overrides)
+        paths = []
+        for table in self._tables.values():
+            self._flush(table)
+            table[0].close()
+            paths.append(table[3])
+        self._tables.clear()
+        for path in paths:
+            logging.info(f"🧾 Parquet saved → {path}")
+        return paths
+
+    def abort(self):
+        for table in self._tables.values():
+            table[0].close()
+        self._tables.clear()
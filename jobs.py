@@ -0,0 +1,181 @@
+# jobs.py
+"""
+Background jobs for long crawls / shop scrapes.
+
+A job runs on a bounded thread pool and writes into its own work dir. The HTTP
+layer only submits jobs and polls their snapshot, so no request is held open
+for the length of a crawl and a dropped connection doesn't lose the work.
+Every progress report or status change bumps `Job.version`, so an event stream
+can tell cheaply whether there is anything new to send.
+"""
+import os
+import time
+import uuid
+import shutil
+import logging
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import ACTIVE_JOBS
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """State of one background job. `report()` is called from the worker thread."""
+
+    RATE_WINDOW_S = 30.0
+
+    def __init__(self, kind: str, counter_key: str, workdir: str, total_key: str | None = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.counter_key = counter_key
+        self.total_key = total_key
+        self.workdir = workdir
+        self.state_file: str | None = None
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.progress: dict = {}
+        self.result_path: str | None = None
+        self.error: str | None = None
+        self.version = 0  # bumped on every report / status change
+        self._samples = deque()  # (monotonic ts, counter) for the current-rate window
+        self._lock = threading.Lock()
+
+    def report(self, stats: dict):
+        now = time.monotonic()
+        with self._lock:
+            self.progress = dict(stats)
+            self._samples.append((now, stats.get(self.counter_key, 0)))
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.RATE_WINDOW_S:
+                self._samples.popleft()
+            self.version += 1
+
+    def set_status(self, status: str):
+        with self._lock:
+            self.status = status
+            self.version += 1
+
+    def rate_per_min(self) -> float:
+        with self._lock:
+            if len(self._samples) < 2:
+                return 0.0
+            (t0, c0), (t1, c1) = self._samples[0], self._samples[-1]
+        return round((c1 - c0) * 60.0 / (t1 - t0), 2) if t1 > t0 else 0.0
+
+    def eta_s(self, progress: dict, rate_per_min: float) -> float | None:
+        """Seconds left at the current rate, if the job reports a total."""
+        total = progress.get(self.total_key) if self.total_key else None
+        if total is None or rate_per_min <= 0:
+            return None
+        left = total - progress.get(self.counter_key, 0)
+        if "queue_depth" in progress:  # a crawl stops early when its frontier runs dry
+            left = min(left, progress["queue_depth"] + progress.get("in_flight", 0))
+        return round(max(0, left) * 60.0 / rate_per_min, 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            progress = dict(self.progress)
+            version = self.version
+        rate = self.rate_per_min()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": progress,
+            "rate_per_min": rate,
+            "eta_s": self.eta_s(progress, rate) if self.status == RUNNING else None,
+            "version": version,
+            "error": self.error,
+            "result_ready": self.status == DONE and bool(self.result_path),
+        }
+
+
+class JobManager:
+    """
+    max_workers: jobs running at once (each crawl may run its own fetch pool).
+    max_queued: jobs waiting for a worker before submit() raises JobQueueFull.
+    ttl_s: finished jobs (and their work dirs and state files) are pruned after this many seconds.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 20, ttl_s: float = 3600.0):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_queued = max_queued
+        self.ttl_s = ttl_s
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn, counter_key: str, total_key: str | None = None,
+               state_file=None) -> Job:
+        """
+        Run fn(job) in the background; fn returns the path of the result artifact.
+        counter_key / total_key: progress keys for work done / total work (rate and ETA).
+        state_file: a file the job keeps outside its work dir (a crawl checkpoint),
+        deleted with it; a callable gets the new job id and returns the path.
+        """
+        with self._lock:
+            waiting = sum(1 for j in self._jobs.values() if j.status == QUEUED)
+            if waiting >= self.max_queued:
+                raise JobQueueFull(f"{waiting} jobs already waiting")
+            job = Job(kind, counter_key, tempfile.mkdtemp(prefix=f"{kind}_job_"), total_key=total_key)
+            job.state_file = state_file(job.id) if callable(state_file) else state_file
+            self._jobs[job.id] = job
+        self.prune()  # after registering, so a resume keeps the state file it continues from
+        self._pool.submit(self._run, job, fn)
+        logging.info(f"[jobs] queued {kind} job {job.id}")
+        return job
+
+    def _run(self, job: Job, fn):
+        job.started = time.time()
+        job.set_status(RUNNING)
+        try:
+            job.result_path = fn(job)
+            job.finished = time.time()
+            job.set_status(DONE)
+        except Exception as e:
+            logging.exception(f"[jobs] {job.kind} job {job.id} failed")
+            job.error = str(e)
+            job.finished = time.time()
+            job.set_status(FAILED)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.status in (QUEUED, RUNNING))
+
+    def prune(self):
+        cutoff = time.time() - self.ttl_s
+        with self._lock:
+            expired = [j for j in self._jobs.values() if j.finished and j.finished < cutoff]
+            for j in expired:
+                del self._jobs[j.id]
+            # a resumed crawl shares its state file with the job it continues
+            in_use = {j.state_file for j in self._jobs.values()}
+        for j in expired:
+            shutil.rmtree(j.workdir, ignore_errors=True)
+            if j.state_file and j.state_file not in in_use:
+                try:
+                    os.remove(j.state_file)
+                except FileNotFoundError:
+                    pass
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+JOBS = JobManager(max_workers=int(os.environ.get("SCRAPER_JOB_WORKERS", "2")))
+ACTIVE_JOBS.set_function(JOBS.active_count)
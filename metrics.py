@@ -0,0 +1,164 @@
+# metrics.py
+"""
+Process-wide counters, gauges and histograms, exposed at /metrics in the
+Prometheus text format (version 0.0.4).
+
+Kept dependency-free and cheap enough to leave on: an update is a dict lookup
+and an add under a per-metric lock (plus a bisect for histograms); formatting
+only happens when /metrics is scraped. Label values must stay low-cardinality
+(status codes, crawl types, backends), never URLs.
+
+Extraction run in parse_workers processes is not recorded: those processes
+have their own copy of these objects.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# seconds; covers cached HEADs (ms) up to slow renders / timeouts
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra="") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_num(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.fn = None  # optional callable returning the (unlabelled) value at scrape time
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn):
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        if self.fn is not None:
+            self.set(self.fn())
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (last slot: above every bound), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="{}"'.format("+Inf" if bound == float("inf") else _num(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------- INSTRUMENTS -----------------------------
+
+FETCH_SECONDS = Histogram("scraper_fetch_seconds", "HTTP request latency (one hop, headers + body).",
+                          ["backend"])
+HTTP_RESPONSES = Counter("scraper_http_responses_total", "HTTP responses by status code.", ["code"])
+FETCH_RETRIES = Counter("scraper_fetch_retries_total", "Requests retried after 429/503.", ["code"])
+FETCH_ERRORS = Counter("scraper_fetch_errors_total", "Requests that failed without a response.", ["backend"])
+BYTES_DOWNLOADED = Counter("scraper_bytes_downloaded_total", "Page bytes downloaded by crawls.")
+PAGES = Counter("scraper_pages_total", "Pages committed by crawls, by outcome.", ["outcome"])
+PARSE_SECONDS = Histogram("scraper_parse_seconds", "Extraction time per page, by crawl type "
+                          "(soup = HTML parse shared by all types).", ["crawl_type"])
+EXCEL_WRITE_SECONDS = Histogram("scraper_excel_write_seconds", "Workbook write time, by workbook "
+                                "(page or combined) and crawl types.", ["workbook", "crawl_type"])
+FRONTIER_PENDING = Gauge("scraper_frontier_pending", "URLs queued in running crawls' frontiers.")
+ACTIVE_CRAWLS = Gauge("scraper_active_crawls", "crawl_pages calls in progress.")
+ACTIVE_JOBS = Gauge("scraper_active_jobs", "Background jobs queued or running.")
+RENDER_SECONDS = Histogram("scraper_browser_render_seconds", "Playwright page render time.")
@@ -0,0 +1,133 @@
+# near_dup.py
+"""
+Near-duplicate detection for crawled pages.
+
+Each page's visible text gets a 64-bit SimHash over 3-word shingles. Two pages
+are near duplicates when their signatures differ in at most MAX_DISTANCE bits.
+Signatures are indexed LSH-style in BANDS bands of 16 bits: if two 64-bit values
+differ in at most 3 bits, at least one of the 4 bands is identical (pigeonhole),
+so comparing a new page only against pages sharing a band finds every match
+without a pairwise pass over the crawl.
+
+Pages with byte-for-byte identical signatures are grouped and compared once.
+Per signature only a running count of near-duplicate pages and the closest match
+are kept, never the matching pairs, and a band bucket stops growing at
+MAX_BUCKET signatures: on boilerplate-heavy sites thousands of pages share a band,
+and scanning or storing all of them would grow pairwise. A match whose only
+shared band is full is missed unless another band catches it.
+"""
+import re
+import hashlib
+from collections import Counter, defaultdict
+
+SIGNATURE_KEY = "simhash"  # page_data key carrying the signature (not a report section)
+SHINGLE_WORDS = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+MAX_DISTANCE = 3
+MAX_BUCKET = 256  # signatures kept per (band, value) bucket
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def simhash(text: str, shingle_words: int = SHINGLE_WORDS) -> int | None:
+    """64-bit SimHash of the word shingles in `text`, or None if it has no words."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    if len(words) < shingle_words:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)]
+    digests = [hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles]
+
+    # Vote per bit: count byte values per position once, then spread them over the 8 bits
+    votes = [0] * 64
+    for pos in range(8):
+        for value, count in Counter(d[pos] for d in digests).items():
+            for bit in range(8):
+                if value >> bit & 1:
+                    votes[pos * 8 + bit] += count
+    half = len(digests) / 2
+    sig = 0
+    for i, v in enumerate(votes):
+        if v > half:
+            sig |= 1 << i
+    return sig
+
+
+def _bands(sig: int):
+    return [(b, (sig >> (b * BAND_BITS)) & _BAND_MASK) for b in range(BANDS)]
+
+
+class NearDupIndex:
+    """
+    add(key, sig, label) as pages are committed; results() once the crawl ends.
+    Keys are the crawler's page ids, labels what is reported as the closest match.
+    """
+
+    def __init__(self, max_distance: int = MAX_DISTANCE, max_bucket: int = MAX_BUCKET):
+        self.max_distance = max_distance
+        self.max_bucket = max_bucket
+        self._buckets = defaultdict(list)   # (band, value) -> [sig, ...], at most max_bucket
+        self._groups = {}                   # sig -> [key, ...] in commit order
+        self._near = {}                     # sig -> [pages in other groups within range, closest sig, distance]
+        self._labels = {}
+
+    def add(self, key, sig: int | None, label: str = ""):
+        if sig is None:
+            return
+        self._labels[key] = label
+        group = self._groups.get(sig)
+        if group is not None:
+            group.append(key)
+            if self._near[sig][1] is not None:  # one more page for each neighbour to count
+                for other, _ in self._matches(sig):
+                    self._near[other][0] += 1
+            return
+        self._groups[sig] = [key]
+        near = self._near[sig] = [0, None, None]
+        for other, d in self._matches(sig):
+            near[0] += len(self._groups[other])
+            if near[1] is None or d < near[2]:
+                near[1:] = other, d
+            theirs = self._near[other]
+            theirs[0] += 1
+            if theirs[1] is None or d < theirs[2]:
+                theirs[1:] = sig, d
+        for band in _bands(sig):
+            bucket = self._buckets[band]
+            if len(bucket) < self.max_bucket:
+                bucket.append(sig)
+
+    def _matches(self, sig: int):
+        """(other signature, distance) for every indexed signature within range of sig."""
+        checked = {sig}
+        for band in _bands(sig):
+            for other in self._buckets.get(band, ()):
+                if other in checked:
+                    continue
+                checked.add(other)
+                d = (sig ^ other).bit_count()
+                if d <= self.max_distance:
+                    yield other, d
+
+    def results(self) -> dict:
+        """key -> {"Closest Near Duplicate Match": label, "No. Near Duplicates": count}"""
+        out = {}
+        for sig, keys in self._groups.items():
+            others, closest_sig, _ = self._near[sig]
+            for key in keys:
+                count = len(keys) - 1 + others
+                if len(keys) > 1:
+                    closest = next(k for k in keys if k != key)
+                elif closest_sig is not None:
+                    closest = self._groups[closest_sig][0]
+                else:
+                    closest = None
+                out[key] = {
+                    "Closest Near Duplicate Match": self._labels[closest] if closest is not None else "",
+                    "No. Near Duplicates": count,
+                }
+        return out
@@ -0,0 +1,88 @@
+# page_analyzer.py
+"""
+One-pass page analysis shared by the crawler_excel scrapers.
+
+PageAnalysis walks the parsed tree once and buckets every tag by name in
+document order. The scrapers then read headings, paragraphs, images, links,
+meta/link tags and the DOM count from those buckets instead of each running
+their own find_all() passes. The page text (soup.get_text()) is computed at
+most once, and only when a scraper asks for it.
+"""
+import logging
+from collections import defaultdict
+
+from bs4 import BeautifulSoup
+
+HTML_PARSER = "html.parser"
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def make_soup(markup, parser: str = HTML_PARSER) -> BeautifulSoup:
+    """
+    parser: "html.parser" (default), "lxml", or "auto" (lxml when installed).
+    lxml is several times faster on large pages but may repair broken markup
+    differently, so it is opt-in.
+    """
+    if parser == "auto":
+        parser = "lxml" if _lxml_available() else HTML_PARSER
+    elif parser == "lxml" and not _lxml_available():
+        logging.warning("lxml is not installed; falling back to html.parser.")
+        parser = HTML_PARSER
+    return BeautifulSoup(markup, parser)
+
+
+def _attr_matches(tag, attr: str, value) -> bool:
+    """Same matching rules as find_all(name, attr=value) for a str / True / compiled regex."""
+    v = tag.get(attr)
+    if v is None:
+        return False
+    if value is True:
+        return True
+    candidates = v if isinstance(v, list) else [v]
+    if isinstance(v, list):
+        candidates = candidates + [" ".join(v)]
+    if hasattr(value, "search"):
+        return any(value.search(c) for c in candidates)
+    return value in candidates
+
+
+class PageAnalysis:
+    def __init__(self, soup):
+        self.soup = soup
+        self.by_name = defaultdict(list)
+        count = 0
+        for tag in soup.find_all(True):
+            self.by_name[tag.name].append(tag)
+            count += 1
+        self.dom_count = count
+        self._text = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.soup.get_text()
+        return self._text
+
+    def tags(self, name: str, **attrs) -> list:
+        """Equivalent of soup.find_all(name, **attrs), served from the buckets."""
+        found = self.by_name.get(name, [])
+        if not attrs:
+            return found
+        return [t for t in found if all(_attr_matches(t, a, v) for a, v in attrs.items())]
+
+    def first(self, name: str, **attrs):
+        """Equivalent of soup.find(name, **attrs)."""
+        if not attrs:
+            found = self.by_name.get(name)
+            return found[0] if found else None
+        for t in self.by_name.get(name, []):
+            if all(_attr_matches(t, a, v) for a, v in attrs.items()):
+                return t
+        return None
@@ -0,0 +1,110 @@
+# page_store.py
+"""
+On-disk spill of per-page crawl results.
+
+crawl_pages appends each page's extraction to a PageSpill (JSON lines in a temp
+file) as soon as it is committed, instead of holding every page in memory until
+the crawl ends. The spill also tracks each section's column headers as rows
+arrive, so write_master_excel can stream the file once into a write-only
+workbook.
+"""
+import os
+import json
+import tempfile
+
+from crawl_priority import ANCHORS_KEY
+from near_dup import SIGNATURE_KEY
+
+# Sections that are crawl plumbing rather than report data
+NON_REPORT_SECTIONS = ("links", SIGNATURE_KEY, ANCHORS_KEY)
+
+# url_info columns of the combined reports, in report order
+URL_INFO_COLUMNS = [
+    "URL","Content Type","Status Code","Status","Indexability","Indexability Status",
+    "Title 1","Title 1 Length","Title 1 Pixel Width",
+    "Meta Description 1","Meta Description 1 Length","Meta Description 1 Pixel Width",
+    "Meta Description 2","Meta Description 2 Length","Meta Description 2 Pixel Width",
+    "Meta Keywords 1","Meta Keywords 1 Length",
+    "H1-1","H1-1 Length","H2-1","H2-1 Length","H2-2","H2-2 Length",
+    "Meta Robots 1","X-Robots-Tag 1","Meta Refresh 1",
+    "Canonical Link Element 1","Canonical Link Element 2",
+    'rel="next" 1','rel="prev" 1','HTTP rel="next" 1','HTTP rel="prev" 1',
+    "amphtml Link Element","Size (bytes)","Transferred (bytes)","Total Transferred (bytes)",
+    "CO2 (mg)","Carbon Rating","Word Count","Sentence Count","Average Words Per Sentence",
+    "Flesch Reading Ease Score","Readability","Text Ratio","Crawl Depth","Folder Depth",
+    "Link Score","Inlinks Unique","Inlinks Unique JS","Inlinks % of Total","Outlinks",
+    "Unique Outlinks","Unique JS Outlinks","External Outlinks","Unique External Outlinks",
+    "Unique External JS Outlinks","Closest Near Duplicate Match","No. Near Duplicates",
+    "Spelling Errors","Grammar Errors","Hash","Response Time","Last Modified",
+    "Redirect URL","Redirect Type","Cookies Language","HTTP Version","Mobile Alternate Link",
+    "Closest Semantically Similar Address","Semantic Similarity Score","No. Semantically Similar",
+    "Semantic Relevance Score","URL Encoded Address","Crawl Timestamp","Final URL","Redirected?","Redirect Chain"
+]
+
+
+def _tuples_to_dicts(section, section_data):
+    # Backward-compat: if images are tuples, convert to dicts
+    if section == "images" and isinstance(section_data, list) and section_data and isinstance(section_data[0], (tuple, list)):
+        return [{"src": t[0], "alt": t[1]} for t in section_data]
+    return section_data
+
+
+class SectionHeaders:
+    """Incrementally collects the master-sheet headers for each section."""
+
+    def __init__(self):
+        self.sections: list[str] = []
+        self.headers: dict[str, list[str]] = {}
+
+    def add(self, page_data: dict):
+        if not self.sections:
+            self.sections = [k for k in page_data.keys() if k not in NON_REPORT_SECTIONS]
+            self.headers = {s: [] for s in self.sections}
+        for section in self.sections:
+            headers = self.headers[section]
+            section_data = _tuples_to_dicts(section, page_data.get(section))
+            if isinstance(section_data, dict):
+                headers.extend(h for h in section_data.keys() if h not in headers)
+            elif isinstance(section_data, list) and section_data:
+                if isinstance(section_data[0], dict):
+                    headers.extend(h for h in section_data[0].keys() if h not in headers)
+                elif "Value" not in headers:
+                    headers.append("Value")
+
+
+class PageSpill:
+    """
+    Append-only JSONL store of (page_name, page_data) rows for one output folder.
+    Iterating re-reads the file from disk, one page at a time.
+    """
+
+    def __init__(self, spill_dir: str | None = None):
+        fd, self.path = tempfile.mkstemp(prefix="pages_", suffix=".jsonl", dir=spill_dir)
+        self._fh = os.fdopen(fd, "w", encoding="utf-8")
+        self.columns = SectionHeaders()
+        self.count = 0
+
+    def append(self, page_name: str, page_data: dict):
+        self.columns.add(page_data)
+        row = {k: v for k, v in page_data.items() if k not in NON_REPORT_SECTIONS}
+        self._fh.write(json.dumps([page_name, row], ensure_ascii=False, default=str))
+        self._fh.write("\n")
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self._fh.flush()
+        with open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                page_name, page_data = json.loads(line)
+                yield page_name, page_data
+
+    def close(self):
+        if not self._fh.closed:
+            self._fh.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
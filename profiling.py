@@ -0,0 +1,208 @@
+# profiling.py
+"""
+Opt-in per-stage timing of crawled pages (crawl_pages(profile=True)).
+
+Code paths mark their stages with `stage(name)`:
+
+  rate_wait   waiting for the host's token bucket
+  fetch       HTTP requests (all hops / retries)
+  soup        HTML parse + PageAnalysis
+  html, url_info, performance, images   the extractors
+  textstat    readability scoring (inside url_info)
+  probes      asset HEAD probes (inside performance / images)
+  write_excel the page's individual workbook (on a writer thread, after the page:
+              recorded with CrawlProfiler.timed, not part of the page's total)
+
+A stage only records when the current thread is working on a page for a
+CrawlProfiler (`with profiler.page(url)`), so outside profiling it costs one
+thread-local lookup. Each stage records wall time and the thread's CPU time
+(time.thread_time), so I/O waits show up as wall time without CPU. Nested
+stages (textstat, probes) are also counted in their parent.
+
+At the end, CrawlProfiler.write() saves timings.json: p50/p95/p99 and totals
+per stage, plus the slowest pages. With sample_rate > 0 that fraction of pages
+also runs under cProfile (one page at a time); the slowest of those are dumped
+as .prof files with a pstats text summary next to them.
+"""
+import cProfile
+import heapq
+import io
+import json
+import math
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name: str, histogram=None, **labels):
+    """Time a stage for the current page's profile and/or a metrics histogram."""
+    timings = getattr(_local, "timings", None)
+    if timings is None and histogram is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        if histogram is not None:
+            histogram.observe(wall, **labels)
+        if timings is not None:
+            spent = timings.setdefault(name, [0.0, 0.0])
+            spent[0] += wall
+            spent[1] += time.thread_time() - cpu
+
+
+def record(name: str, wall: float, cpu: float = 0.0):
+    """Add a stage measured elsewhere (e.g. a request timed on the async loop)."""
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        spent = timings.setdefault(name, [0.0, 0.0])
+        spent[0] += wall
+        spent[1] += cpu
+
+
+def percentile(sorted_values, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(q / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+class CrawlProfiler:
+    def __init__(self, sample_rate: float = 0.0, keep_profiles: int = 5, slowest: int = 10):
+        self.sample_rate = sample_rate
+        self.keep_profiles = keep_profiles
+        self.slowest = slowest
+        self._pages = {}        # url -> {stage: [wall, cpu], "_total": [wall, cpu]}
+        self._profiles = []     # min-heap of (wall, seq, url, pstats.Stats)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()  # cProfile can only watch one page at a time
+
+    @contextmanager
+    def page(self, url: str):
+        """Attribute stages run on this thread to `url` (may be entered several times per page)."""
+        timings = {}
+        outer = getattr(_local, "timings", None)
+        _local.timings = timings
+        prof = None
+        if self.sample_rate and random.random() < self.sample_rate and self._cprofile_lock.acquire(blocking=False):
+            prof = cProfile.Profile()
+            prof.enable()
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            _local.timings = outer
+            if prof is not None:
+                prof.disable()
+                self._cprofile_lock.release()
+            with self._lock:
+                merged = self._pages.setdefault(url, {})
+                for name, (w, c) in list(timings.items()) + [("_total", (wall, cpu))]:
+                    spent = merged.setdefault(name, [0.0, 0.0])
+                    spent[0] += w
+                    spent[1] += c
+                if prof is not None:
+                    self._keep_profile(wall, url, prof)
+
+    @contextmanager
+    def timed(self, url: str, name: str):
+        """Add a stage run for `url` outside page() (e.g. on a background thread), leaving its total alone."""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            with self._lock:
+                spent = self._pages.setdefault(url, {}).setdefault(name, [0.0, 0.0])
+                spent[0] += wall
+                spent[1] += cpu
+
+    def run(self, url: str, fn, *args, **kwargs):
+        with self.page(url):
+            return fn(*args, **kwargs)
+
+    def _keep_profile(self, wall, url, prof):
+        self._seq += 1
+        item = (wall, self._seq, url, pstats.Stats(prof))
+        if len(self._profiles) < self.keep_profiles:
+            heapq.heappush(self._profiles, item)
+        else:
+            heapq.heappushpop(self._profiles, item)
+
+    def summary(self) -> dict:
+        with self._lock:
+            pages = {u: dict(t) for u, t in self._pages.items()}
+        per_stage = {}
+        for timings in pages.values():
+            for name, (wall, cpu) in timings.items():
+                walls, cpus = per_stage.setdefault(name, ([], []))
+                walls.append(wall)
+                cpus.append(cpu)
+        stages = {}
+        for name, (walls, cpus) in sorted(per_stage.items(), key=lambda kv: -sum(kv[1][0])):
+            walls.sort()
+            cpus.sort()
+            stages[name.lstrip("_")] = {
+                "pages": len(walls),
+                "wall": {"p50": percentile(walls, 50), "p95": percentile(walls, 95),
+                         "p99": percentile(walls, 99), "total": sum(walls)},
+                "cpu": {"p50": percentile(cpus, 50), "p95": percentile(cpus, 95),
+                        "p99": percentile(cpus, 99), "total": sum(cpus)},
+            }
+        pages = {u: t for u, t in pages.items() if "_total" in t}  # not only timed() stages
+        slowest = sorted(pages.items(), key=lambda kv: -kv[1]["_total"][0])[:self.slowest]
+        return {
+            "pages": len(pages),
+            "stages": _rounded(stages),
+            "slowest_pages": [{"url": u, "wall_s": round(t["_total"][0], 4),
+                               "stages": {n: round(w, 4) for n, (w, _) in t.items() if n != "_total"}}
+                              for u, t in slowest],
+        }
+
+    def write(self, out_dir: str) -> list[str]:
+        """Write timings.json (+ profiles/ when sampling); returns the paths written."""
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        report = self.summary()
+        if self._profiles:
+            prof_dir = os.path.join(out_dir, "profiles")
+            os.makedirs(prof_dir, exist_ok=True)
+            report["profiles"] = []
+            for rank, (wall, _, url, stats) in enumerate(sorted(self._profiles, reverse=True), start=1):
+                base = os.path.join(prof_dir, f"{rank:02d}_{_slug(url)}")
+                stats.dump_stats(base + ".prof")
+                text = io.StringIO()
+                pstats.Stats(base + ".prof", stream=text).sort_stats("cumulative").print_stats(40)
+                with open(base + ".txt", "w", encoding="utf-8") as f:
+                    f.write(f"{url}\n{wall:.3f}s wall\n\n{text.getvalue()}")
+                paths += [base + ".prof", base + ".txt"]
+                report["profiles"].append({"url": url, "wall_s": round(wall, 4),
+                                           "file": os.path.relpath(base + ".prof", out_dir)})
+        path = os.path.join(out_dir, "timings.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return [path] + paths
+
+
+def _rounded(obj):
+    if isinstance(obj, float):
+        return round(obj, 6)
+    if isinstance(obj, dict):
+        return {k: _rounded(v) for k, v in obj.items()}
+    return obj
+
+
+def _slug(url: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", url.split("://", 1)[-1]).strip("_")[:80] or "page"
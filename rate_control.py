@@ -0,0 +1,122 @@
+# rate_control.py
+"""
+Adaptive (AIMD) request rate for one host.
+
+crawl_pages attaches an AdaptiveRate to the start host's token bucket. Every
+response feeds it back:
+
+  - success with stable latency      -> rpm += increase_rpm (additive increase)
+  - 429 / 503, timeouts, or latency  -> rpm *= decrease_factor (multiplicative
+    well above the host's baseline     decrease, at most once per cooldown)
+  - Retry-After                       -> no request before that time
+  - failure_threshold failures in a   -> circuit opens: the host is left alone
+    row (429/5xx/connection errors)      for open_seconds (doubling each time,
+                                         up to max_open_seconds); the first
+                                         request after that decides whether it
+                                         closes or opens again
+
+While the circuit would hold a request back longer than max_wait, requests
+fail fast with HostUnavailable instead of queueing behind it; crawl_pages puts
+the URL back in its queue and waits out unavailable_for().
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+
+
+class HostUnavailable(requests.RequestException):
+    """The host's circuit breaker is open."""
+
+
+class AdaptiveRate:
+    def __init__(self, start_rpm: float = 12, min_rpm: float = 2, max_rpm: float = 120,
+                 increase_rpm: float = 1.0, decrease_factor: float = 0.5, latency_factor: float = 2.0,
+                 failure_threshold: int = 5, open_seconds: float = 30.0, max_open_seconds: float = 300.0,
+                 max_wait: float = 120.0, host: str = ""):
+        self.min_rpm = min_rpm
+        self.max_rpm = max(max_rpm, min_rpm)
+        self.rpm = float(min(max(start_rpm, min_rpm), self.max_rpm))
+        self.increase_rpm = increase_rpm
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.max_wait = max_wait
+        self.host = host
+        self.paused_until = 0.0   # monotonic time before which no request may start
+        self.cuts = 0
+        self.circuit_opens = 0
+        self._lock = threading.Lock()
+        self._latency = None      # fast EWMA of response latency
+        self._baseline = None     # best smoothed latency seen, relaxing slowly upward
+        self._last_cut = 0.0
+        self._failures = 0        # consecutive
+        self._open_for = open_seconds
+
+    # ---------- feedback ----------
+
+    def on_response(self, status: int, latency: float, retry_after: float | None = None):
+        now = time.monotonic()
+        with self._lock:
+            if status in (429, 503):
+                self._cut(now, f"HTTP {status}")
+                backoff = retry_after if retry_after is not None else min(8.0, 2.0 ** self._failures)
+                self.paused_until = max(self.paused_until, now + backoff + random.uniform(0.2, 0.8))
+                self._failure(now)
+                return
+            if status >= 500:
+                self._failure(now)
+                return
+
+            self._failures = 0
+            self._open_for = self.open_seconds
+            self._latency = latency if self._latency is None else 0.3 * latency + 0.7 * self._latency
+            self._baseline = (self._latency if self._baseline is None
+                              else min(self._latency, self._baseline * 1.01))
+            if (self._latency > self.latency_factor * self._baseline
+                    and self._latency - self._baseline > 0.05):
+                self._cut(now, f"latency {self._latency:.2f}s vs {self._baseline:.2f}s")
+            else:
+                self.rpm = min(self.max_rpm, self.rpm + self.increase_rpm)
+
+    def on_error(self):
+        """Connection error or timeout."""
+        now = time.monotonic()
+        with self._lock:
+            self._cut(now, "connection error")
+            self._failure(now)
+
+    def unavailable_for(self, now: float | None = None) -> float:
+        """Seconds until requests stop failing fast with HostUnavailable (0: available)."""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.paused_until - now - self.max_wait)
+
+    # ---------- internals (lock held) ----------
+
+    def _cut(self, now: float, reason: str):
+        # one cut per cooldown: a burst of in-flight responses reports the same overload
+        if now - self._last_cut < max(2.0, 2 * 60.0 / self.rpm):
+            return
+        self.rpm = max(self.min_rpm, self.rpm * self.decrease_factor)
+        self._last_cut = now
+        self.cuts += 1
+        logging.info(f"🐢 {self.host}: {reason}, slowing to {self.rpm:.1f} rpm.")
+
+    def _failure(self, now: float):
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self.paused_until = max(self.paused_until, now + self._open_for)
+            self.circuit_opens += 1
+            logging.warning(f"⛔ {self.host}: {self._failures} failures in a row, "
+                            f"pausing requests for {self._open_for:.0f}s.")
+            self._open_for = min(self.max_open_seconds, self._open_for * 2)
+            # half-open: the next failure re-opens straight away
+            self._failures = self.failure_threshold - 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"rpm": round(self.rpm, 1), "cuts": self.cuts, "circuit_opens": self.circuit_opens}
@@ -0,0 +1,327 @@
+# response_archive.py
+"""
+Raw response archive of a crawl, so extraction can be re-run without the network.
+
+crawl_pages(archive="site.warc.gz") saves the response of every committed page
+to a WARC 1.1 file with one gzip member per record (the usual .warc.gz layout,
+readable by standard WARC tools), plus an index next to it
+(site.warc.gz.idx.jsonl) giving each record's offset and length:
+
+  warcinfo   the crawl's start URLs and settings (JSON)
+  response   status line, headers and the decoded body of a crawled page
+  metadata   one asset probe result (status, size, redirect flag) as JSON
+
+Bodies are stored decoded, as resp.content. To keep the HTTP block
+well-formed, the original Content-Encoding, Transfer-Encoding and
+Content-Length headers are renamed X-Archive-Orig-* and put back on read, so
+extractors see the headers they saw live. What HTTP does not carry (the URL as
+crawled, the redirect chain, response time, encoding, HTTP version as urllib3
+reports it) goes into X-Crawl-* WARC header fields.
+
+crawler_excel.reextract() reads the archive back: read_payload() rebuilds the
+payload that _response_from_payload() turns into a requests.Response, and
+ArchivedProbes answers the performance/images probes from the metadata records.
+A resumed crawl appends to the archive and may fetch a page again; readers keep
+only the last response of each URL (ArchiveReader.page_entries).
+
+  python response_archive.py reextract site.warc.gz --types url_info,performance --out out/
+  python response_archive.py reindex site.warc.gz     # index lost in a crash
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+import uuid
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+
+WARC_VERSION = b"WARC/1.1"
+_HTTP_VERSIONS = {10: "HTTP/1.0", 11: "HTTP/1.1", 20: "HTTP/2", 30: "HTTP/3"}
+_RENAMED = ("content-encoding", "transfer-encoding", "content-length")
+_ORIG_PREFIX = "X-Archive-Orig-"
+
+# what a probe answers for an asset the archive has no record of
+MISSING_PROBE = {"status": None, "ok": False, "redirected": False, "size": 0,
+                 "content_type": "", "error": "not in archive"}
+
+
+def index_path(path: str) -> str:
+    return path + ".idx.jsonl"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _http_block(payload: dict) -> bytes:
+    status_line = (f"{_HTTP_VERSIONS.get(payload['http_version'], 'HTTP/1.1')} "
+                   f"{payload['status_code']} {payload['reason'] or ''}").rstrip()
+    lines = [status_line]
+    for name, value in payload["headers"]:
+        if name.lower() in _RENAMED:
+            name = _ORIG_PREFIX + name
+        lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(payload['content'])}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8") + payload["content"]
+
+
+def _parse_http_block(block: bytes):
+    head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *lines = head.decode("utf-8").split("\r\n")
+    _, status, *reason = status_line.split(" ", 2)
+    headers = []
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            continue  # ours; the original is under X-Archive-Orig-
+        if name.startswith(_ORIG_PREFIX):
+            name = name[len(_ORIG_PREFIX):]
+        headers.append((name, value.strip()))
+    return int(status), reason[0] if reason else "", headers, body
+
+
+class ArchiveWriter:
+    """Appends records to a .warc.gz and its index; safe to call from several threads."""
+
+    def __init__(self, path: str, info: dict | None = None, append: bool = False):
+        """append: add to an existing archive (a resumed crawl) instead of starting over."""
+        self.path = path
+        self.index_path = index_path(path)
+        self.counts = Counter()  # records written per WARC-Type
+        self._lock = threading.Lock()
+        self._out = open(path, "ab" if append else "wb")
+        self._index = open(self.index_path, "a" if append else "w", encoding="utf-8")
+        self._record("warcinfo", None, json.dumps(info or {}, ensure_ascii=False).encode("utf-8"),
+                     "application/json")
+
+    def _record(self, warc_type: str, target: str | None, block: bytes, content_type: str,
+                fields=(), index_fields=None):
+        headers = [("WARC-Type", warc_type), ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+                   ("WARC-Date", _now())]
+        if target:
+            headers.append(("WARC-Target-URI", target))
+        headers += list(fields)
+        headers += [("Content-Type", content_type), ("Content-Length", str(len(block)))]
+        head = "".join(f"{k}: {v}\r\n" for k, v in headers).encode("utf-8")
+        data = gzip.compress(WARC_VERSION + b"\r\n" + head + b"\r\n" + block + b"\r\n\r\n",
+                             compresslevel=6)
+        with self._lock:
+            offset = self._out.tell()
+            self._out.write(data)
+            entry = {"type": warc_type, "url": target, "offset": offset, "length": len(data)}
+            self._index.write(json.dumps({**entry, **(index_fields or {})}, ensure_ascii=False) + "\n")
+            self.counts[warc_type] += 1
+
+    def write_response(self, url: str, payload: dict):
+        """url: the URL as crawled; payload: crawler_excel._response_payload() of its response."""
+        fields = [("X-Crawl-URL", url),
+                  ("X-Crawl-Redirect-Chain", json.dumps(payload["redirect_chain"], ensure_ascii=False)),
+                  ("X-Crawl-Elapsed", repr(payload["elapsed"])),
+                  ("X-Crawl-HTTP-Version", json.dumps(payload["http_version"]))]
+        if payload["encoding"]:
+            fields.append(("X-Crawl-Encoding", payload["encoding"]))
+        self._record("response", payload["url"], _http_block(payload), "application/http; msgtype=response",
+                     fields, {"page": url, "status": payload["status_code"]})
+
+    def write_probe(self, url: str, result: dict):
+        """ProbeCache on_result hook: archive one asset probe."""
+        self._record("metadata", url, json.dumps(result).encode("utf-8"), "application/json")
+
+    def stats(self) -> dict:
+        return {"path": self.path, "records": dict(self.counts)}
+
+    def close(self):
+        with self._lock:
+            self._out.close()
+            self._index.close()
+
+
+# ----------------------------- READING -----------------------------
+
+def _parse_record(data: bytes):
+    """(WARC header fields, block) of one decompressed record."""
+    head, _, rest = data.partition(b"\r\n\r\n")
+    version, *lines = head.decode("utf-8").split("\r\n")
+    if not version.startswith("WARC/"):
+        raise ValueError(f"Not a WARC record: {version[:40]!r}")
+    fields = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        fields[name] = value.strip()
+    return fields, rest[:int(fields.get("Content-Length", 0))]
+
+
+def read_payload(fields: dict, block: bytes) -> dict:
+    """A response record as a crawler_excel._response_payload() dict."""
+    status, reason, headers, body = _parse_http_block(block)
+    return {
+        "url": fields.get("WARC-Target-URI", ""),
+        "status_code": status,
+        "reason": reason,
+        "headers": headers,
+        "content": body,
+        "encoding": fields.get("X-Crawl-Encoding") or None,
+        "elapsed": float(fields.get("X-Crawl-Elapsed", 0.0)),
+        "http_version": json.loads(fields.get("X-Crawl-HTTP-Version", '""')),
+        "redirect_chain": json.loads(fields.get("X-Crawl-Redirect-Chain", "[]")),
+    }
+
+
+class ArchiveReader:
+    """Random access to an archive's records through its index (rebuilt by scanning if missing)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if not os.path.exists(index_path(path)):
+            logging.warning(f"No index for {path}; scanning the archive")
+            self.entries = list(scan(path))
+        else:
+            with open(index_path(path), encoding="utf-8") as f:
+                self.entries = [json.loads(line) for line in f if line.strip()]
+        self._f = open(path, "rb")
+
+    def read(self, entry: dict):
+        self._f.seek(entry["offset"])
+        return _parse_record(gzip.decompress(self._f.read(entry["length"])))
+
+    def info(self) -> dict:
+        """The crawl settings of the first warcinfo record."""
+        for entry in self.entries:
+            if entry["type"] == "warcinfo":
+                return json.loads(self.read(entry)[1] or b"{}")
+        return {}
+
+    def probes(self) -> dict:
+        """Asset URL -> probe result; the last record wins when an asset was probed again."""
+        return {e["url"]: json.loads(self.read(e)[1]) for e in self.entries if e["type"] == "metadata"}
+
+    def page_entries(self) -> list[dict]:
+        """
+        Index entries of the response records, one per crawled URL. A resumed crawl
+        fetches the pages committed after its last checkpoint again and appends them
+        to the archive; the last record of a URL wins, in its place, which is the
+        order the resumed crawl's own output has.
+        """
+        responses = [e for e in self.entries if e["type"] == "response"]
+        last = {e.get("page") or e["url"]: i for i, e in enumerate(responses)}
+        return [e for i, e in enumerate(responses) if last[e.get("page") or e["url"]] == i]
+
+    def pages(self):
+        """(index entry, WARC fields, block) of each page, in the order the crawl committed them."""
+        for entry in self.page_entries():
+            fields, block = self.read(entry)
+            yield entry, fields, block
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def scan(path: str, read_size: int = 1 << 14):
+    """Index entries of every complete record, found by walking the gzip members."""
+    with open(path, "rb") as f:
+        offset, pending = 0, b""  # pending: bytes read past the end of the previous record
+        while True:
+            data = pending or f.read(read_size)
+            if not data:
+                return
+            d = zlib.decompressobj(wbits=31)
+            parts, length = [], 0
+            try:
+                while True:
+                    parts.append(d.decompress(data))
+                    if d.eof:
+                        pending = d.unused_data
+                        length += len(data) - len(pending)
+                        break
+                    length += len(data)
+                    data = f.read(read_size)
+                    if not data:
+                        logging.warning(f"{path}: truncated record at byte {offset}; stopping there")
+                        return
+            except zlib.error as e:
+                logging.warning(f"{path}: unreadable record at byte {offset} ({e}); stopping there")
+                return
+            fields, block = _parse_record(b"".join(parts))
+            entry = {"type": fields.get("WARC-Type"), "url": fields.get("WARC-Target-URI"),
+                     "offset": offset, "length": length}
+            if entry["type"] == "response":
+                entry.update(page=fields.get("X-Crawl-URL"), status=_parse_http_block(block)[0])
+            yield entry
+            offset += length
+
+
+def reindex(path: str) -> str:
+    """Rewrite the index of `path` from its records (after a crash cut the index short)."""
+    out = index_path(path)
+    with open(out, "w", encoding="utf-8") as f:
+        for entry in scan(path):
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return out
+
+
+class ArchivedProbes:
+    """
+    Stands in for asset_probe.ProbeCache when extracting from an archive: results
+    come from the metadata records, never from the network. Assets the crawl did
+    not probe answer MISSING_PROBE and are counted in `missing`.
+    """
+
+    def __init__(self, results: dict):
+        self.results = results
+        self.hits = 0
+        self.missing = 0
+
+    def probe(self, url: str) -> dict:
+        result = self.results.get(url)
+        if result is None:
+            self.missing += 1
+            return dict(MISSING_PROBE)
+        self.hits += 1
+        return result
+
+    def probe_many(self, urls) -> list[dict]:
+        return [self.probe(u) for u in urls]
+
+    def stats(self) -> dict:
+        return {"archived": len(self.results), "hits": self.hits, "missing": self.missing}
+
+    def close(self):
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+    rx = sub.add_parser("reextract", help="run extractors over an archive, offline")
+    rx.add_argument("archive")
+    rx.add_argument("--types", help="comma-separated crawl types (default: the archived crawl's)")
+    rx.add_argument("--keyword", help="keyword filter for html (default: the archived crawl's)")
+    rx.add_argument("--out", default="output_excels")
+    rx.add_argument("--formats", default="excel", help="export formats, e.g. excel,csv")
+    rx.add_argument("--workers", type=int, default=0, help="parse processes (0: in this process)")
+    rx.add_argument("--individual", action="store_true", help="also write per-page workbooks")
+    ri = sub.add_parser("reindex", help="rebuild the .idx.jsonl index from the archive")
+    ri.add_argument("archive")
+    args = ap.parse_args()
+
+    if args.command == "reindex":
+        print(f"Index saved → {reindex(args.archive)}")
+        return
+    from crawler_excel import reextract
+    reextract(args.archive, out_dir=args.out,
+              crawl_types=args.types.split(",") if args.types else None,
+              keyword_filter=args.keyword, export_formats=args.formats,
+              save_individual=args.individual, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# robots_policy.py
+"""
+robots.txt rules for one host, compiled once for fast per-URL checks.
+
+Follows RFC 9309 matching: rules from the group(s) for our user-agent (else
+"*"); `*` matches any run of characters and a trailing `$` anchors the end;
+the longest matching rule wins and Allow beats Disallow on a tie. Paths and
+patterns are compared percent-decoded, so /여행/ and /%EC%97%AC%ED%96%89/
+are the same path.
+
+Rules are kept sorted by precedence, so the first rule that matches is the
+answer; plain prefixes are checked with str.startswith, wildcard rules with a
+pre-compiled regex.
+"""
+import re
+from urllib.parse import unquote, urlparse
+
+
+class RobotsRule:
+    __slots__ = ("allow", "pattern", "label", "length", "_prefix", "_regex")
+
+    def __init__(self, allow: bool, pattern: str):
+        self.allow = allow
+        self.pattern = unquote(pattern)
+        self.label = f"{'Allow' if allow else 'Disallow'}: {pattern}"
+        self.length = len(self.pattern)
+        self._prefix, self._regex = None, None
+        if "*" in self.pattern or self.pattern.endswith("$"):
+            anchored = self.pattern.endswith("$")
+            body = self.pattern[:-1] if anchored else self.pattern
+            self._regex = re.compile(".*".join(re.escape(part) for part in body.split("*"))
+                                     + ("$" if anchored else ""), re.DOTALL)
+        else:
+            self._prefix = self.pattern
+
+    def matches(self, path: str) -> bool:
+        if self._prefix is not None:
+            return path.startswith(self._prefix)
+        return self._regex.match(path) is not None
+
+
+class RobotsPolicy:
+    def __init__(self, rules=(), crawl_delay: float | None = None, unreachable: bool = False):
+        # longest pattern first; Allow before Disallow at equal length
+        self.rules = sorted(rules, key=lambda r: (-r.length, not r.allow))
+        self.crawl_delay = crawl_delay
+        # stand-in while robots.txt can't be fetched: blocks for now, not for good
+        self.unreachable = unreachable
+
+    @classmethod
+    def parse(cls, text: str, user_agent: str = "*") -> "RobotsPolicy":
+        """Build the policy for `user_agent` (product token, e.g. "mybot") from robots.txt text."""
+        agent = user_agent.lower()
+        groups = []             # [(agents, [(field, value), ...])]
+        agents, lines = [], []
+        for raw in (text or "").splitlines():
+            line = raw.split("#", 1)[0].strip()
+            if ":" not in line:
+                continue
+            field, value = (s.strip() for s in line.split(":", 1))
+            field = field.lower()
+            if field == "user-agent":
+                if lines:  # a user-agent line after rules starts a new group
+                    groups.append((agents, lines))
+                    agents, lines = [], []
+                agents.append(value.lower())
+            elif field in ("allow", "disallow", "crawl-delay") and agents:
+                lines.append((field, value))
+        if agents:
+            groups.append((agents, lines))
+
+        chosen = [g for g in groups if agent != "*" and agent in g[0]]
+        if not chosen:
+            chosen = [g for g in groups if "*" in g[0]]
+
+        rules, crawl_delay = [], None
+        for _, group_lines in chosen:
+            for field, value in group_lines:
+                if field == "crawl-delay":
+                    try:
+                        crawl_delay = float(value)
+                    except ValueError:
+                        continue
+                elif value:  # an empty Disallow allows everything
+                    rules.append(RobotsRule(field == "allow", value))
+        return cls(rules, crawl_delay)
+
+    @classmethod
+    def disallow_all(cls) -> "RobotsPolicy":
+        """What RFC 9309 prescribes while robots.txt is unreachable (5xx, network error)."""
+        return cls([RobotsRule(False, "/")], unreachable=True)
+
+    def blocking_rule(self, url: str) -> str | None:
+        """The Disallow rule that blocks `url` (e.g. "Disallow: /private/"), or None if allowed."""
+        if not self.rules:
+            return None
+        p = urlparse(url)
+        path = unquote(p.path or "/") + (f"?{unquote(p.query)}" if p.query else "")
+        for rule in self.rules:
+            if rule.matches(path):
+                return None if rule.allow else rule.label
+        return None
+
+    def allowed(self, url: str) -> bool:
+        return self.blocking_rule(url) is None
@@ -11,6 +11,9 @@ from bs4 import BeautifulSoup
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 
+from metrics import RENDER_SECONDS
+from zip_stream import compress_type_for
+
 logging.basicConfig(level=logging.INFO)
 
 HEADERS = {
@@ -93,7 +96,7 @@ def fetch_rendered_html_with_browser(url: str, timeout_ms: int = 30000) -> str:
         ) from exc
 
     logging.info("BROWSER GET %s", url)
-    with sync_playwright() as p:
+    with RENDER_SECONDS.time(), sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
         page.goto(url, wait_until="networkidle", timeout=timeout_ms)
@@ -535,12 +538,11 @@ def save_products_excel(products: list[dict], out_path: str) -> str:
     return out_path
 
 
-def download_images_and_zip(products: list[dict], out_dir: str, zip_name: str = "images.zip") -> str:
+def download_images(products: list[dict], out_dir: str):
+    """Download product images into <out_dir>/images, yielding each file path as it is saved."""
     img_root = os.path.join(out_dir, "images")
     os.makedirs(img_root, exist_ok=True)
 
-    downloaded_files: list[str] = []
-
     for prod in products:
         base = slugify(prod.get("name") or prod.get("sku") or "product")
         for idx, img_url in enumerate(prod.get("image_urls", []), start=1):
@@ -558,13 +560,17 @@ def download_images_and_zip(products: list[dict], out_dir: str, zip_name: str =
             fpath = os.path.join(img_root, fname)
             with open(fpath, "wb") as f:
                 f.write(r.content)
-            downloaded_files.append(fpath)
+            yield fpath
+
+
+def download_images_and_zip(products: list[dict], out_dir: str, zip_name: str = "images.zip") -> str:
+    downloaded_files = list(download_images(products, out_dir))
 
     zip_path = os.path.join(out_dir, zip_name)
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
+    with zipfile.ZipFile(zip_path, "w") as z:
         for fp in downloaded_files:
             arc = os.path.relpath(fp, start=out_dir)
-            z.write(fp, arcname=arc)
+            z.write(fp, arcname=arc, compress_type=compress_type_for(arc))
 
     logging.info("Images zipped → %s", zip_path)
     return zip_path
@@ -580,10 +586,18 @@ def scrape_shop(
     include_excel: bool = True,
     include_images: bool = True,
     manual_product_urls: list[str] | None = None,  # NEW
+    progress=None,
+    on_artifact=None,
 ) -> tuple[str | None, str | None]:
     """
     Returns (excel_path | None, images_zip_path | None)
     based on include_excel / include_images flags.
+
+    progress: optional callable receiving a stats dict
+    (products_total, products_scraped, products_ok, failed, stage).
+    on_artifact: optional callable receiving each output file path as soon as it is
+    saved (the Excel, then every image under images/); images are then not zipped
+    and images_zip_path is None.
     """
 
     platform = get_platform(shop_url)
@@ -607,11 +621,18 @@ def scrape_shop(
         product_links = discover_product_links(shop_url, max_pages=max_pages)
         logging.info("Discovered %d product URLs", len(product_links))
 
+    def report(done: int, stage: str):
+        if progress:
+            progress({"products_total": len(product_links), "products_scraped": done,
+                      "products_ok": len(products), "failed": done - len(products), "stage": stage})
+
     products: list[dict] = []
-    for url in product_links:
+    report(0, "products")
+    for i, url in enumerate(product_links, start=1):
         p = scrape_product(url, platform=platform, shop_url=shop_url)
         if p:
             products.append(p)
+        report(i, "products")
         time.sleep(0.8)  # be polite
 
     if not products:
@@ -625,9 +646,16 @@ def scrape_shop(
     if include_excel:
         excel_path = os.path.join(out_dir, "products.xlsx")
         excel_path = save_products_excel(products, excel_path)
+        if on_artifact:
+            on_artifact(excel_path)
 
     if include_images:
-        images_zip_path = download_images_and_zip(products, out_dir=out_dir)
+        report(len(product_links), "images")
+        if on_artifact:
+            for fpath in download_images(products, out_dir=out_dir):
+                on_artifact(fpath)
+        else:
+            images_zip_path = download_images_and_zip(products, out_dir=out_dir)
 
     return excel_path, images_zip_path
 
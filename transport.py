@@ -0,0 +1,261 @@
+# transport.py
+"""
+Record/replay HTTP transport for the requests-based sessions.
+
+    with use_cassette("shop.cassette.gz", "record"):
+        crawl_pages([...])            # real network; every exchange is saved
+    with use_cassette("shop.cassette.gz"):
+        crawl_pages([...])            # same crawl, no network, no pacing
+
+A cassette is one gzip file of records: a JSON header line (method, URL,
+status, reason, headers, HTTP version, elapsed) followed by the body exactly as
+it came off the wire, still Content-Encoded. Replay rebuilds a urllib3 response
+from those bytes, so decompression, streaming reads (sitemaps) and
+resp.raw.version behave as they did live; resp.elapsed is restored from the
+recording. Each redirect hop is its own record. Requests that failed without a
+response are recorded too and raise the same requests exception on replay.
+
+Replay matches on method + URL. Repeated requests for a URL (429 retries,
+conditional re-fetches) are answered in recorded order; past the last record,
+the last one is repeated. A request that was never recorded raises CassetteMiss
+(a requests.ConnectionError, so the crawler logs it as a failed page).
+
+use_cassette() mounts on crawler_excel.SESSION and shop_scraper.SESSION, and
+sessions created while it is active through http_adapter() (asset probes, the
+crawl's pooled adapter) get the cassette too. It is process-wide: run one
+cassette at a time. Not covered: the async fetch backend (httpx) and
+Playwright renders.
+"""
+import gzip
+import io
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+import requests
+import urllib3
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.response import HTTPResponse
+
+RECORD, REPLAY = "record", "replay"
+
+_active = None  # the Cassette mounted by use_cassette(), if any
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Replay was asked for a request that is not in the cassette."""
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._records = defaultdict(list)  # (method, url) -> [(header, body)]
+        self._cursor = defaultdict(int)
+        self._out = None
+        if mode == RECORD:
+            self._out = gzip.open(path, "wb", compresslevel=6)
+        else:
+            self._load()
+
+    def _load(self):
+        count = 0
+        with gzip.open(self.path, "rb") as f:
+            try:
+                while True:
+                    line = f.readline()
+                    if not line:
+                        break
+                    header = json.loads(line)
+                    body = f.read(header.get("body", 0))
+                    self._records[(header["method"], header["url"])].append((header, body))
+                    count += 1
+            except (EOFError, OSError, ValueError) as e:
+                # a recording cut short (crash, Ctrl+C): keep what was complete
+                logging.warning("Cassette %s is truncated after %d records: %s", self.path, count, e)
+        logging.info("Loaded %d recorded exchanges from %s", count, self.path)
+
+    # ---------- record ----------
+
+    def save(self, header: dict, body: bytes = b""):
+        header["body"] = len(body)
+        line = json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            self._out.write(line)
+            self._out.write(body)
+            self.recorded += 1
+
+    # ---------- replay ----------
+
+    def next_record(self, method: str, url: str):
+        key = (method, url)
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                self.misses += 1
+                return None
+            i = self._cursor[key]
+            self._cursor[key] = i + 1
+            self.replayed += 1
+            return records[min(i, len(records) - 1)]
+
+    # ---------- wiring ----------
+
+    def adapter(self, **kwargs) -> HTTPAdapter:
+        cls = RecordingAdapter if self.mode == RECORD else ReplayAdapter
+        return cls(self, **kwargs)
+
+    def mount(self, session: requests.Session, **kwargs):
+        """
+        Route `session` through this cassette; returns its previous adapters (see unmount).
+        Without pool kwargs the cassette adapter keeps the size of the session's current pool.
+        """
+        previous = dict(session.adapters)
+        current = session.get_adapter("https://")
+        kwargs.setdefault("pool_connections", getattr(current, "_pool_connections", DEFAULT_POOLSIZE))
+        kwargs.setdefault("pool_maxsize", getattr(current, "_pool_maxsize", DEFAULT_POOLSIZE))
+        adapter = self.adapter(**kwargs)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if _restore_elapsed not in session.hooks["response"]:
+            session.hooks["response"].append(_restore_elapsed)
+        return previous
+
+    @staticmethod
+    def unmount(session: requests.Session, previous: dict):
+        session.adapters.clear()
+        session.adapters.update(previous)
+        if _restore_elapsed in session.hooks["response"]:
+            session.hooks["response"].remove(_restore_elapsed)
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+
+    def close(self):
+        if self._out is not None:
+            with self._lock:
+                self._out.close()
+                self._out = None
+
+
+def _restore_elapsed(resp, *args, **kwargs):
+    # requests sets resp.elapsed after the adapter returns; put the recorded latency back
+    elapsed = getattr(resp, "_cassette_elapsed", None)
+    if elapsed is not None:
+        resp.elapsed = timedelta(seconds=elapsed)
+    return resp
+
+
+class _CassetteAdapter(HTTPAdapter):
+    def __init__(self, cassette: Cassette, **kwargs):
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def _build(self, request, header: dict, body: bytes, stream: bool):
+        raw = HTTPResponse(body=io.BytesIO(body), headers=header["headers"], status=header["status"],
+                           reason=header.get("reason"), version=header.get("version", 11),
+                           preload_content=False, decode_content=True, request_method=request.method,
+                           request_url=request.url)
+        resp = self.build_response(request, raw)
+        if not stream:
+            resp.content  # load now, as a non-streaming live request would
+        return resp
+
+
+class RecordingAdapter(_CassetteAdapter):
+    """A real HTTPAdapter that also saves every exchange to the cassette."""
+
+    def send(self, request, stream=False, **kwargs):
+        started = time.perf_counter()
+        header = {"method": request.method, "url": request.url}
+        try:
+            resp = super().send(request, stream=True, **kwargs)
+            try:
+                body = resp.raw.read(decode_content=False)  # the bytes as sent, still compressed
+            except (urllib3.exceptions.HTTPError, OSError) as e:
+                raise requests.ConnectionError(e, request=request)
+        except requests.RequestException as e:
+            self.cassette.save({**header, "error": type(e).__name__, "message": str(e)})
+            raise
+        header.update(status=resp.status_code, reason=resp.reason, version=resp.raw.version,
+                      headers=list(resp.raw.headers.items()), elapsed=time.perf_counter() - started)
+        resp.close()
+        self.cassette.save(header, body)
+        resp = self._build(request, header, body, stream)
+        resp._cassette_elapsed = header["elapsed"]  # the latency replay will report
+        return resp
+
+
+class ReplayAdapter(_CassetteAdapter):
+    """Answers from the cassette; never opens a connection."""
+
+    def send(self, request, stream=False, **kwargs):
+        found = self.cassette.next_record(request.method, request.url)
+        if found is None:
+            raise CassetteMiss(f"{request.method} {request.url} is not in {self.cassette.path}", request=request)
+        header, body = found
+        if "error" in header:
+            cls = getattr(requests.exceptions, header["error"], None)
+            if not (isinstance(cls, type) and issubclass(cls, requests.RequestException)):
+                cls = requests.ConnectionError
+            raise cls(header.get("message", ""), request=request)
+        resp = self._build(request, header, body, stream)
+        resp._cassette_elapsed = header.get("elapsed")
+        return resp
+
+
+# ----------------------------- ACTIVE CASSETTE -----------------------------
+
+def active() -> Cassette | None:
+    return _active
+
+
+def replaying() -> bool:
+    return _active is not None and _active.mode == REPLAY
+
+
+def http_adapter(**kwargs) -> HTTPAdapter:
+    """HTTPAdapter for a new session or pool: the active cassette's, else a plain one."""
+    return _active.adapter(**kwargs) if _active is not None else HTTPAdapter(**kwargs)
+
+
+def mount_active(session: requests.Session, **kwargs):
+    """Route a session created while a cassette is active through it (no-op otherwise)."""
+    if _active is not None:
+        _active.mount(session, **kwargs)
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = REPLAY, sessions=None):
+    """
+    Record or replay every request of the requests-based sessions to/from `path`.
+    sessions: defaults to crawler_excel.SESSION and shop_scraper.SESSION.
+    """
+    global _active
+    if _active is not None:
+        raise RuntimeError(f"A cassette is already active ({_active.path})")
+    if sessions is None:
+        import crawler_excel
+        import shop_scraper
+        sessions = [crawler_excel.SESSION, shop_scraper.SESSION]
+    cassette = Cassette(path, mode)
+    mounted = [(s, cassette.mount(s)) for s in sessions]
+    _active = cassette
+    try:
+        yield cassette
+    finally:
+        _active = None
+        for session, previous in mounted:
+            Cassette.unmount(session, previous)
+        cassette.close()
+        logging.info("Cassette %s closed: %s", path, cassette.stats())
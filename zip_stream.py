@@ -0,0 +1,159 @@
+# zip_stream.py
+"""
+ZIP archives streamed while they are being produced.
+
+stream_zip(producer) runs producer(zs) on a background thread (or the given
+executor); every zs.add_file()/zs.add_bytes() appends a member to a ZIP written
+into a bounded queue of byte chunks, which the returned iterator hands to a
+StreamingResponse. Nothing is staged on disk and at most `max_chunks` chunks wait
+in memory: a slow client slows the producer down instead. If the client goes
+away, the producer's next write or zs.check() raises ZipStreamClosed; a producer
+that runs a crawl calls check() between pages (e.g. as its progress callback) so
+the crawl stops then, not at its next output file. If the producer fails, the
+error is added as an ERROR.txt member and the archive is closed normally, whether
+or not other members were sent already.
+
+Members that are already compressed (xlsx, images, zips) are stored as-is;
+text members are deflated.
+"""
+import logging
+import os
+import threading
+import weakref
+import zipfile
+from queue import Empty, Full, Queue
+
+# already-compressed formats: deflating them again costs CPU for ~0% gain
+STORED_EXTENSIONS = {".xlsx", ".zip", ".gz", ".parquet", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif"}
+
+_DONE = object()
+
+
+def compress_type_for(name: str) -> int:
+    return zipfile.ZIP_STORED if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+class ZipStreamClosed(Exception):
+    """The consumer stopped reading (client disconnected)."""
+
+
+class ZipStream:
+    """Write side handed to the producer. Also the unseekable sink ZipFile writes into."""
+
+    def __init__(self, chunk_size: int = 1 << 16, max_chunks: int = 32):
+        self.chunk_size = chunk_size
+        self.entries = 0
+        self._queue = Queue(maxsize=max_chunks)
+        self._buf = bytearray()
+        self._closed = threading.Event()
+        self._abandoned = False
+        # no tell()/seek() on self, so ZipFile streams members with data descriptors
+        self._zip = zipfile.ZipFile(self, "w")
+
+    # ---------- producer API ----------
+
+    def add_file(self, path: str, arcname: str | None = None):
+        arcname = arcname or os.path.basename(path)
+        self._zip.write(path, arcname, compress_type=compress_type_for(arcname))
+        self._entry_done()
+
+    def add_bytes(self, arcname: str, data: bytes | str):
+        self._zip.writestr(arcname, data, compress_type=compress_type_for(arcname))
+        self._entry_done()
+
+    def check(self, *_):
+        """Raise ZipStreamClosed once the consumer has gone away; usable as a progress callback."""
+        if self._closed.is_set():
+            raise ZipStreamClosed("ZIP stream consumer went away")
+
+    # ---------- file-like sink for ZipFile ----------
+
+    def write(self, data) -> int:
+        if self._abandoned:
+            return len(data)
+        self._buf += data
+        while len(self._buf) >= self.chunk_size:
+            self._put(bytes(self._buf[:self.chunk_size]))
+            del self._buf[:self.chunk_size]
+        return len(data)
+
+    def flush(self):
+        if self._abandoned:
+            self._buf.clear()
+        elif self._buf:
+            self._put(bytes(self._buf))
+            self._buf.clear()
+
+    # ---------- internals ----------
+
+    def _entry_done(self):
+        self.entries += 1
+        self.flush()  # a finished member goes out now, not when the next one fills a chunk
+
+    def _put(self, item):
+        while True:
+            self.check()
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except Full:
+                continue
+
+    def _run(self, producer):
+        try:
+            try:
+                producer(self)
+            except ZipStreamClosed:
+                raise
+            except Exception as e:
+                logging.exception("ZIP stream producer failed after %d entries", self.entries)
+                self.add_bytes("ERROR.txt", f"The run failed before finishing:\n{e}\n")
+            self._zip.close()
+            self.flush()
+            self._put(_DONE)
+        except ZipStreamClosed:
+            self._abandon()
+
+    def _abandon(self):
+        self._abandoned = True
+        self._zip.close()  # writes are dropped now
+
+    def _get(self):
+        while True:
+            try:
+                return self._queue.get(timeout=0.5)
+            except Empty:
+                if self._closed.is_set():
+                    return _DONE
+
+    def _close(self):
+        self._closed.set()
+
+
+def stream_zip(producer, chunk_size: int = 1 << 16, max_chunks: int = 32, executor=None):
+    """
+    Start producer(zs) in the background and return an iterator of ZIP bytes.
+
+    Returns at once, so the response (and its headers) can start before the
+    first member is finished; the iterator blocks between chunks instead.
+    executor: run the producer there instead of on a thread of its own, to bound
+    how many run at once.
+    """
+    zs = ZipStream(chunk_size=chunk_size, max_chunks=max_chunks)
+    if executor is not None:
+        executor.submit(zs._run, producer)
+    else:
+        threading.Thread(target=zs._run, args=(producer,), name="zip-stream", daemon=True).start()
+
+    def chunks():
+        try:
+            item = zs._get()
+            while item is not _DONE:
+                yield item
+                item = zs._get()
+        finally:
+            zs._close()
+    it = chunks()
+    # a generator dropped before its first chunk never runs its finally
+    weakref.finalize(it, zs._close)
+    return it